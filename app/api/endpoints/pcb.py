@@ -1,15 +1,19 @@
 # app/api/endpoints/pcb.py
 
 import os
-import io
 import json
-import zipfile
 import time
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Body
-from fastapi.responses import StreamingResponse, JSONResponse
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Body, Header
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse, Response
 from pydantic import ValidationError
 
-from app.services.quote_generator import QuoteGenerator
+from app.services.quote_generator import run_full_quote, run_quote_only
+from app.services.artifact_store import artifact_store
+from app.services.job_events import job_events
+from app.services.job_store import job_store
+from app.services.quote_jobs import enqueue_quote_v2
+from app.services.render_executor import render_executor, RenderQueueFull, RenderTimeout
 # We import the corrected schema that no longer has an 'images' field.
 from app.schemas.pcb import ManufacturingParameters, GerberQuoteResponse, JobResponse, QuoteManifest, JobStatus
 from app.core.feature_flags import feature_flags, use_client_side_recoloring
@@ -18,6 +22,7 @@ from app.services.image_cache_service import image_cache
 from app.services.local_pricing_service import LocalPricingService
 from app.services.robust_pricing_service import RobustPricingService
 from app.services.parameter_normalizer import ParameterNormalizer
+from app.utils.zip_creator import stream_zip
 from app.core.exceptions import ParameterValidationError, PricingError, raise_pricing_error
 from app.core.metrics import PricingMetrics, time_operation, get_health_metrics
 
@@ -25,6 +30,7 @@ from app.core.metrics import PricingMetrics, time_operation, get_health_metrics
 from app.services.unified_pricing_engine import unified_pricing_engine
 from app.core.tenant_context import get_current_tenant, get_tenant_context
 from app.core.monitoring.metrics import metrics
+from app.core.config import settings
 
 router = APIRouter()
 
@@ -133,12 +139,9 @@ async def generate_full_quote(
     # 4. Delegate all the core logic to the service layer with robust error handling and metrics
     try:
         with time_operation("quote_generation_total", {"material": params.base_material.value}):
-            generator = QuoteGenerator(
-                archive_content=archive_content,
-                filename=file.filename,
-                params=params
+            top_image_bytes, bottom_image_bytes, dimensions, quote = await render_executor.submit(
+                run_full_quote, archive_content, file.filename, params
             )
-            top_image_bytes, bottom_image_bytes, dimensions, quote = generator.process()
             
             # Record successful pricing request with new metrics
             metrics.record_pricing_request(params.base_material.value, "success", get_current_tenant() or "default")
@@ -158,6 +161,10 @@ async def generate_full_quote(
                     'details': fallback_result["details"]
                 })()
         
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e: # Catches specific, expected errors from our service
         print(f"❌ Service error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -196,30 +203,24 @@ async def generate_full_quote(
         parameters_received=params,
     )
 
-    # 5. Create the response ZIP file in memory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_out:
-        # Add the rendered images
-        zip_out.writestr("pcb_top.png", top_image_bytes)
-        zip_out.writestr("pcb_bottom.png", bottom_image_bytes)
-        
-        # Add the structured JSON data file
+    # 5. Stream the response ZIP as it is built, instead of building a
+    # second, deflated copy of the images in a buffer first. Both images
+    # come from the one render call above, so they are already in memory;
+    # being compressed, they are stored as they are
+    entries = [
+        ("pcb_top.png", top_image_bytes),
+        ("pcb_bottom.png", bottom_image_bytes),
         # .model_dump_json() is the correct method for Pydantic v2+
-        zip_out.writestr(
-            "quote_details.json",
-            response_data.model_dump_json(indent=2)
-        )
+        ("quote_details.json", response_data.model_dump_json(indent=2)),
+    ]
 
-    # Prepare the buffer for reading
-    zip_buffer.seek(0)
-    
     # Create a safe, descriptive filename for the download
     original_filename = os.path.splitext(file.filename)[0]
     response_filename = f"quote_for_{original_filename}.zip"
 
     # 6. Stream the ZIP file back to the client
     return StreamingResponse(
-        zip_buffer,
+        stream_zip(entries),
         media_type="application/zip",
         headers={"Content-Disposition": f"attachment; filename={response_filename}"}
     )
@@ -257,13 +258,14 @@ async def generate_quote_fast(
 
     # 3. Delegate all the core logic to the service layer
     try:
-        generator = QuoteGenerator(
-            archive_content=archive_content,
-            filename=file.filename,
-            params=params
+        dimensions, quote = await render_executor.submit(
+            run_quote_only, archive_content, file.filename, params
         )
-        dimensions, quote = generator.process_quote_only()
         
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e: # Catches specific, expected errors from our service
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e: # Catches any other unexpected server errors
@@ -534,9 +536,6 @@ async def cleanup_cache():
 #  NEW: Client-Side Recoloring Endpoints (Phase 1)
 # ===================================================================
 
-# Simple in-memory job storage (replace with Redis in production)
-job_storage = {}
-
 @router.post(
     "/quotes/v2",
     response_model=JobResponse,
@@ -553,9 +552,9 @@ async def create_quote_v2(
 ):
     """
     Start an async job to generate PCB artifacts for client-side recoloring.
-    This endpoint returns immediately with a job ID, then processes in background.
+    This endpoint returns immediately with a job ID; the job is stored in the
+    durable job queue and processed by a job worker.
     """
-    import uuid
     import asyncio
     
     # Validate file type
@@ -568,19 +567,10 @@ async def create_quote_v2(
     except ValidationError as e:
         raise HTTPException(status_code=422, detail=e.errors())
 
-    # Generate job ID
-    job_id = str(uuid.uuid4())
-    
-    # Store job status
-    job_storage[job_id] = {
-        "status": "queued",
-        "progress": 0,
-        "error": None,
-        "manifest": None
-    }
-    
-    # Start background processing (simplified version)
-    asyncio.create_task(process_render_job_v2(job_id, file, params))
+    # The upload is only readable during this request, so it goes into the queue with the job
+    archive_content = await file.read()
+    job_id = await asyncio.to_thread(enqueue_quote_v2, job_store, archive_content, file.filename, params)
+    wake_job_worker()
     
     return JobResponse(job_id=job_id, status="queued")
 
@@ -592,18 +582,52 @@ async def create_quote_v2(
 )
 async def get_quote_manifest(job_id: str):
     """Get manifest with image URLs once job completes"""
-    if job_id not in job_storage:
+    import asyncio
+
+    job_status = await asyncio.to_thread(job_store.get, job_id)
+    if job_status is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job_status = job_storage[job_id]
-    
     if job_status["status"] == "completed":
         return QuoteManifest(**job_status["manifest"])
     elif job_status["status"] == "failed":
-        raise HTTPException(status_code=500, detail=job_status.get("error", "Rendering failed"))
+        raise HTTPException(status_code=500, detail=job_status.get("error") or "Rendering failed")
     else:
         raise HTTPException(status_code=202, detail=f"Job still {job_status['status']}")
 
+@router.get(
+    "/quotes/{job_id}/artifacts/{name}",
+    summary="Get a rendered quote artifact",
+    description="Serve one image from a job's preview or completed manifest. Responses are immutable and support ETag and Range requests."
+)
+async def get_quote_artifact(job_id: str, name: str, if_none_match: Optional[str] = Header(None)):
+    """Serve a stored artifact of a job's preview or manifest"""
+    import asyncio
+
+    job_status = await asyncio.to_thread(job_store.get, job_id)
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Previews are served while the job runs, everything once it completes
+    listing = job_status["manifest"] or job_status["preview"]
+    if listing is None:
+        raise HTTPException(status_code=404, detail=f"Job still {job_status['status']}")
+
+    artifact = (listing.get("artifacts") or {}).get(name)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    path = artifact_store.path(artifact["sha256"])
+
+    # The content never changes for a given hash, so clients may cache it forever
+    etag = f'"{artifact["sha256"]}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Artifact expired")
+    # FileResponse answers Range and If-Range requests itself
+    return FileResponse(path, media_type=artifact["contentType"], headers=headers,
+                        content_disposition_type="inline")
+
 @router.get(
     "/quotes/{job_id}/status",
     summary="Get job status (polling endpoint)",
@@ -611,35 +635,45 @@ async def get_quote_manifest(job_id: str):
 )
 async def get_job_status(job_id: str):
     """Get job status for polling"""
-    if job_id not in job_storage:
+    import asyncio
+
+    job_status = await asyncio.to_thread(job_store.get, job_id)
+    if job_status is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return JobStatus(**job_storage[job_id])
+    return JobStatus(**job_status)
 
 @router.get(
     "/quotes/{job_id}/events",
     summary="Server-sent events for job progress",
-    description="Stream job progress updates via Server-Sent Events."
+    description="Stream job progress updates via Server-Sent Events. Reconnecting clients send Last-Event-ID to resume."
 )
-async def quote_status_stream(job_id: str):
+async def quote_status_stream(job_id: str, last_event_id: Optional[str] = Header(None)):
     """Server-sent events for job progress"""
     import asyncio
     
-    if job_id not in job_storage:
+    job_status = await asyncio.to_thread(job_store.get, job_id)
+    if job_status is None:
         raise HTTPException(status_code=404, detail="Job not found")
+    # Seed the bus with the current state; ignored if it already has it
+    job_events.publish(job_id, job_status, forward=False)
+
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_from = None
     
     async def event_generator():
-        while True:
-            job_status = job_storage.get(job_id)
-            if not job_status:
-                break
-                
-            yield f"data: {json.dumps(job_status)}\n\n"
-            
-            if job_status["status"] in ["completed", "failed"]:
-                break
-                
-            await asyncio.sleep(0.5)
+        # Changes made by other processes come from the store when the bus can't hear them
+        load = lambda: asyncio.to_thread(job_store.get, job_id)
+        async for event in job_events.follow(job_id, load, resume_from, settings.JOB_EVENTS_HEARTBEAT_SECONDS,
+                                             settings.JOB_EVENTS_POLL_SECONDS):
+            if event is None:
+                yield ": heartbeat\n\n"
+                continue
+
+            data = {key: value for key, value in event.items() if key != "version"}
+            yield f"id: {event['version']}\ndata: {json.dumps(data)}\n\n"
     
     return StreamingResponse(
         event_generator(),
@@ -650,81 +684,13 @@ async def quote_status_stream(job_id: str):
         }
     )
 
-# Background job processor (Phase 2 - Real Implementation)
-async def process_render_job_v2(job_id: str, file: UploadFile, params: ManufacturingParameters):
-    """Process rendering job in background with real base/mask generation"""
-    try:
-        import hashlib
-        import tempfile
-        
-        # Update status to parsing
-        job_storage[job_id]["status"] = "parsing"
-        job_storage[job_id]["progress"] = 10
-        
-        # Read file content
-        file_content = await file.read()
-        file_hash = hashlib.md5(file_content).hexdigest()
-        
-        print(f"🔍 Processing job {job_id} for file {file.filename}")
-        print(f"📁 File hash: {file_hash[:16]}...")
-        
-        # Update status to loading PCB
-        job_storage[job_id]["status"] = "parsing"
-        job_storage[job_id]["progress"] = 30
-        
-        # Create QuoteGenerator instance
-        quote_gen = QuoteGenerator(file_content, file.filename, params)
-        
-        # Process the PCB (load and parse)
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            quote_gen._extract_archive(tmpdirname)
-            gerber_source_path = quote_gen._find_gerber_path(tmpdirname)
-            quote_gen._rename_files_for_compatibility(gerber_source_path)
-            quote_gen._load_pcb(gerber_source_path)
-            
-            # Update status to rendering
-            job_storage[job_id]["status"] = "rendering"
-            job_storage[job_id]["progress"] = 50
-            
-            # Generate base/mask artifacts
-            print(f"🎨 Starting base/mask generation for job {job_id}")
-            artifacts = quote_gen.generate_base_mask_artifacts(file_hash)
-            
-            # Update status to uploading
-            job_storage[job_id]["status"] = "uploading"
-            job_storage[job_id]["progress"] = 80
-            
-            # For now, store artifacts in memory (replace with S3 in production)
-            # Create manifest with local URLs
-            manifest = {"renderVersion": "v2", "sides": {}}
-            
-            for key, artifact in artifacts.items():
-                side, variant, size = key.split('.')
-                
-                if side not in manifest["sides"]:
-                    manifest["sides"][side] = {"base": {}, "mask": {}}
-                
-                # Create a data URL for the image (base64 encoded)
-                import base64
-                mime_type = "image/webp" if artifact['data'][:4] == b'RIFF' else "image/png"
-                data_url = f"data:{mime_type};base64,{base64.b64encode(artifact['data']).decode()}"
-                
-                manifest["sides"][side][variant][size] = data_url
-            
-            # Update status to completed
-            job_storage[job_id]["status"] = "completed"
-            job_storage[job_id]["progress"] = 100
-            job_storage[job_id]["manifest"] = manifest
-            
-            print(f"✅ Job {job_id} completed successfully with {len(artifacts)} artifacts")
-            print(f"📊 Generated manifest with sides: {list(manifest['sides'].keys())}")
-        
-    except Exception as e:
-        print(f"❌ Job {job_id} failed: {e}")
-        import traceback
-        traceback.print_exc()
-        job_storage[job_id]["status"] = "failed"
-        job_storage[job_id]["error"] = str(e)
+# In-process job worker, started by the app lifespan when JOB_WORKER_IN_PROCESS is set
+job_worker = None
+
+def wake_job_worker():
+    """Let the in-process worker pick up a new job without waiting for its next poll."""
+    if job_worker is not None:
+        job_worker.wake()
 
 
 # Unified Pricing Engine Endpoint
@@ -1,6 +1,14 @@
 # app/core/config.py
 from ..utils.egp_yuan import get_exchange_rate_egp_cny
 import os
+import tempfile
+
+# The directory holding the app package; relative data paths resolve against it
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _app_path(path: str) -> str:
+    """`path` resolved against APP_ROOT if relative; "" stays ""."""
+    return os.path.join(APP_ROOT, path) if path else ""
 
 class Settings:
     # --- API Info ---
@@ -33,6 +41,70 @@ class Settings:
     FINAL_PRICE_MULTIPLIER_LARGE_AREA: float = 1.4 # For area >= 1.0 m^2
     FR4_DENSITY_G_PER_CM3: float = 1.85
 
+    # Gerber parsing: processes each render job uses to parse an upload's
+    # layer files (1 = serial, 0 = one per CPU). Every render worker starts
+    # its own, so keep RENDER_WORKERS x PCB_PARSE_WORKERS within the CPUs
+    PCB_PARSE_WORKERS: int = int(os.getenv("PCB_PARSE_WORKERS", "2")) or None
+    # Parsed board cache: boards kept in memory per process, and a shared
+    # on-disk tier ("" to disable it, relative to APP_ROOT) with its size
+    # limit. The directory must
+    # be private to the service (it is refused otherwise); entries are signed
+    # with PCB_CACHE_SECRET, or a random key kept in the directory if unset
+    PCB_CACHE_MEMORY_ENTRIES: int = int(os.getenv("PCB_CACHE_MEMORY_ENTRIES", "8"))
+    PCB_CACHE_DIR: str = _app_path(os.getenv("PCB_CACHE_DIR", os.path.join("cache", "pcb")))
+    PCB_CACHE_SECRET: str = os.getenv("PCB_CACHE_SECRET", "")
+    PCB_CACHE_MAX_DISK_BYTES: int = int(os.getenv("PCB_CACHE_MAX_DISK_BYTES", str(512 * 1024 * 1024)))
+    # Rendered image cache: directory ("" for the system temp directory), disk
+    # quota (least recently used entries evicted past it) and per-process memory tier
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", "")
+    IMAGE_CACHE_MAX_BYTES: int = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    IMAGE_CACHE_MEMORY_BYTES: int = int(os.getenv("IMAGE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+    # Render worker pool: processes, jobs allowed to queue, and per-job timeout
+    RENDER_WORKERS: int = int(os.getenv("RENDER_WORKERS", "2"))
+    RENDER_QUEUE_SIZE: int = int(os.getenv("RENDER_QUEUE_SIZE", "8"))
+    RENDER_JOB_TIMEOUT_SECONDS: float = float(os.getenv("RENDER_JOB_TIMEOUT_SECONDS", "120"))
+    # Horizontal strips each full-size layer is rasterized as, one thread per
+    # strip in each render worker (1 = a single surface)
+    RENDER_TILES: int = int(os.getenv("RENDER_TILES", "1"))
+    # Render each quote theme from layer masks rasterized once per board
+    # (gerber.render.composite) instead of a full render_layers per theme
+    RENDER_COMPOSITE: bool = os.getenv("RENDER_COMPOSITE", "0") == "1"
+
+    # Quote job queue (/quotes/v2): "sqlite:///path/to/jobs.db" or "memory://"
+    JOB_STORE_URL: str = os.getenv(
+        "JOB_STORE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "prototech_jobs.db")
+    )
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BACKOFF_SECONDS: float = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_TTL_SECONDS: float = float(os.getenv("JOB_TTL_SECONDS", str(24 * 3600)))
+    # Run a queue worker inside each API process (standalone: python -m app.services.job_worker)
+    JOB_WORKER_IN_PROCESS: bool = os.getenv("JOB_WORKER_IN_PROCESS", "1") == "1"
+    # Job progress events (/quotes/{job_id}/events): events kept per job for
+    # Last-Event-ID resume, SSE heartbeat interval, and an optional Redis URL
+    # to share events between API processes and standalone workers. Without
+    # Redis, each followed job is read from the store every
+    # JOB_EVENTS_POLL_SECONDS while idle, once for all of its streams, to
+    # pick up progress made in other processes
+    JOB_EVENTS_HISTORY: int = int(os.getenv("JOB_EVENTS_HISTORY", "16"))
+    JOB_EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("JOB_EVENTS_HEARTBEAT_SECONDS", "15"))
+    JOB_EVENTS_POLL_SECONDS: float = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "1"))
+    JOB_EVENTS_REDIS_URL: str = os.getenv("JOB_EVENTS_REDIS_URL", "")
+    # Rendered quote artifacts, stored by content hash and served from
+    # /quotes/{job_id}/artifacts, and the store's size limit (0 = none; least
+    # recently stored artifacts are evicted past it)
+    ARTIFACT_STORE_DIR: str = os.getenv(
+        "ARTIFACT_STORE_DIR", os.path.join(tempfile.gettempdir(), "prototech_artifacts")
+    )
+    ARTIFACT_STORE_MAX_BYTES: int = int(os.getenv("ARTIFACT_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+    # WebP encoder effort of the 256 px base/mask artifacts, from 0 (fastest)
+    # to 6 (smallest files)
+    ARTIFACT_WEBP_METHOD: int = int(os.getenv("ARTIFACT_WEBP_METHOD", "6"))
+
+    # Limits on uploaded Gerber archives
+    ARCHIVE_MAX_MEMBERS: int = int(os.getenv("ARCHIVE_MAX_MEMBERS", "500"))
+    ARCHIVE_MAX_UNCOMPRESSED_BYTES: int = int(os.getenv("ARCHIVE_MAX_UNCOMPRESSED_BYTES", str(200 * 1024 * 1024)))
+
     # Add missing environment variables for e-commerce
     STRIPE_SECRET_KEY: str = os.getenv("STRIPE_SECRET_KEY", "")
     STRIPE_WEBHOOK_SECRET: str = os.getenv("STRIPE_WEBHOOK_SECRET", "")
@@ -68,6 +68,34 @@ cpu_usage = Gauge(
     registry=registry
 )
 
+# Render pool metrics
+render_queue_depth = Gauge(
+    'render_queue_depth',
+    'Render jobs waiting for a free worker',
+    registry=registry
+)
+
+render_workers_busy = Gauge(
+    'render_workers_busy',
+    'Render worker processes running a job',
+    registry=registry
+)
+
+render_jobs = Counter(
+    'render_jobs_total',
+    'Render jobs by outcome',
+    ['outcome'],
+    registry=registry
+)
+
+# Parsed board cache metrics
+pcb_cache_requests = Counter(
+    'pcb_cache_requests_total',
+    'Parsed board cache lookups by result (memory_hit, disk_hit, miss)',
+    ['result'],
+    registry=registry
+)
+
 # Business metrics
 quotes_generated = Counter(
     'quotes_generated_total',
@@ -158,6 +186,19 @@ class MetricsCollector:
         """Record revenue."""
         revenue_total.labels(tenant_id=tenant_id).inc(amount)
     
+    def update_render_pool(self, queue_depth: int, busy_workers: int):
+        """Update render pool gauges."""
+        render_queue_depth.set(queue_depth)
+        render_workers_busy.set(busy_workers)
+    
+    def record_render_job(self, outcome: str):
+        """Record a finished, rejected or timed out render job."""
+        render_jobs.labels(outcome=outcome).inc()
+    
+    def record_pcb_cache(self, result: str):
+        """Record a parsed board cache lookup."""
+        pcb_cache_requests.labels(result=result).inc()
+    
     def update_system_metrics(self):
         """Update system metrics."""
         try:
@@ -194,17 +194,37 @@ class SideManifest(BaseModel):
     base: ImageUrls
     mask: ImageUrls
 
+class ArtifactInfo(BaseModel):
+    """A rendered artifact served from /quotes/{job_id}/artifacts/{name}"""
+    url: str
+    size: int  # bytes
+    contentType: str
+    sha256: str
+
 class QuoteManifest(BaseModel):
     """Complete manifest with all image URLs for client-side recoloring"""
     renderVersion: str
     sides: dict[str, SideManifest]  # "top" and/or "bottom"
+    artifacts: dict[str, ArtifactInfo] = {}  # by name, e.g. "top.base.1024"
+
+class PreviewSide(BaseModel):
+    """Preview image URLs for one side of the PCB"""
+    base: str
+    mask: str
+
+class QuotePreview(BaseModel):
+    """Low-resolution images published while the full artifacts render"""
+    renderVersion: str
+    sides: dict[str, PreviewSide]  # "top" and/or "bottom"
+    artifacts: dict[str, ArtifactInfo] = {}  # by name, e.g. "top.base.preview"
 
 class JobStatus(BaseModel):
     """Status of an async rendering job"""
-    status: str  # "queued" | "parsing" | "rendering" | "uploading" | "completed" | "failed"
+    status: str  # "queued" | "parsing" | "preview" | "rendering" | "uploading" | "completed" | "failed"
     progress: Optional[int] = None
     error: Optional[str] = None
     manifest: Optional[QuoteManifest] = None
+    preview: Optional[QuotePreview] = None  # until the job finishes
 
 
 
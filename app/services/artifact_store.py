@@ -0,0 +1,164 @@
+# app/services/artifact_store.py
+
+import hashlib
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class StoredArtifact:
+    """An artifact in the store, addressed by the SHA-256 of its content."""
+    digest: str
+    size: int
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for rendered quote artifacts.
+
+    Files are named by the SHA-256 of their content, under two levels of
+    directories (ab/cd/abcd...), so identical renders are stored once and a
+    file never changes after it is written. Writes go to a temporary file
+    that is renamed into place, so readers never see a partial artifact.
+
+    An artifact's modification time is when a job last stored it. Artifacts
+    are removed once that is older than the TTL, and when the store grows
+    past `max_bytes`, the least recently stored go first.
+    """
+
+    # Eviction frees space down to this fraction of max_bytes, so the next
+    # few puts don't each trigger another scan of the store
+    EVICTION_TARGET = 0.9
+
+    def __init__(self, root: str, ttl_seconds: float = 24 * 3600, max_bytes: int = 0):
+        """
+        Args:
+            root: Directory holding the artifacts.
+            ttl_seconds: Artifacts not written or re-used for this long are
+                removed by cleanup_expired() and remove().
+            max_bytes: Size limit of the store in bytes, 0 for none.
+        """
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # Bytes stored, counted on the first put that needs it
+        self._size: Optional[int] = None
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, digest: str) -> Path:
+        """Path of the artifact with the given digest (it may not exist)."""
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Invalid artifact digest: {digest!r}")
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def put(self, data: bytes) -> StoredArtifact:
+        """Store `data` unless an identical artifact exists, and return its reference."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if path.exists():
+            # Refresh its age so cleanup keeps it for the new job too
+            os.utime(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            if self.max_bytes:
+                self._size = (self._scan()[1] if self._size is None else self._size + len(data))
+                if self._size > self.max_bytes:
+                    self.evict(int(self.max_bytes * self.EVICTION_TARGET))
+        return StoredArtifact(digest, len(data))
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Content of an artifact, or None if it isn't stored."""
+        try:
+            return self.path(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _scan(self):
+        """(modification time, size, path) of every artifact, and their total size."""
+        entries = []
+        for path in self.root.glob("*/*/*"):
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def evict(self, target_bytes: int) -> int:
+        """
+        Delete the least recently stored artifacts until the store holds at
+        most `target_bytes`. Returns the number deleted.
+        """
+        entries, total = self._scan()
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target_bytes:
+                break
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+        return removed
+
+    def remove(self, digests: Iterable[str], now: Optional[float] = None) -> int:
+        """
+        Delete the given artifacts, e.g. those of a purged job, unless a job
+        stored them again within the TTL. Returns the number deleted.
+        """
+        cutoff = (now or time.time()) - self.ttl_seconds
+        removed = 0
+        for digest in digests:
+            path = self.path(digest)
+            try:
+                stat = path.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+            if self._size is not None:
+                self._size -= stat.st_size
+        return removed
+
+    def cleanup_expired(self, now: Optional[float] = None) -> int:
+        """Delete artifacts older than the TTL. Returns the number deleted."""
+        cutoff = (now or time.time()) - self.ttl_seconds
+        removed = 0
+        for path in self.root.glob("*/*/*"):
+            try:
+                if path.stat().st_mtime <= cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        # Recounted on the next put
+        self._size = None
+        return removed
+
+
+# Global artifact store instance
+artifact_store = ArtifactStore(
+    settings.ARTIFACT_STORE_DIR,
+    ttl_seconds=settings.JOB_TTL_SECONDS,
+    max_bytes=settings.ARTIFACT_STORE_MAX_BYTES,
+)
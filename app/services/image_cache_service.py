@@ -1,219 +1,487 @@
 # app/services/image_cache_service.py
 
 import os
+import re
 import hashlib
+import sqlite3
+import struct
 import tempfile
 import shutil
-from typing import Optional, Tuple
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from pathlib import Path
 import time
 
+from app.core.config import settings
+
+# Entry file header: lengths of the top and bottom images that follow it
+_ENTRY_HEADER = struct.Struct("!II")
+
+# Memory-tier hits refresh an entry's last use in the shared index at most
+# this often, so hot entries aren't evicted from disk without a write per hit
+_TOUCH_INTERVAL_SECONDS = 60
+
+# Entries written before the index existed: one directory per key, named
+# "<16 hex digits of the upload's MD5>_<color>_<material>", holding the images
+_LEGACY_ENTRY_NAME = re.compile(r"[0-9a-f]{16}_.+_.+")
+_LEGACY_ENTRY_FILES = {"pcb_top.png", "pcb_bottom.png"}
+
+
 class ImageCacheService:
     """
     Service for caching PCB images based on color and file content.
     This saves 5-7 seconds when users switch back to previously generated colors.
+
+    Each entry (both sides of one board in one color and material) is a
+    single file, sharded by the hash of its key under two levels of
+    directories (ab/cd/abcd...). Files are written to a temporary file and
+    renamed into place, so readers never see half an entry.
+
+    A SQLite index next to the files records each entry's size, creation
+    time and last use. It keeps the cache under `max_bytes` by evicting the
+    least recently used entries, answers stats without walking the
+    directory, and is shared by every process using the same directory.
+    An optional per-process memory tier holds the most recently used
+    entries up to `memory_bytes`.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entries_lru ON entries (accessed_at);
+        CREATE INDEX IF NOT EXISTS entries_age ON entries (created_at);
+        CREATE TABLE IF NOT EXISTS totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            entries INTEGER NOT NULL,
+            bytes INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO totals (id, entries, bytes) VALUES (1, 0, 0);
+        CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+            UPDATE totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+            UPDATE totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_resize AFTER UPDATE OF size ON entries BEGIN
+            UPDATE totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 1;
+        END;
     """
-    
-    def __init__(self, cache_dir: Optional[str] = None):
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 1024 * 1024 * 1024,
+                 memory_bytes: int = 0, expiry_hours: float = 24):
         """
         Initialize the cache service.
-        
+
         Args:
             cache_dir: Optional custom cache directory. If None, uses system temp directory.
+            max_bytes: Size limit of the on-disk cache; least recently used entries are evicted past it.
+            memory_bytes: Size of the in-memory hot tier of this process (0 disables it).
+            expiry_hours: Age after which an entry is no longer served.
         """
         if cache_dir:
             self.cache_dir = Path(cache_dir)
         else:
             # Use system temp directory with our app-specific subdirectory
             self.cache_dir = Path(tempfile.gettempdir()) / "prototech_pcb_cache"
-        
+
         # Ensure cache directory exists
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Cache expiration time (24 hours)
-        self.cache_expiry_hours = 24
-        
+
+        # Cache expiration time (24 hours by default)
+        self.cache_expiry_hours = expiry_hours
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+
+        # Hot tier: key -> (top, bottom, created_at, touched_at)
+        self._memory: "OrderedDict[str, Tuple[bytes, bytes, float, float]]" = OrderedDict()
+        self._memory_size = 0
+        self._memory_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self.index_path = self.cache_dir / "index.db"
+        self._local = threading.local()
+        new_index = not self.index_path.exists()
+        self._connection().executescript(self.SCHEMA)
+        if new_index:
+            self._remove_legacy_entries()
+
+    # ===================================================================
+    #  Index
+    # ===================================================================
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections aren't thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.index_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remove_legacy_entries(self):
+        """
+        Remove entries written before the index existed (one directory per
+        key, directly under the cache directory). Runs once, when the
+        index is created. Directories that don't look exactly like an old
+        entry are left alone.
+        """
+        removed = 0
+        for path in self.cache_dir.iterdir():
+            if not (path.is_dir() and _LEGACY_ENTRY_NAME.fullmatch(path.name)):
+                continue
+            names = {child.name for child in path.iterdir()}
+            if not names or not names <= _LEGACY_ENTRY_FILES:
+                continue
+            try:
+                for name in names:
+                    (path / name).unlink()
+                path.rmdir()
+            except OSError:
+                continue
+            removed += 1
+        if removed:
+            print(f"🗑️ Removed {removed} image cache entries in the old layout")
+
+    def _expiry_cutoff(self, now: Optional[float] = None) -> float:
+        return (now or time.time()) - self.cache_expiry_hours * 3600
+
     def _generate_cache_key(self, file_content: bytes, pcb_color: str, base_material: str) -> str:
         """
         Generate a unique cache key based on file content, PCB color, and base material.
-        
+
         Args:
             file_content: The uploaded file content
             pcb_color: Selected PCB color
             base_material: Selected base material
-            
+
         Returns:
             Unique cache key string
         """
         # Create hash of file content
         file_hash = hashlib.md5(file_content).hexdigest()[:16]
-        
+
         # Create cache key combining file hash, color, and material
         cache_key = f"{file_hash}_{pcb_color}_{base_material}"
-        
+
         return cache_key
-    
+
     def _get_cache_path(self, cache_key: str) -> Path:
         """
-        Get the cache directory path for a specific cache key.
-        
+        Get the file path of a specific cache key.
+
         Args:
             cache_key: The cache key
-            
-        Returns:
-            Path to the cache directory for this key
-        """
-        return self.cache_dir / cache_key
-    
-    def _is_cache_valid(self, cache_path: Path) -> bool:
-        """
-        Check if cached images are still valid (not expired).
-        
-        Args:
-            cache_path: Path to the cache directory
-            
+
         Returns:
-            True if cache is valid, False otherwise
+            Path of the entry file, sharded by the hash of the key
         """
-        if not cache_path.exists():
-            return False
-            
-        # Check if cache directory is too old
-        cache_time = cache_path.stat().st_mtime
-        current_time = time.time()
-        expiry_seconds = self.cache_expiry_hours * 3600
-        
-        return (current_time - cache_time) < expiry_seconds
-    
+        digest = hashlib.sha256(cache_key.encode()).hexdigest()
+        return self.cache_dir / digest[:2] / digest[2:4] / digest
+
+    # ===================================================================
+    #  Memory tier
+    # ===================================================================
+
+    def _memory_get(self, cache_key: str, cutoff: float) -> Optional[Tuple[bytes, bytes, float, float]]:
+        with self._memory_lock:
+            entry = self._memory.get(cache_key)
+            if entry is None:
+                return None
+            if entry[2] <= cutoff:
+                self._memory_drop(cache_key)
+                return None
+            self._memory.move_to_end(cache_key)
+            return entry
+
+    def _memory_put(self, cache_key: str, top_image_bytes: bytes, bottom_image_bytes: bytes,
+                    created_at: float, touched_at: float):
+        size = len(top_image_bytes) + len(bottom_image_bytes)
+        if size > self.memory_bytes:
+            return
+        with self._memory_lock:
+            self._memory_drop(cache_key)
+            self._memory[cache_key] = (top_image_bytes, bottom_image_bytes, created_at, touched_at)
+            self._memory_size += size
+            while self._memory_size > self.memory_bytes:
+                self._memory_drop(next(iter(self._memory)))
+
+    def _memory_drop(self, cache_key: str):
+        # Caller holds the memory lock
+        entry = self._memory.pop(cache_key, None)
+        if entry is not None:
+            self._memory_size -= len(entry[0]) + len(entry[1])
+
+    # ===================================================================
+    #  Public API
+    # ===================================================================
+
     def get_cached_images(self, file_content: bytes, pcb_color: str, base_material: str) -> Optional[Tuple[bytes, bytes]]:
         """
         Retrieve cached images if they exist and are valid.
-        
+
         Args:
             file_content: The uploaded file content
             pcb_color: Selected PCB color
             base_material: Selected base material
-            
+
         Returns:
             Tuple of (top_image_bytes, bottom_image_bytes) if cached, None otherwise
         """
         cache_key = self._generate_cache_key(file_content, pcb_color, base_material)
-        cache_path = self._get_cache_path(cache_key)
-        
-        if not self._is_cache_valid(cache_path):
-            return None
-        
-        # Check if both image files exist
-        top_image_path = cache_path / "pcb_top.png"
-        bottom_image_path = cache_path / "pcb_bottom.png"
-        
-        if not (top_image_path.exists() and bottom_image_path.exists()):
-            return None
-        
+        now = time.time()
+        cutoff = self._expiry_cutoff(now)
+
+        entry = self._memory_get(cache_key, cutoff)
+        if entry is not None:
+            top_image_bytes, bottom_image_bytes, created_at, touched_at = entry
+            if now - touched_at >= _TOUCH_INTERVAL_SECONDS:
+                self._touch(cache_key, now)
+                self._memory_put(cache_key, top_image_bytes, bottom_image_bytes, created_at, now)
+            self._stats["memory_hits"] += 1
+            return top_image_bytes, bottom_image_bytes
+
         try:
-            # Read cached images
-            with open(top_image_path, 'rb') as f:
-                top_image_bytes = f.read()
-            with open(bottom_image_path, 'rb') as f:
-                bottom_image_bytes = f.read()
-            
+            row = self._connection().execute(
+                "SELECT created_at FROM entries WHERE key = ? AND created_at > ?", (cache_key, cutoff)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            created_at = row[0]
+
+            try:
+                with open(self._get_cache_path(cache_key), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                # Evicted or removed since the lookup
+                self._forget(cache_key, created_at)
+                self._stats["misses"] += 1
+                return None
+
+            top_size, bottom_size = _ENTRY_HEADER.unpack_from(data)
+            start = _ENTRY_HEADER.size
+            if len(data) != start + top_size + bottom_size:
+                raise ValueError("truncated cache entry")
+            top_image_bytes = data[start:start + top_size]
+            bottom_image_bytes = data[start + top_size:]
+
+            self._touch(cache_key, now)
+            if self.memory_bytes:
+                self._memory_put(cache_key, top_image_bytes, bottom_image_bytes, created_at, now)
+            self._stats["disk_hits"] += 1
             print(f"✅ Retrieved cached images for color: {pcb_color}, material: {base_material}")
             return top_image_bytes, bottom_image_bytes
-            
+
         except Exception as e:
             print(f"❌ Error reading cached images: {e}")
+            self._stats["misses"] += 1
             return None
-    
-    def cache_images(self, file_content: bytes, pcb_color: str, base_material: str, 
+
+    def cache_images(self, file_content: bytes, pcb_color: str, base_material: str,
                     top_image_bytes: bytes, bottom_image_bytes: bytes) -> bool:
         """
         Cache the generated images for future use.
-        
+
         Args:
             file_content: The uploaded file content
             pcb_color: Selected PCB color
             base_material: Selected base material
             top_image_bytes: Top PCB image bytes
             bottom_image_bytes: Bottom PCB image bytes
-            
+
         Returns:
             True if caching was successful, False otherwise
         """
         cache_key = self._generate_cache_key(file_content, pcb_color, base_material)
         cache_path = self._get_cache_path(cache_key)
-        
+        size = _ENTRY_HEADER.size + len(top_image_bytes) + len(bottom_image_bytes)
+        if size > self.max_bytes:
+            print(f"⚠️ Images for color: {pcb_color} exceed the cache size limit, not cached")
+            return False
+
+        temp_path = None
         try:
-            # Create cache directory
-            cache_path.mkdir(parents=True, exist_ok=True)
-            
-            # Write images to cache
-            top_image_path = cache_path / "pcb_top.png"
-            bottom_image_path = cache_path / "pcb_bottom.png"
-            
-            with open(top_image_path, 'wb') as f:
+            # Write the entry beside its final location
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=cache_path.parent, prefix=".tmp-")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_ENTRY_HEADER.pack(len(top_image_bytes), len(bottom_image_bytes)))
                 f.write(top_image_bytes)
-            with open(bottom_image_path, 'wb') as f:
                 f.write(bottom_image_bytes)
-            
+
+            now = time.time()
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Renamed inside the transaction, so an indexed entry always has its file
+                os.replace(temp_path, cache_path)
+                temp_path = None
+                conn.execute(
+                    "INSERT INTO entries (key, size, created_at, accessed_at) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET size = excluded.size,"
+                    " created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                    (cache_key, size, now, now)
+                )
+                evicted = self._evict(conn, self.max_bytes)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            if self.memory_bytes:
+                self._memory_put(cache_key, top_image_bytes, bottom_image_bytes, now, now)
             print(f"💾 Cached images for color: {pcb_color}, material: {base_material}")
+            if evicted:
+                print(f"🗑️ Evicted {evicted} least recently used image cache entries")
             return True
-            
+
         except Exception as e:
             print(f"❌ Error caching images: {e}")
             return False
-    
+        finally:
+            if temp_path is not None:
+                try:
+                    os.unlink(temp_path)
+                except FileNotFoundError:
+                    pass
+
+    def _evict(self, conn: sqlite3.Connection, max_bytes: int) -> int:
+        """
+        Delete least recently used entries until the cache fits in
+        `max_bytes`. Runs inside the caller's write transaction.
+        """
+        evicted = 0
+        while conn.execute("SELECT bytes FROM totals WHERE id = 1").fetchone()[0] > max_bytes:
+            rows = conn.execute(
+                "SELECT key FROM entries ORDER BY accessed_at LIMIT 32"
+            ).fetchall()
+            if not rows:
+                break
+            evicted += self._delete(conn, [row[0] for row in rows], max_bytes)
+        self._stats["evictions"] += evicted
+        return evicted
+
+    def _delete(self, conn: sqlite3.Connection, keys: List[str], max_bytes: Optional[int] = None) -> int:
+        """
+        Delete entries and their files, stopping once the cache fits in
+        `max_bytes` if given. Runs inside the caller's write transaction.
+        """
+        deleted = 0
+        for key in keys:
+            if max_bytes is not None and \
+                    conn.execute("SELECT bytes FROM totals WHERE id = 1").fetchone()[0] <= max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                self._get_cache_path(key).unlink()
+            except FileNotFoundError:
+                pass
+            with self._memory_lock:
+                self._memory_drop(key)
+            deleted += 1
+        return deleted
+
+    def _touch(self, cache_key: str, now: float):
+        try:
+            self._connection().execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, cache_key)
+            )
+        except sqlite3.Error as e:
+            # Only the LRU order suffers
+            print(f"⚠️ Could not update image cache index: {e}")
+
+    def _forget(self, cache_key: str, created_at: float):
+        # Drop an index row whose file is gone, unless the entry was rewritten meanwhile
+        self._connection().execute(
+            "DELETE FROM entries WHERE key = ? AND created_at = ?", (cache_key, created_at)
+        )
+
     def cleanup_expired_cache(self) -> int:
         """
         Clean up expired cache entries.
-        
+
+        Expired entries are found through the index, so the cost depends
+        on the number of expired entries, not on the size of the cache.
+
         Returns:
             Number of cache entries cleaned up
         """
         cleaned_count = 0
-        
+
         try:
-            for cache_dir in self.cache_dir.iterdir():
-                if cache_dir.is_dir() and not self._is_cache_valid(cache_dir):
-                    shutil.rmtree(cache_dir)
-                    cleaned_count += 1
-                    print(f"🗑️ Cleaned up expired cache: {cache_dir.name}")
-            
+            conn = self._connection()
+            cutoff = self._expiry_cutoff()
+            while True:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    keys = [row[0] for row in conn.execute(
+                        "SELECT key FROM entries WHERE created_at <= ? LIMIT 256", (cutoff,)
+                    )]
+                    cleaned_count += self._delete(conn, keys)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                if len(keys) < 256:
+                    break
+
             if cleaned_count > 0:
                 print(f"✅ Cleaned up {cleaned_count} expired cache entries")
-                
+
         except Exception as e:
             print(f"❌ Error during cache cleanup: {e}")
-        
+
         return cleaned_count
-    
+
     def get_cache_stats(self) -> dict:
         """
         Get cache statistics.
-        
+
+        Totals are kept up to date by the index, so this does not touch
+        the cache files. Hit and miss counts are for this process.
+
         Returns:
             Dictionary with cache statistics
         """
         try:
-            cache_dirs = [d for d in self.cache_dir.iterdir() if d.is_dir()]
-            valid_dirs = [d for d in cache_dirs if self._is_cache_valid(d)]
-            
-            total_size = sum(
-                sum(f.stat().st_size for f in d.rglob('*') if f.is_file())
-                for d in cache_dirs
-            )
-            
+            conn = self._connection()
+            total_entries, total_size = conn.execute(
+                "SELECT entries, bytes FROM totals WHERE id = 1"
+            ).fetchone()
+            # Range count on the age index; cleanup keeps this range small
+            expired_entries = conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE created_at <= ?", (self._expiry_cutoff(),)
+            ).fetchone()[0]
+            with self._memory_lock:
+                memory_entries = len(self._memory)
+                memory_size = self._memory_size
+
             return {
-                "total_entries": len(cache_dirs),
-                "valid_entries": len(valid_dirs),
-                "expired_entries": len(cache_dirs) - len(valid_dirs),
+                "total_entries": total_entries,
+                "valid_entries": total_entries - expired_entries,
+                "expired_entries": expired_entries,
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
+                "max_size_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "memory_entries": memory_entries,
+                "memory_size_mb": round(memory_size / (1024 * 1024), 2),
+                **self._stats,
                 "cache_dir": str(self.cache_dir)
             }
-            
+
         except Exception as e:
             print(f"❌ Error getting cache stats: {e}")
             return {"error": str(e)}
 
 
 # Global cache service instance
-image_cache = ImageCacheService()
+image_cache = ImageCacheService(
+    settings.IMAGE_CACHE_DIR or None,
+    max_bytes=settings.IMAGE_CACHE_MAX_BYTES,
+    memory_bytes=settings.IMAGE_CACHE_MEMORY_BYTES,
+)
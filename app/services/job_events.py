@@ -0,0 +1,319 @@
+# app/services/job_events.py
+
+import asyncio
+import contextlib
+import json
+import logging
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
+from app.core.config import settings
+from app.services.job_store import COMPLETED, FAILED
+
+logger = logging.getLogger(__name__)
+
+# Events are job views from JobStore.get(); their "version" is the event id
+JobEvent = Dict[str, Any]
+
+
+def is_final(event: JobEvent) -> bool:
+    """True for the last event a job will publish."""
+    return event["status"] in (COMPLETED, FAILED)
+
+
+class _Channel:
+    """Recent events of one job and the subscribers waiting on it."""
+
+    __slots__ = ("events", "changed", "subscribers", "drop_handle", "followers", "poller", "gone")
+
+    def __init__(self, history: int):
+        self.events: Deque[JobEvent] = deque(maxlen=history)
+        # Replaced on every publish; setting the old one wakes every waiter at once
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.drop_handle: Optional[asyncio.TimerHandle] = None
+        # Subscribers using follow(), and the one store reader shared by them
+        self.followers = 0
+        self.poller: Optional[asyncio.Task] = None
+        # Set when the job is no longer in the store
+        self.gone = False
+
+    def wake(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    @property
+    def latest(self) -> int:
+        return self.events[-1]["version"] if self.events else 0
+
+
+class JobEventBus:
+    """
+    In-process broadcast of job progress events, for /quotes/{job_id}/events.
+
+    Workers publish a job's view after each change; subscribers wait on a
+    per-job broadcast instead of polling the store. Each job keeps its last
+    `history` events so a client reconnecting with Last-Event-ID gets what
+    it missed. Events are ordered by the job's version, so stale or
+    duplicate events (e.g. the same change arriving from the store and from
+    the transport) are dropped. A channel without subscribers is dropped
+    `retention_seconds` after its last event.
+
+    With a transport, events are also forwarded to and received from other
+    processes (API replicas and standalone workers). Must be used from a
+    single event loop.
+    """
+
+    def __init__(self, history: int = 16, retention_seconds: float = 60.0,
+                 transport: Optional["RedisEventTransport"] = None):
+        self.history = history
+        self.retention_seconds = retention_seconds
+        self.transport = transport
+        self._channels: Dict[str, _Channel] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def _channel(self, job_id: str) -> _Channel:
+        channel = self._channels.get(job_id)
+        if channel is None:
+            channel = self._channels[job_id] = _Channel(self.history)
+        return channel
+
+    def _schedule_drop(self, job_id: str, channel: _Channel):
+        if channel.drop_handle is not None:
+            channel.drop_handle.cancel()
+            channel.drop_handle = None
+        if channel.subscribers == 0:
+            channel.drop_handle = asyncio.get_running_loop().call_later(
+                self.retention_seconds, self._drop, job_id, channel
+            )
+
+    def _drop(self, job_id: str, channel: _Channel):
+        if self._channels.get(job_id) is channel and channel.subscribers == 0 and channel.followers == 0:
+            del self._channels[job_id]
+
+    def publish(self, job_id: str, event: JobEvent, forward: bool = True) -> bool:
+        """
+        Publish a job view to its subscribers.
+
+        Args:
+            job_id: The job the event belongs to.
+            event: The job's view from JobStore.get().
+            forward: Also send the event to other processes through the transport.
+
+        Returns:
+            bool: False if the event was not newer than the last one published.
+        """
+        channel = self._channel(job_id)
+        if event["version"] <= channel.latest:
+            return False
+        channel.events.append(event)
+        channel.gone = False
+        channel.wake()
+        self._schedule_drop(job_id, channel)
+        if forward and self.transport is not None:
+            self.transport.send(job_id, event)
+        return True
+
+    async def subscribe(self, job_id: str, last_event_id: Optional[int] = None,
+                        heartbeat_interval: float = 15.0) -> AsyncIterator[Optional[JobEvent]]:
+        """
+        Yield a job's events as they are published, ending after its final one.
+
+        Yields None when `heartbeat_interval` seconds pass without an event.
+        Events older than the retained history are not replayed; the oldest
+        retained one (which supersedes them) is sent instead. Ends early if
+        the job is found to be gone from the store (see follow()).
+
+        Args:
+            job_id: The job to follow.
+            last_event_id: Version of the last event the client received.
+            heartbeat_interval: Seconds between heartbeats while idle.
+        """
+        channel = self._channel(job_id)
+        channel.subscribers += 1
+        self._schedule_drop(job_id, channel)
+        last = last_event_id or 0
+        try:
+            while True:
+                for event in [e for e in channel.events if e["version"] > last]:
+                    last = event["version"]
+                    yield event
+                    if is_final(event):
+                        return
+                if channel.events and is_final(channel.events[-1]) and channel.latest <= last:
+                    # The client already has the final event
+                    return
+                if channel.latest > last:
+                    # Published while the last event was being sent
+                    continue
+                if channel.gone:
+                    return
+                try:
+                    await asyncio.wait_for(channel.changed.wait(), heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            channel.subscribers -= 1
+            self._schedule_drop(job_id, channel)
+
+    async def follow(self, job_id: str, load: Callable[[], Awaitable[Optional[JobEvent]]],
+                     last_event_id: Optional[int] = None, heartbeat_interval: float = 15.0,
+                     poll_interval: Optional[float] = None) -> AsyncIterator[Optional[JobEvent]]:
+        """
+        Yield a job's events like subscribe(), also picking up changes made by
+        processes the bus can't hear from.
+
+        While a job has followers, one task per job awaits `load()` for its
+        current view whenever the channel has been idle for `poll_interval`
+        seconds, and publishes it locally to every follower at once; they all
+        end if it returns None. Without a transport, other processes' changes
+        only arrive this way. With one, the store is only read every
+        `heartbeat_interval` seconds, as a fallback for lost messages. The
+        first follower's `load` and interval are used until the last one
+        leaves.
+
+        Args:
+            job_id: The job to follow.
+            load: Async function returning the job's view from the store.
+            last_event_id: Version of the last event the client received.
+            heartbeat_interval: Seconds between heartbeats (None) while idle.
+            poll_interval: Seconds between store reads while idle when there
+                is no transport. Defaults to `heartbeat_interval`.
+        """
+        if poll_interval is None or self.transport is not None:
+            poll_interval = heartbeat_interval
+        channel = self._channel(job_id)
+        channel.followers += 1
+        if channel.poller is None or channel.poller.done():
+            channel.poller = asyncio.create_task(
+                self._poll(job_id, channel, load, min(poll_interval, heartbeat_interval))
+            )
+        try:
+            async with contextlib.aclosing(self.subscribe(job_id, last_event_id, heartbeat_interval)) as events:
+                async for event in events:
+                    yield event
+        finally:
+            channel.followers -= 1
+            if channel.followers == 0 and channel.poller is not None:
+                channel.poller.cancel()
+                channel.poller = None
+            self._schedule_drop(job_id, channel)
+
+    async def _poll(self, job_id: str, channel: _Channel,
+                    load: Callable[[], Awaitable[Optional[JobEvent]]], interval: float):
+        """Publish a followed job's view from the store each time its channel is idle for `interval`."""
+        while True:
+            try:
+                await asyncio.wait_for(channel.changed.wait(), interval)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            try:
+                view = await load()
+            except Exception as e:
+                logger.warning(f"Could not read job {job_id} for its event stream: {e}")
+                continue
+            if view is None:
+                channel.gone = True
+                channel.wake()
+                return
+            self.publish(job_id, view, forward=False)
+            if is_final(view):
+                return
+
+    def subscriber_count(self) -> int:
+        """Number of active subscriptions across all jobs."""
+        return sum(channel.subscribers for channel in self._channels.values())
+
+    async def start(self):
+        """Start receiving events from other processes, if there is a transport."""
+        if self.transport is not None and self._listener is None:
+            self._listener = asyncio.create_task(self.transport.listen(self))
+
+    async def stop(self):
+        """Stop receiving events and close the transport."""
+        for channel in self._channels.values():
+            if channel.poller is not None:
+                channel.poller.cancel()
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self.transport is not None:
+            await self.transport.close()
+
+
+class RedisEventTransport:
+    """
+    Forwards job events between processes over a Redis pub/sub channel.
+
+    Delivery is best effort: a subscriber that misses a message still gets
+    the job's current state from the store at its next heartbeat (see
+    JobEventBus.follow).
+    """
+
+    def __init__(self, redis_url: str, channel: str = "prototech:job-events"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("The redis package is required for the Redis event transport")
+        self.channel = channel
+        self._redis = redis.from_url(redis_url)
+        # Lets a process ignore its own messages
+        self._origin = uuid.uuid4().hex
+        self._sends: Set[asyncio.Task] = set()
+
+    def send(self, job_id: str, event: JobEvent):
+        message = json.dumps({"origin": self._origin, "job_id": job_id, "event": event})
+        task = asyncio.create_task(self._send(message))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+
+    async def _send(self, message: str):
+        try:
+            await self._redis.publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"Could not forward job event: {e}")
+
+    async def listen(self, bus: JobEventBus):
+        """Publish events from other processes on `bus` until cancelled."""
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        data = json.loads(message["data"])
+                        if data["origin"] != self._origin:
+                            bus.publish(data["job_id"], data["event"], forward=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Job event subscription failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self):
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+        await self._redis.close()
+
+
+def create_event_transport(redis_url: str) -> Optional[RedisEventTransport]:
+    """Redis transport when a URL is configured, otherwise None (in-process only)."""
+    if not redis_url:
+        return None
+    return RedisEventTransport(redis_url)
+
+
+# Global job event bus instance
+job_events = JobEventBus(
+    history=settings.JOB_EVENTS_HISTORY,
+    transport=create_event_transport(settings.JOB_EVENTS_REDIS_URL),
+)
@@ -0,0 +1,555 @@
+# app/services/job_store.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+# Queue states. The user-facing `status` ("queued", "parsing", "rendering",
+# ...) is tracked separately so workers can report progress while they hold
+# a job.
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """A claimed job, as handed to a worker."""
+    id: str
+    kind: str
+    args: Dict[str, Any]
+    payload: Optional[bytes]
+    attempts: int
+    max_attempts: int
+    lease_owner: str
+    lease_expires_at: float
+
+
+@dataclass
+class JobStoreConfig:
+    """Retry and retention policy shared by all backends."""
+    max_attempts: int = 3
+    retry_backoff_seconds: float = 5.0
+    max_retry_backoff_seconds: float = 300.0
+    ttl_seconds: float = 24 * 3600
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff before attempt number `attempts + 1`."""
+        return min(self.retry_backoff_seconds * 2 ** max(attempts - 1, 0), self.max_retry_backoff_seconds)
+
+
+class JobStore(ABC):
+    """
+    Durable job store and queue.
+
+    Jobs are enqueued with JSON arguments and an optional binary payload.
+    Workers claim them under a time-limited lease, report progress, and
+    complete or fail them. A job whose lease runs out (its worker crashed or
+    hung) becomes claimable again. Failed attempts are retried with
+    exponential backoff until `max_attempts` is reached. Finished jobs are
+    purged once their TTL passes.
+    """
+
+    def __init__(self, config: Optional[JobStoreConfig] = None):
+        self.config = config or JobStoreConfig()
+
+    @abstractmethod
+    def enqueue(self, kind: str, args: Dict[str, Any], payload: Optional[bytes] = None,
+                job_id: Optional[str] = None, max_attempts: Optional[int] = None) -> str:
+        """Add a job and return its id."""
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float, kinds: Optional[List[str]] = None) -> Optional[Job]:
+        """
+        Atomically claim the oldest available job, or return None.
+
+        A job is available when it is queued and its retry delay has passed,
+        or when it is running under an expired lease.
+        """
+
+    @abstractmethod
+    def extend_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a held lease. Returns False if the worker no longer holds it."""
+
+    @abstractmethod
+    def update(self, job_id: str, worker_id: str, status: str, progress: Optional[int] = None,
+               preview: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Report progress on a held job, optionally with a JSON preview of its
+        result (shown until the job finishes). Returns False if the lease
+        was lost.
+        """
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Mark a held job completed with its JSON result."""
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Record a failed attempt. The job is queued again after a backoff
+        delay unless `retry` is False or it has no attempts left.
+        """
+
+    @abstractmethod
+    def release(self, job_id: str, worker_id: str, delay: float) -> bool:
+        """
+        Queue a held job again, claimable after `delay` seconds, without
+        counting the attempt; for work that was never started, e.g. because
+        the render pool was full. Returns False if the lease was lost.
+        """
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Public view of a job (status, progress, error, manifest, version), or
+        None. `version` goes up by one with every visible change to the job.
+        """
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Delete finished jobs past their TTL. Returns the number deleted."""
+        return len(self.purge_results(now))
+
+    @abstractmethod
+    def purge_results(self, now: Optional[float] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Delete finished jobs past their TTL. Returns the result (manifest or
+        last preview) of each job deleted, None for jobs without one, so
+        whatever the results point at can be released.
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs in each queue state."""
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store in a SQLite database in WAL mode.
+
+    Safe to share between processes on one host: status reads never block
+    on writers, and claims run in an IMMEDIATE transaction so two workers
+    can't take the same job.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            args TEXT NOT NULL,
+            payload BLOB,
+            state TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            result TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            available_at REAL NOT NULL,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL,
+            version INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, available_at);
+        CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (state, lease_expires_at);
+        CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+    """
+
+    def __init__(self, path: str, config: Optional[JobStoreConfig] = None):
+        super().__init__(config)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "version" not in columns:
+            # Databases created before job versions were tracked
+            conn.execute("ALTER TABLE jobs ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections aren't thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def enqueue(self, kind, args, payload=None, job_id=None, max_attempts=None):
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, args, payload, state, status, max_attempts,"
+                " available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(args), payload, QUEUED, QUEUED,
+                 max_attempts or self.config.max_attempts, now, now, now)
+            )
+        return job_id
+
+    def claim(self, worker_id, lease_seconds, kinds=None):
+        now = time.time()
+        kind_filter, kind_args = "", []
+        if kinds:
+            kind_filter = " AND kind IN ({})".format(", ".join("?" * len(kinds)))
+            kind_args = list(kinds)
+
+        with self._transaction() as conn:
+            # Jobs whose worker was lost on their last allowed attempt
+            conn.execute(
+                "UPDATE jobs SET state = ?, status = ?, error = ?, payload = NULL, lease_owner = NULL,"
+                " finished_at = ?, updated_at = ?, version = version + 1"
+                " WHERE state = ? AND lease_expires_at <= ?"
+                " AND attempts >= max_attempts",
+                (FAILED, FAILED, "Worker lost while processing the job", now, now, RUNNING, now)
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE ((state = ? AND available_at <= ?)"
+                " OR (state = ? AND lease_expires_at <= ?)){} ORDER BY available_at LIMIT 1".format(kind_filter),
+                [QUEUED, now, RUNNING, now] + kind_args
+            ).fetchone()
+            if row is None:
+                return None
+            expires = now + lease_seconds
+            conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_owner = ?,"
+                " lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, worker_id, expires, now, row["id"])
+            )
+            job = conn.execute(
+                "SELECT id, kind, args, payload, attempts, max_attempts FROM jobs WHERE id = ?",
+                (row["id"],)
+            ).fetchone()
+        return Job(id=job["id"], kind=job["kind"], args=json.loads(job["args"]), payload=job["payload"],
+                   attempts=job["attempts"], max_attempts=job["max_attempts"],
+                   lease_owner=worker_id, lease_expires_at=expires)
+
+    def _update_held(self, job_id, worker_id, assignments, values, visible=True):
+        if visible:
+            assignments += ", version = version + 1"
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET {}, updated_at = ? WHERE id = ? AND state = ? AND lease_owner = ?"
+                .format(assignments),
+                list(values) + [time.time(), job_id, RUNNING, worker_id]
+            )
+            return cursor.rowcount == 1
+
+    def extend_lease(self, job_id, worker_id, lease_seconds):
+        return self._update_held(job_id, worker_id, "lease_expires_at = ?", [time.time() + lease_seconds],
+                                 visible=False)
+
+    def update(self, job_id, worker_id, status, progress=None, preview=None):
+        assignments, values = "status = ?", [status]
+        if progress is not None:
+            assignments += ", progress = ?"
+            values.append(progress)
+        if preview is not None:
+            # Running jobs keep their preview where the result will go
+            assignments += ", result = ?"
+            values.append(json.dumps(preview))
+        return self._update_held(job_id, worker_id, assignments, values)
+
+    def complete(self, job_id, worker_id, result):
+        return self._update_held(
+            job_id, worker_id,
+            "state = ?, status = ?, progress = 100, result = ?, error = NULL, payload = NULL,"
+            " lease_owner = NULL, finished_at = ?",
+            [COMPLETED, COMPLETED, json.dumps(result), time.time()]
+        )
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND state = ? AND lease_owner = ?",
+                (job_id, RUNNING, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            if retry and row["attempts"] < row["max_attempts"]:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, status = ?, progress = 0, error = ?, lease_owner = NULL,"
+                    " lease_expires_at = NULL, available_at = ?, updated_at = ?, version = version + 1"
+                    " WHERE id = ?",
+                    (QUEUED, QUEUED, error, now + self.config.retry_delay(row["attempts"]), now, job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, status = ?, error = ?, payload = NULL, lease_owner = NULL,"
+                    " finished_at = ?, updated_at = ?, version = version + 1 WHERE id = ?",
+                    (FAILED, FAILED, error, now, now, job_id)
+                )
+        return True
+
+    def release(self, job_id, worker_id, delay):
+        now = time.time()
+        return self._update_held(
+            job_id, worker_id,
+            "state = ?, status = ?, progress = 0, attempts = attempts - 1, lease_owner = NULL,"
+            " lease_expires_at = NULL, available_at = ?",
+            [QUEUED, QUEUED, now + delay]
+        )
+
+    def get(self, job_id):
+        row = self._connection().execute(
+            "SELECT state, status, progress, error, result, version FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _public_view(row["state"], row["status"], row["progress"], row["error"],
+                            json.loads(row["result"]) if row["result"] else None, row["version"])
+
+    def purge_results(self, now=None):
+        cutoff = (now or time.time()) - self.config.ttl_seconds
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT result FROM jobs WHERE state IN (?, ?) AND finished_at <= ?", (COMPLETED, FAILED, cutoff)
+            ).fetchall()
+            conn.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND finished_at <= ?", (COMPLETED, FAILED, cutoff)
+            )
+        return [json.loads(row["result"]) if row["result"] else None for row in rows]
+
+    def stats(self):
+        rows = self._connection().execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+        counts.update({row["state"]: row["n"] for row in rows})
+        return counts
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+@dataclass
+class _MemoryJob:
+    id: str
+    kind: str
+    args: Dict[str, Any]
+    payload: Optional[bytes]
+    max_attempts: int
+    state: str = QUEUED
+    status: str = QUEUED
+    progress: int = 0
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    attempts: int = 0
+    available_at: float = field(default_factory=time.time)
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    version: int = 1
+
+
+class MemoryJobStore(JobStore):
+    """
+    In-process job store. Jobs are lost on restart and invisible to other
+    processes; meant for development and single-worker deployments.
+    """
+
+    def __init__(self, config: Optional[JobStoreConfig] = None):
+        super().__init__(config)
+        self._jobs: Dict[str, _MemoryJob] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, kind, args, payload=None, job_id=None, max_attempts=None):
+        job_id = job_id or str(uuid.uuid4())
+        with self._lock:
+            self._jobs[job_id] = _MemoryJob(job_id, kind, dict(args), payload,
+                                            max_attempts or self.config.max_attempts)
+        return job_id
+
+    def claim(self, worker_id, lease_seconds, kinds=None):
+        now = time.time()
+        with self._lock:
+            available = []
+            for job in self._jobs.values():
+                expired = job.state == RUNNING and job.lease_expires_at <= now
+                if expired and job.attempts >= job.max_attempts:
+                    self._finish(job, FAILED, "Worker lost while processing the job", now)
+                elif (job.state == QUEUED and job.available_at <= now) or expired:
+                    if not kinds or job.kind in kinds:
+                        available.append(job)
+            if not available:
+                return None
+            job = min(available, key=lambda j: j.available_at)
+            job.state = RUNNING
+            job.attempts += 1
+            job.lease_owner = worker_id
+            job.lease_expires_at = now + lease_seconds
+            return Job(job.id, job.kind, dict(job.args), job.payload, job.attempts,
+                       job.max_attempts, worker_id, job.lease_expires_at)
+
+    def _held(self, job_id, worker_id) -> Optional[_MemoryJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.state != RUNNING or job.lease_owner != worker_id:
+            return None
+        return job
+
+    def _finish(self, job, state, error, now):
+        job.version += 1
+        job.state = job.status = state
+        job.error = error
+        job.payload = None
+        job.lease_owner = None
+        job.finished_at = now
+
+    def extend_lease(self, job_id, worker_id, lease_seconds):
+        with self._lock:
+            job = self._held(job_id, worker_id)
+            if job is None:
+                return False
+            job.lease_expires_at = time.time() + lease_seconds
+            return True
+
+    def update(self, job_id, worker_id, status, progress=None, preview=None):
+        with self._lock:
+            job = self._held(job_id, worker_id)
+            if job is None:
+                return False
+            job.status = status
+            job.version += 1
+            if progress is not None:
+                job.progress = progress
+            if preview is not None:
+                job.result = preview
+            return True
+
+    def complete(self, job_id, worker_id, result):
+        with self._lock:
+            job = self._held(job_id, worker_id)
+            if job is None:
+                return False
+            self._finish(job, COMPLETED, None, time.time())
+            job.progress = 100
+            job.result = result
+            return True
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        now = time.time()
+        with self._lock:
+            job = self._held(job_id, worker_id)
+            if job is None:
+                return False
+            if retry and job.attempts < job.max_attempts:
+                job.version += 1
+                job.state = job.status = QUEUED
+                job.progress = 0
+                job.error = error
+                job.lease_owner = job.lease_expires_at = None
+                job.available_at = now + self.config.retry_delay(job.attempts)
+            else:
+                self._finish(job, FAILED, error, now)
+            return True
+
+    def release(self, job_id, worker_id, delay):
+        with self._lock:
+            job = self._held(job_id, worker_id)
+            if job is None:
+                return False
+            job.version += 1
+            job.state = job.status = QUEUED
+            job.progress = 0
+            job.attempts -= 1
+            job.lease_owner = job.lease_expires_at = None
+            job.available_at = time.time() + delay
+            return True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return _public_view(job.state, job.status, job.progress, job.error, job.result, job.version)
+
+    def purge_results(self, now=None):
+        cutoff = (now or time.time()) - self.config.ttl_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.state in (COMPLETED, FAILED) and job.finished_at <= cutoff]
+            return [self._jobs.pop(job_id).result for job_id in expired]
+
+    def stats(self):
+        counts = {QUEUED: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.state] += 1
+        return counts
+
+
+def _public_view(state, status, progress, error, result, version) -> Dict[str, Any]:
+    """
+    The fields /quotes/{job_id}/status has always returned, the preview of
+    an unfinished job, and the job's version.
+    """
+    return {
+        "status": status,
+        "progress": progress,
+        # The last attempt's error is only shown once no retry is left
+        "error": error if state == FAILED else None,
+        "manifest": result if state == COMPLETED else None,
+        "preview": result if state in (QUEUED, RUNNING) else None,
+        "version": version,
+    }
+
+
+def create_job_store(url: str, config: Optional[JobStoreConfig] = None) -> JobStore:
+    """
+    Create a job store from a URL: "sqlite:///path/to/jobs.db" or "memory://".
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):], config)
+    if url.startswith("memory://"):
+        return MemoryJobStore(config)
+    raise ValueError(f"Unsupported job store URL: {url}")
+
+
+# Global job store instance
+job_store = create_job_store(
+    settings.JOB_STORE_URL,
+    JobStoreConfig(
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        retry_backoff_seconds=settings.JOB_RETRY_BACKOFF_SECONDS,
+        ttl_seconds=settings.JOB_TTL_SECONDS,
+    )
+)
@@ -0,0 +1,238 @@
+# app/services/job_worker.py
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.services.job_events import JobEventBus
+from app.services.job_store import Job, JobStore
+from app.services.render_executor import RenderQueueFull
+
+logger = logging.getLogger(__name__)
+
+# Handler signature: await handler(job, report) -> JSON result, where
+# `await report(status, progress=None, preview=None)` publishes progress on
+# the job, and optionally a preview of its result (see JobStore.update).
+ProgressReporter = Callable[..., Awaitable[None]]
+JobHandler = Callable[[Job, ProgressReporter], Awaitable[Dict]]
+# Purge hook: on_purge(results) with the results of the jobs just purged,
+# run in a thread after every purge pass (see JobStore.purge_results)
+PurgeHook = Callable[[List[Dict[str, Any]]], None]
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that retrying can't fix, e.g. an invalid upload."""
+
+
+class LeaseLost(Exception):
+    """The worker no longer holds the job's lease; another worker may have claimed it."""
+
+
+class JobWorker:
+    """
+    Claims jobs from a JobStore and runs them with registered handlers.
+
+    Runs up to `concurrency` jobs at once. While a job runs its lease is
+    extended in the background; if the worker dies, the lease expires and
+    another worker picks the job up. Handler errors are retried with backoff
+    by the store, except PermanentJobError and ValueError. A job turned away
+    by a full render pool is queued again after `busy_retry_seconds`
+    without using up an attempt. With an event
+    bus, the job's view is published after every change. Every
+    `purge_interval` seconds expired jobs are purged and `on_purge` is
+    given their results, to release what they reference.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, JobHandler], concurrency: int = 1,
+                 lease_seconds: float = 60.0, poll_interval: float = 1.0,
+                 purge_interval: float = 600.0, worker_id: Optional[str] = None,
+                 events: Optional[JobEventBus] = None, on_purge: Optional[PurgeHook] = None,
+                 busy_retry_seconds: float = 2.0):
+        self.store = store
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self.busy_retry_seconds = busy_retry_seconds
+        self.events = events
+        self.on_purge = on_purge
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: Set[asyncio.Task] = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def wake(self):
+        """Check for work now instead of after the poll interval."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def stop(self):
+        """Stop claiming new jobs; run() returns once running jobs finish."""
+        self._stopping = True
+        self.wake()
+
+    async def run(self):
+        """Claim and process jobs until stop() is called."""
+        self._wake = asyncio.Event()
+        self._stopping = False
+        next_purge = 0.0
+        logger.info(f"Job worker {self.worker_id} started (concurrency {self.concurrency})")
+
+        while not self._stopping:
+            if time.time() >= next_purge:
+                await self._purge()
+                next_purge = time.time() + self.purge_interval
+
+            job = None
+            if len(self._tasks) < self.concurrency:
+                try:
+                    job = await asyncio.to_thread(
+                        self.store.claim, self.worker_id, self.lease_seconds, list(self.handlers)
+                    )
+                except Exception as e:
+                    logger.error(f"Job claim failed: {e}")
+            if job is not None:
+                task = asyncio.create_task(self._process(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._job_done)
+                continue
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info(f"Job worker {self.worker_id} stopped")
+
+    async def _purge(self):
+        try:
+            results = await asyncio.to_thread(self.store.purge_results)
+            if results:
+                logger.info(f"Purged {len(results)} expired jobs")
+            if self.on_purge is not None:
+                await asyncio.to_thread(self.on_purge, [result for result in results if result])
+        except Exception as e:
+            logger.error(f"Job purge failed: {e}")
+
+    def _job_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        # A slot is free; look for the next job straight away
+        self.wake()
+
+    async def _publish(self, job_id: str):
+        if self.events is None:
+            return
+        view = await asyncio.to_thread(self.store.get, job_id)
+        if view is not None:
+            self.events.publish(job_id, view)
+
+    async def _process(self, job: Job):
+        handler = self.handlers[job.kind]
+
+        async def report(status: str, progress: Optional[int] = None, preview: Optional[Dict] = None):
+            if not await asyncio.to_thread(self.store.update, job.id, self.worker_id, status, progress, preview):
+                raise LeaseLost(job.id)
+            await self._publish(job.id)
+
+        work = asyncio.create_task(handler(job, report))
+        heartbeat = asyncio.create_task(self._heartbeat(job, work))
+        try:
+            result = await work
+        except LeaseLost:
+            logger.warning(f"Job {job.id} lease lost; leaving it to its new owner")
+            return
+        except asyncio.CancelledError:
+            if self._stopping or not heartbeat.done():
+                raise
+            logger.warning(f"Job {job.id} lease lost; abandoned")
+            return
+        except RenderQueueFull as e:
+            # Backpressure, not a failure: the job never ran
+            logger.info(f"Job {job.id} deferred, render pool busy: {e}")
+            await asyncio.to_thread(self.store.release, job.id, self.worker_id, self.busy_retry_seconds)
+            await self._publish(job.id)
+            return
+        except (PermanentJobError, ValueError) as e:
+            logger.warning(f"Job {job.id} failed permanently: {e}")
+            await asyncio.to_thread(self.store.fail, job.id, self.worker_id, str(e), False)
+            await self._publish(job.id)
+            return
+        except Exception as e:
+            retry = job.attempts < job.max_attempts
+            logger.warning(f"Job {job.id} attempt {job.attempts}/{job.max_attempts} failed: {e}"
+                           + (" (will retry)" if retry else ""))
+            await asyncio.to_thread(self.store.fail, job.id, self.worker_id, str(e), True)
+            await self._publish(job.id)
+            return
+        finally:
+            heartbeat.cancel()
+
+        if not await asyncio.to_thread(self.store.complete, job.id, self.worker_id, result):
+            logger.warning(f"Job {job.id} finished after its lease was lost; result discarded")
+            return
+        await self._publish(job.id)
+
+    async def _heartbeat(self, job: Job, work: asyncio.Task):
+        """Extend the lease at a third of its length; cancel the work if it was lost."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                held = await asyncio.to_thread(self.store.extend_lease, job.id, self.worker_id,
+                                               self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Lease renewal for job {job.id} failed: {e}")
+                continue
+            if not held:
+                work.cancel()
+                return
+
+
+def create_job_worker(store: Optional[JobStore] = None) -> JobWorker:
+    """Job worker for the quote job handlers, configured from settings."""
+    from app.services.job_events import job_events
+    from app.services.job_store import job_store
+    from app.services.quote_jobs import HANDLERS, release_artifacts
+
+    return JobWorker(
+        store or job_store,
+        HANDLERS,
+        concurrency=settings.RENDER_WORKERS,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        events=job_events,
+        on_purge=release_artifacts,
+    )
+
+
+def main():
+    """Standalone worker: python -m app.services.job_worker"""
+    import signal
+    from app.services.job_events import job_events
+    from app.services.render_executor import render_executor
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    worker = create_job_worker()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        try:
+            await worker.run()
+        finally:
+            await job_events.stop()
+            render_executor.shutdown()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
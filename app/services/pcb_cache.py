@@ -0,0 +1,307 @@
+# app/services/pcb_cache.py
+
+import gc
+import hashlib
+import hmac
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import gerber
+from gerber import PCB
+
+from app.core.config import settings
+from app.core.monitoring.metrics import metrics
+
+# Bump when the on-disk layout changes
+CACHE_FORMAT = 2
+
+# Temporary files older than this were left by a writer that died
+STALE_TEMP_SECONDS = 3600
+
+
+def parser_version() -> str:
+    """
+    Version stamp of the Gerber parser. It changes whenever the parser's
+    source does, so boards parsed by older code are never reused.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(gerber.__file__).parent.glob("*.py")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return f"{CACHE_FORMAT}.{digest.hexdigest()[:16]}"
+
+
+def _check_private(path: Path):
+    """
+    Refuse a cache directory or key file that another user owns or can write
+    to, since anyone who can write entries can run code through unpickling.
+    """
+    info = path.stat()
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by uid {info.st_uid}, not {os.getuid()}")
+    if info.st_mode & 0o022:
+        raise PermissionError(f"{path} is writable by group or others (mode {info.st_mode & 0o777:o})")
+
+
+@contextmanager
+def _gc_paused():
+    # A board is hundreds of thousands of small objects; letting the cyclic
+    # GC run while they are (un)pickled roughly doubles the time taken
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class ParsedBoardCache:
+    """
+    Cache of parsed boards, keyed by the hash of the uploaded archive.
+
+    Re-quoting the same upload in another color or material reuses the
+    parsed PCB instead of parsing every layer again. Lookups try an
+    in-memory LRU of PCB objects, then a directory of compressed pickles
+    shared by all processes. Entries carry the parser version stamp; a
+    stamp mismatch counts as a miss and the stale file is removed. New
+    boards are written to disk in a background thread, so a miss costs no
+    more than the parse itself.
+
+    Cached boards are shared: callers must not modify them. Since entries
+    are unpickled, the cache directory must be owned by this service and
+    not writable by anyone else; a directory that isn't is refused and only
+    the memory tier is used. Each entry is also signed with an HMAC key and
+    its signature checked before it is unpickled.
+    """
+
+    def __init__(self, directory: Optional[str], memory_entries: int = 8,
+                 max_disk_bytes: int = 512 * 1024 * 1024, version: Optional[str] = None,
+                 secret: Optional[bytes] = None):
+        """
+        Args:
+            directory: Directory of the on-disk tier. None for memory only.
+            memory_entries: Boards kept in memory, least recently used dropped first.
+            max_disk_bytes: Size of the on-disk tier; oldest entries are removed past it.
+            version: Parser version stamp. Defaults to parser_version().
+            secret: HMAC key signing the on-disk entries. Defaults to a random
+                key kept in the cache directory, shared by every process using it.
+        """
+        self.directory = Path(directory) if directory else None
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.version = version or parser_version()
+        self._memory: "OrderedDict[str, PCB]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hit": 0, "disk_hit": 0, "miss": 0}
+        self._secret = secret
+        if self.directory is not None:
+            try:
+                self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+                _check_private(self.directory)
+                if self._secret is None:
+                    self._secret = self._load_secret()
+            except OSError as e:
+                print(f"⚠️ Parsed board cache directory refused, caching in memory only: {e}")
+                self.directory = None
+
+    def _load_secret(self) -> bytes:
+        """The signing key kept in the cache directory, created on first use."""
+        path = self.directory / ".key"
+        if not path.exists():
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-key-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(os.urandom(32))
+                # Linking fails if another process created the key first
+                os.link(temp_path, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(temp_path)
+        _check_private(path)
+        if path.stat().st_mode & 0o044:
+            raise PermissionError(f"{path} is readable by group or others")
+        return path.read_bytes()
+
+    def _sign(self, data: bytes) -> bytes:
+        message = self.version.encode() + b"\n" + data
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest().encode()
+
+    def key(self, archive: bytes, options: str = "") -> str:
+        """
+        Cache key of an archive. `options` distinguishes loads of the same
+        archive that can give different boards, e.g. layer renaming rules.
+        """
+        digest = hashlib.sha256(archive)
+        digest.update(options.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pcb"
+
+    def _record(self, result: str):
+        self._stats[result] += 1
+        metrics.record_pcb_cache(result)
+
+    def get(self, key: str) -> Optional[PCB]:
+        """The cached board for `key`, or None."""
+        with self._lock:
+            pcb = self._memory.get(key)
+            if pcb is not None:
+                self._memory.move_to_end(key)
+                self._record("memory_hit")
+                return pcb
+
+        pcb = self._read(key)
+        if pcb is None:
+            self._record("miss")
+            return None
+        self._remember(key, pcb)
+        self._record("disk_hit")
+        return pcb
+
+    def put(self, key: str, pcb: PCB, wait: bool = False):
+        """
+        Cache a freshly parsed board in both tiers. The board is pickled
+        before this returns, since rendering it fills lazy caches on its
+        layers and primitives; compressing and writing the pickle happen in
+        the background unless `wait` is set.
+        """
+        self._remember(key, pcb)
+        if self.directory is None:
+            return
+        data = self._dump(key, pcb)
+        if data is None:
+            return
+        if wait:
+            self._write(key, data)
+        else:
+            threading.Thread(target=self._write, args=(key, data), daemon=True,
+                             name="pcb-cache-write").start()
+
+    def get_or_load(self, archive: bytes, load: Callable[[], PCB], options: str = "") -> PCB:
+        """
+        The cached board for `archive`, or the result of `load()`, which is
+        then cached. Errors raised by `load` are not cached.
+        """
+        key = self.key(archive, options)
+        pcb = self.get(key)
+        if pcb is None:
+            pcb = load()
+            self.put(key, pcb)
+        return pcb
+
+    def stats(self) -> Dict[str, int]:
+        """Lookups by result in this process, and the boards held in memory."""
+        with self._lock:
+            return dict(self._stats, memory_entries=len(self._memory))
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, pcb: PCB):
+        with self._lock:
+            self._memory[key] = pcb
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[PCB]:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                stamp = f.readline().rstrip(b"\n").decode()
+                if stamp != self.version:
+                    raise ValueError(f"Parsed by parser version {stamp}")
+                signature = f.readline().rstrip(b"\n")
+                data = f.read()
+            if not hmac.compare_digest(signature, self._sign(data)):
+                raise ValueError("Signature mismatch")
+            data = zlib.decompress(data)
+            with _gc_paused():
+                pcb = pickle.loads(data)
+            os.utime(path)
+            return pcb
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Stale or damaged entry
+            print(f"⚠️ Dropping cached board {key[:16]}: {e}")
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            return None
+
+    def _dump(self, key: str, pcb: PCB) -> Optional[bytes]:
+        try:
+            with _gc_paused():
+                return pickle.dumps(pcb, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            # The disk tier is an optimization; never fail the request over it
+            print(f"⚠️ Could not cache parsed board {key[:16]}: {e}")
+            return None
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        try:
+            data = zlib.compress(data, 1)
+            path.parent.mkdir(mode=0o700, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.version.encode() + b"\n")
+                f.write(self._sign(data) + b"\n")
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception as e:
+            # The disk tier is an optimization; never fail the request over it
+            print(f"⚠️ Could not cache parsed board {key[:16]}: {e}")
+            return
+        self._enforce_quota()
+
+    def _enforce_quota(self):
+        stale = time.time() - STALE_TEMP_SECONDS
+        for path in self.directory.glob("*/.tmp-*"):
+            try:
+                if path.stat().st_mtime < stale:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+        entries = []
+        for path in self.directory.glob("*/*.pcb"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# Global parsed board cache instance (one memory tier per process, one shared disk tier)
+pcb_cache = ParsedBoardCache(
+    settings.PCB_CACHE_DIR or None,
+    memory_entries=settings.PCB_CACHE_MEMORY_ENTRIES,
+    max_disk_bytes=settings.PCB_CACHE_MAX_DISK_BYTES,
+    secret=settings.PCB_CACHE_SECRET.encode() or None,
+)
@@ -1,181 +1,161 @@
 # app/services/quote_generator.py
 
-import io
 import os
 import re
-import tempfile
-import zipfile
-import rarfile
-from typing import Tuple, Optional
+import threading
+import weakref
+from typing import Dict, List, Tuple, Optional
 
 from gerber import PCB
 from gerber.render import theme
 from gerber.render.cairo_backend import GerberCairoContext
-from gerber.exceptions import ParseError
+from gerber.render.composite import LayerMasks
+from gerber.exceptions import ArchiveError, ParseError
 
 from app.core.config import settings
 from app.schemas.pcb import BoardDimensions, PriceQuote, ManufacturingParameters,BaseMaterial
 from app.services.image_cache_service import image_cache
+from app.services.pcb_cache import pcb_cache
+from app.services.render_executor import report_progress
 from app.services.robust_pricing_service import RobustPricingService
+from app.utils.image_encoding import encode_sizes
+
+# Rasterized layer masks per board, as {(side, size limits, detail options):
+# LayerMasks}, used when settings.RENDER_COMPOSITE is on. Boards are shared
+# through pcb_cache, so a board re-quoted in another color or material is
+# only composited again, not rendered again. Entries go away with their board.
+_layer_masks: "weakref.WeakKeyDictionary[PCB, Dict[tuple, LayerMasks]]" = weakref.WeakKeyDictionary()
+_layer_masks_lock = threading.Lock()
+
 
 class QuoteGenerator:
     """
     Processes a Gerber ZIP or RAR, calculates dimensions, renders images,
     and generates a price quote.
     """
-    def __init__(self, archive_content: bytes, filename: str, params: ManufacturingParameters):
+    def __init__(self, archive_content: bytes, filename: str, params: ManufacturingParameters,
+                 parse_workers: Optional[int] = None):
         self._archive_content = archive_content
         self._filename = filename
         self._params = params
+        # Processes used to parse the archive's layer files
+        self._parse_workers = settings.PCB_PARSE_WORKERS if parse_workers is None else parse_workers
         self._pcb: Optional[PCB] = None
         self._dimensions: Optional[BoardDimensions] = None
 
+    # Compatibility renames, applied to archive member names before the
+    # layer class is guessed. More specific patterns first.
+    COMPATIBILITY_RENAMES = {
+        r'.*top copper.*\.gbr': '.gtl',
+        r'.*bottom copper.*\.gbr': '.gbl',
+        r'.*top solder resist.*\.gbr': '.gts',
+        r'.*bottom solder resist.*\.gbr': '.gbs',
+        r'.*top silk screen.*\.gbr': '.gto',
+        r'.*bottom silk screen.*\.gbr': '.gbo',
+        r'.*drill.*\.gbr': '.drl',
+        r'.*mechanical.*\.gbr': '.gm1',
+        r'.*outline.*\.gbr': '.gm1',
+        r'.*soldermask_top.*\.gbr': '.gts',
+        r'.*soldermask_bot.*\.gbr': '.gbs',
+        r'.*legend_top.*\.gbr': '.gto',
+        r'.*legend_bot.*\.gbr': '.gbo',
+        r'.*paste_top.*\.gbr': '.gtp',
+        r'.*paste_bot.*\.gbr': '.gbp',
+        r'.*profile.*\.gbr': '.gm1',
+        r'.*keep-out.*\.gbr': '.gm1',
+        # For files that are just .gbr, we can try to guess based on common names
+        r'top\.gbr': '.gtl',
+        r'bottom\.gbr': '.gbl',
+        r'topsolder\.gbr': '.gts',
+        r'bottomsolder\.gbr': '.gbs',
+        r'topsilk\.gbr': '.gto',
+        r'bottomsilk\.gbr': '.gbo',
+        r'drill\.gbr': '.drl',
+        r'outline\.gbr': '.gm1',
+    }
+
+    # Progressive rendering: previews fit in PREVIEW_SIZE x PREVIEW_SIZE
+    # pixels and leave out primitives smaller than PREVIEW_MIN_FEATURE pixels
+    PREVIEW_SIZE = 256
+    PREVIEW_MIN_FEATURE = 1.0
+    # Level of detail of full renders (see GerberCairoContext); off, so
+    # every primitive is drawn exactly. 1.0 merges primitives under a pixel
+    # both ways into dot fills and flattens curves to a quarter pixel.
+    RENDER_LOD = 0.0
+    # Base/mask artifact sizes, each with its Pillow format and save options.
+    # WebP `method` is the encoder effort (settings.ARTIFACT_WEBP_METHOD).
+    ARTIFACT_ENCODINGS = {
+        256: ('WEBP', {'quality': 85, 'method': settings.ARTIFACT_WEBP_METHOD}),
+        1024: ('PNG', {}),
+    }
+
     def process(self) -> Tuple[bytes, bytes, Optional[BoardDimensions], Optional[PriceQuote]]:
         """Main processing method."""
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            self._extract_archive(tmpdirname)
-            
-            gerber_source_path = self._find_gerber_path(tmpdirname)
-            
-            # --- NEW: Rename files for compatibility ---
-            self._rename_files_for_compatibility(gerber_source_path)
-            
-            self._load_pcb(gerber_source_path)
-            
-            top_image_bytes, bottom_image_bytes = self._render_images()
-            self._calculate_dimensions()
-            price_quote = self._calculate_price()
+        self._load_pcb()
+
+        top_image_bytes, bottom_image_bytes = self._render_images()
+        self._calculate_dimensions()
+        price_quote = self._calculate_price()
 
-            return top_image_bytes, bottom_image_bytes, self._dimensions, price_quote
+        return top_image_bytes, bottom_image_bytes, self._dimensions, price_quote
 
     def process_quote_only(self) -> Tuple[Optional[BoardDimensions], Optional[PriceQuote]]:
         """Processes the archive to get dimensions and a price quote without rendering images."""
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            self._extract_archive(tmpdirname)
-            gerber_source_path = self._find_gerber_path(tmpdirname)
-            self._rename_files_for_compatibility(gerber_source_path)
-            self._load_pcb(gerber_source_path)
-            self._calculate_dimensions()
-            price_quote = self._calculate_price()
-                
-        return self._dimensions, price_quote
+        self._load_pcb()
+        self._calculate_dimensions()
+        price_quote = self._calculate_price()
 
-    def _extract_archive(self, target_dir: str):
-        archive_in_memory = io.BytesIO(self._archive_content)
-        if self._filename.lower().endswith('.zip'):
-            try:
-                with zipfile.ZipFile(archive_in_memory, 'r') as zip_ref:
-                    zip_ref.extractall(target_dir)
-            except zipfile.BadZipFile:
-                raise ValueError("Uploaded file is not a valid ZIP archive.")
-        elif self._filename.lower().endswith('.rar'):
-            try:
-                with rarfile.RarFile(archive_in_memory, 'r') as rar_ref:
-                    rar_ref.extractall(target_dir)
-            except rarfile.BadRarFile:
-                raise ValueError("Uploaded file is not a valid RAR archive.")
-        else:
-            raise ValueError("Unsupported archive type.")
+        return self._dimensions, price_quote
 
-    def _find_gerber_path(self, source_dir: str) -> str:
+    def _compatible_name(self, filename: str) -> Optional[str]:
         """
-        Determines the correct directory containing Gerber files.
-        It handles cases where files are in the root or in a single sub-directory.
+        Returns the name a Gerber file should be classified by, or None for
+        files that are not supported. The archive itself is never modified.
         """
-        dir_contents = os.listdir(source_dir)
-
-        # Ignore common junk folders like __MACOSX
-        dir_contents = [item for item in dir_contents if item != '__MACOSX']
-        
-        # Check for Gerber files in the root directory first
-        gerber_extensions = ('.gbr', '.gbl', '.gtl', '.gbs', '.gts', '.gbo', '.gto', '.drl', '.txt', '.gm1')
-        for item in dir_contents:
-            if item.lower().endswith(gerber_extensions):
-                # Found Gerber files in the root, so this is the correct path
-                return source_dir
-
-        # If no gerbers in root, check for a single subdirectory
-        subdirectories = [os.path.join(source_dir, item) for item in dir_contents if os.path.isdir(os.path.join(source_dir, item))]
-        
-        if len(subdirectories) == 1:
-            # Exactly one subdirectory found, assume the files are in there.
-            return subdirectories[0]
+        if filename.lower().endswith('.ipc'):
+            print(f"INFO: Skipped unsupported file: {filename}")
+            return None
 
-        # If multiple subdirectories or no Gerbers found, return the original path
-        # and let the _load_pcb method handle the potential error.
-        return source_dir
+        for pattern, new_ext in self.COMPATIBILITY_RENAMES.items():
+            if re.match(pattern, filename.lower()): # Match case-insensitively
+                # Keep the original name but change extension
+                new_filename = os.path.splitext(filename)[0] + new_ext
+                print(f"INFO: Reading {filename} as {new_filename} for layer detection")
+                return new_filename
+        return filename
 
-    def _rename_files_for_compatibility(self, source_dir: str):
+    def _load_pcb(self):
         """
-        Renames Gerber files based on their names to improve compatibility.
-        """
-        # More specific patterns first
-        rename_map = {
-            r'.*top copper.*\.gbr': '.gtl',
-            r'.*bottom copper.*\.gbr': '.gbl',
-            r'.*top solder resist.*\.gbr': '.gts',
-            r'.*bottom solder resist.*\.gbr': '.gbs',
-            r'.*top silk screen.*\.gbr': '.gto',
-            r'.*bottom silk screen.*\.gbr': '.gbo',
-            r'.*drill.*\.gbr': '.drl',
-            r'.*mechanical.*\.gbr': '.gm1',
-            r'.*outline.*\.gbr': '.gm1',
-            r'.*soldermask_top.*\.gbr': '.gts',
-            r'.*soldermask_bot.*\.gbr': '.gbs',
-            r'.*legend_top.*\.gbr': '.gto',
-            r'.*legend_bot.*\.gbr': '.gbo',
-            r'.*paste_top.*\.gbr': '.gtp',
-            r'.*paste_bot.*\.gbr': '.gbp',
-            r'.*profile.*\.gbr': '.gm1',
-            r'.*keep-out.*\.gbr': '.gm1',
-            # For files that are just .gbr, we can try to guess based on common names
-            r'top\.gbr': '.gtl',
-            r'bottom\.gbr': '.gbl',
-            r'topsolder\.gbr': '.gts',
-            r'bottomsolder\.gbr': '.gbs',
-            r'topsilk\.gbr': '.gto',
-            r'bottomsilk\.gbr': '.gbo',
-            r'drill\.gbr': '.drl',
-            r'outline\.gbr': '.gm1',
-        }
-  
-
-        for filename in os.listdir(source_dir):
-            if filename.lower().endswith('.ipc'):
-                os.remove(os.path.join(source_dir, filename))
-                print(f"INFO: Removed unsupported file: {filename}")
-                continue
-
-            for pattern, new_ext in rename_map.items():
-                if re.match(pattern, filename.lower()): # Match case-insensitively
-                    old_path = os.path.join(source_dir, filename)
-                    # Keep the original name but change extension
-                    new_filename = os.path.splitext(filename)[0] + new_ext
-                    new_path = os.path.join(source_dir, new_filename)
-                    try:
-                        os.rename(old_path, new_path)
-                        print(f"INFO: Renamed for compatibility: {filename} -> {new_filename}")                        
-                    except OSError as e:
-                        print(f"WARNING: Could not rename {filename}: {e}")                        
-                    break
-
-    def _load_pcb(self, source_dir: str):
-        """
-        Loads the PCB from the given source directory.
-        This directory should be the one containing the actual Gerber files.
+        Loads the PCB straight from the uploaded archive, without extracting it.
+        Uses the files in the archive root, or in its single sub-folder.
         """
+        if not self._filename.lower().endswith(('.zip', '.rar')):
+            raise ValueError("Unsupported archive type.")
+        # Re-quotes of the same upload (e.g. another color) reuse the parsed board
+        self._pcb = pcb_cache.get_or_load(self._archive_content, self._parse_archive,
+                                          options=repr(self.COMPATIBILITY_RENAMES))
+
+    def _parse_archive(self) -> PCB:
+        """Parses the uploaded archive into a PCB."""
         try:
-            self._pcb = PCB.from_directory(source_dir)
-            if not self._pcb.layers:
+            pcb = PCB.from_archive(
+                self._archive_content,
+                workers=self._parse_workers,
+                rename=self._compatible_name,
+                max_members=settings.ARCHIVE_MAX_MEMBERS,
+                max_size=settings.ARCHIVE_MAX_UNCOMPRESSED_BYTES,
+            )
+            if not pcb.layers:
                 # This error is now much more accurate
                 raise ValueError("No valid Gerber or Excellon layers found in the ZIP file. Please ensure files are in the root or a single subfolder.")
+        except ArchiveError as e:
+            raise ValueError(f"Uploaded file is not a usable archive. Error: {e}")
         except (ParseError, Exception) as e:
             # Check if the original error was due to no layers found and enhance the message
             if "No valid Gerber or Excellon layers found" in str(e):
                  raise ValueError("No valid Gerber or Excellon layers found in the ZIP file. Please ensure files are in the root or a single subfolder.")
             raise ValueError(f"Failed to parse Gerber files. Error: {e}")
-
-    # --- NO CHANGES BELOW THIS LINE ---
+        return pcb
 
     def _render_images(self) -> Tuple[bytes, bytes]:
         if not self._pcb: raise RuntimeError("PCB must be loaded before rendering.")
@@ -244,12 +224,8 @@ class QuoteGenerator:
         print(f"🎨 Generating new images for {effective_color} PCB...")
         theme_to_use = theme.THEMES.get(theme_name, theme.THEMES['default'])
         
-        ctx = GerberCairoContext()
-        ctx.render_layers(self._pcb.top_layers, filename=None, theme=theme_to_use, max_width=1024)
-        top_image_bytes = ctx.dump(None)
-        ctx.clear()
-        ctx.render_layers(self._pcb.bottom_layers, filename=None, theme=theme_to_use, max_width=1024)
-        bottom_image_bytes = ctx.dump(None)
+        top_image_bytes = self._render_png('top', theme_to_use, 1024)
+        bottom_image_bytes = self._render_png('bottom', theme_to_use, 1024)
         
         # --- CACHE THE NEW IMAGES ---
         # Cache the newly generated images for future use (use effective color for cache key)
@@ -263,10 +239,128 @@ class QuoteGenerator:
         
         return top_image_bytes, bottom_image_bytes
 
+    def _side_layers(self, side: str) -> list:
+        """
+        Layers of one side of the board, in drawing order.
+
+        Args:
+            side: 'top' or 'bottom'
+        """
+        if side == 'top':
+            return self._pcb.top_layers
+        elif side == 'bottom':
+            return self._pcb.bottom_layers
+        raise ValueError(f"Invalid side: {side}. Must be 'top' or 'bottom'")
+
+    def _render_context(self, side: str, board_theme, max_width: int, max_height: int = 600,
+                        min_feature: float = 0.0, tiles: Optional[int] = None) -> GerberCairoContext:
+        """
+        Render one side of the board in `board_theme` with render_layers.
+
+        Args:
+            side: 'top' or 'bottom'
+            board_theme: Theme to render in
+            max_width: Maximum width of the image
+            max_height: Maximum height of the image
+            min_feature: Leave out primitives smaller than this many pixels both ways
+            tiles: Strips each layer is rasterized as in parallel. Defaults to
+                settings.RENDER_TILES.
+
+        Returns:
+            GerberCairoContext: Holding the rendered image
+        """
+        ctx = GerberCairoContext(raster=True, min_feature=min_feature, lod=self.RENDER_LOD,
+                                 tiles=settings.RENDER_TILES if tiles is None else tiles)
+        ctx.render_layers(self._side_layers(side), filename=None, theme=board_theme,
+                          max_width=max_width, max_height=max_height)
+        return ctx
+
+    def _render_png(self, side: str, board_theme, max_width: int, max_height: int = 600,
+                    min_feature: float = 0.0, tiles: Optional[int] = None) -> bytes:
+        """
+        Render one side of the board in `board_theme` as a PNG.
+
+        With settings.RENDER_COMPOSITE the image is composited from the
+        board's shared layer masks, otherwise it is a full render_layers.
+        Arguments as for _render_context.
+        """
+        if settings.RENDER_COMPOSITE:
+            masks = self._layer_masks(side, max_width, max_height, min_feature, tiles=tiles)
+            return masks.dump(board_theme)
+        return self._render_context(side, board_theme, max_width, max_height, min_feature, tiles).dump(None)
+
+    def _render_pixels(self, side: str, board_theme, max_width: int) -> tuple:
+        """
+        Render one side of the board in `board_theme` as raw pixels.
+
+        Args:
+            side: 'top' or 'bottom'
+            board_theme: Theme to render in
+            max_width: Maximum width of the image
+
+        Returns:
+            (pixels, width, height, stride) of cairo ARGB32 pixels, as
+            encode_sizes takes them
+        """
+        if settings.RENDER_COMPOSITE:
+            masks = self._layer_masks(side, max_width)
+            return masks.composite(board_theme), masks.width, masks.height, None
+        surface = self._render_context(side, board_theme, max_width).surface
+        surface.flush()
+        return surface.get_data(), surface.get_width(), surface.get_height(), surface.get_stride()
+
+    def _layer_masks(self, side: str, max_width: int, max_height: int = 600,
+                     min_feature: float = 0.0, lod: Optional[float] = None,
+                     tiles: Optional[int] = None) -> LayerMasks:
+        """
+        Layer masks of one side of the board, laid out as render_layers
+        lays them out for `max_width` and `max_height`. Any theme is
+        composited from them.
+
+        Args:
+            side: 'top' or 'bottom'
+            max_width: Maximum width of the images
+            max_height: Maximum height of the images
+            min_feature: Leave out primitives smaller than this many pixels both ways
+            lod: Level of detail, see GerberCairoContext. Defaults to RENDER_LOD.
+            tiles: Strips each mask is rasterized as in parallel. Defaults to
+                settings.RENDER_TILES; only used when the masks are created.
+
+        Returns:
+            LayerMasks: Shared with every other quote of the same board
+        """
+        layers = self._side_layers(side)
+        lod = self.RENDER_LOD if lod is None else lod
+        key = (side, max_width, max_height, min_feature, lod)
+        with _layer_masks_lock:
+            board_masks = _layer_masks.setdefault(self._pcb, {})
+            masks = board_masks.get(key)
+            if masks is None:
+                masks = board_masks[key] = LayerMasks(layers, max_width=max_width, max_height=max_height,
+                                                      min_feature=min_feature, lod=lod,
+                                                      tiles=settings.RENDER_TILES if tiles is None else tiles)
+        return masks
+
     # ===================================================================
     #  NEW: Base/Mask Rendering Methods
     # ===================================================================
     
+    def _base_mask_theme_names(self) -> Tuple[str, str]:
+        """
+        Names of the base and mask themes for the selected base material.
+
+        Returns:
+            (base_theme_name, mask_theme_name)
+        """
+        material = self._params.base_material
+        
+        if material == BaseMaterial.flex:
+            return 'Base_Flex', 'Mask_Flex'
+        elif material == BaseMaterial.aluminum:
+            return 'Base_Aluminum', 'Mask'
+        else:  # FR-4 and others
+            return 'Base', 'Mask'
+
     def _render_base_and_mask_layers(self, side: str, max_width: int = 1024) -> Tuple[bytes, bytes]:
         """
         Render base layer (no mask) and mask layer separately for client-side recoloring.
@@ -281,83 +375,46 @@ class QuoteGenerator:
         if not self._pcb:
             raise RuntimeError("PCB must be loaded before rendering.")
         
-        # Get the appropriate layers based on side
-        if side == 'top':
-            layers = self._pcb.top_layers
-            side_label = "top"
-        elif side == 'bottom':
-            layers = self._pcb.bottom_layers
-            side_label = "bottom"
-        else:
-            raise ValueError(f"Invalid side: {side}. Must be 'top' or 'bottom'")
+        side_label = side
         
-        # Determine material-specific theme names
-        material = self._params.base_material
-        
-        if material == BaseMaterial.flex:
-            base_theme_name = 'Base_Flex'
-            mask_theme_name = 'Mask_Flex'
-        elif material == BaseMaterial.aluminum:
-            base_theme_name = 'Base_Aluminum'
-            mask_theme_name = 'Mask'
-        else:  # FR-4 and others
-            base_theme_name = 'Base'
-            mask_theme_name = 'Mask'
+        base_theme_name, mask_theme_name = self._base_mask_theme_names()
         
         print(f"🎨 Rendering {side_label} base layer with theme: {base_theme_name}")
         
         # Render base layer (everything except solder mask)
         base_theme = theme.THEMES.get(base_theme_name, theme.THEMES['Base'])
-        base_ctx = GerberCairoContext()
-        base_ctx.render_layers(layers, filename=None, theme=base_theme, max_width=max_width)
-        base_image_bytes = base_ctx.dump(None)
+        base_image_bytes = self._render_png(side, base_theme, max_width)
         
         print(f"🎭 Rendering {side_label} mask layer with theme: {mask_theme_name}")
         
         # Render mask layer (only solder mask)
         mask_theme = theme.THEMES.get(mask_theme_name, theme.THEMES['Mask'])
-        mask_ctx = GerberCairoContext()
-        mask_ctx.render_layers(layers, filename=None, theme=mask_theme, max_width=max_width)
-        mask_image_bytes = mask_ctx.dump(None)
+        mask_image_bytes = self._render_png(side, mask_theme, max_width)
         
         print(f"✅ Successfully rendered {side_label} base and mask layers")
         return base_image_bytes, mask_image_bytes
     
-    def _downscale_image(self, image_bytes: bytes, target_size: int) -> bytes:
+    def _encode_artifacts(self, pixels, width: int, height: int,
+                          stride: Optional[int] = None) -> Dict[int, bytes]:
         """
-        Downscale image to target size maintaining aspect ratio.
+        Encode a composited image at every ARTIFACT_ENCODINGS size.
         
         Args:
-            image_bytes: Original image bytes
-            target_size: Target size in pixels
+            pixels: cairo ARGB32 pixels, as _render_pixels returns them
+            width: Image width in pixels
+            height: Image height in pixels
+            stride: Bytes per row, defaults to width * 4
             
         Returns:
-            Downscaled image bytes
+            Encoded image bytes by size
         """
         try:
-            from PIL import Image
-            
-            img = Image.open(io.BytesIO(image_bytes))
-            img.thumbnail((target_size, target_size), Image.Resampling.LANCZOS)
-            
-            buffer = io.BytesIO()
-            # Save as WebP if possible, fallback to PNG
-            try:
-                img.save(buffer, format='WEBP', quality=85, method=6)
-                print(f"📦 Saved as WebP ({target_size}px)")
-            except Exception as e:
-                print(f"⚠️ WebP failed ({e}), falling back to PNG")
-                img.save(buffer, format='PNG', optimize=True)
-                print(f"📦 Saved as PNG ({target_size}px)")
-            
-            return buffer.getvalue()
-            
-        except ImportError:
-            print("⚠️ PIL not available, returning original image")
-            return image_bytes
-        except Exception as e:
-            print(f"⚠️ Downscaling failed: {e}, returning original image")
-            return image_bytes
+            return encode_sizes(pixels, width, height, self.ARTIFACT_ENCODINGS, stride)
+        except (OSError, KeyError, ValueError) as e:
+            # e.g. Pillow built without WebP support
+            print(f"⚠️ Encoding failed ({e}), falling back to PNG")
+            return encode_sizes(pixels, width, height,
+                                {size: ('PNG', {}) for size in self.ARTIFACT_ENCODINGS}, stride)
     
     def _generate_cache_key_v2(self, file_hash: str, side: str, size: int, variant: str) -> str:
         """
@@ -375,6 +432,58 @@ class QuoteGenerator:
         render_version = "v2"
         return f"{file_hash[:16]}.{render_version}.{side}.{size}.{variant}"
     
+    def _sides(self) -> List[str]:
+        """
+        Sides of the board that have layers to render.
+
+        Returns:
+            'top' and/or 'bottom'
+        """
+        sides = []
+        if self._pcb.has_top_layers():
+            sides.append('top')
+        if self._pcb.has_bottom_layers():
+            sides.append('bottom')
+        
+        if not sides:
+            raise RuntimeError("No PCB layers found")
+        return sides
+
+    def generate_preview_artifacts(self, file_hash: str) -> dict:
+        """
+        Quickly render low-resolution base/mask previews of both sides.
+
+        Previews are rendered straight at PREVIEW_SIZE instead of being
+        downscaled from the full render, and leave out primitives smaller
+        than PREVIEW_MIN_FEATURE pixels. They are shown while the full
+        artifacts render.
+        
+        Args:
+            file_hash: Hash of the uploaded file
+            
+        Returns:
+            Dictionary of preview artifacts, named "<side>.<variant>.preview"
+        """
+        if not self._pcb:
+            raise RuntimeError("PCB must be loaded before generating artifacts.")
+        
+        base_theme_name, mask_theme_name = self._base_mask_theme_names()
+        base_theme = theme.THEMES.get(base_theme_name, theme.THEMES['Base'])
+        mask_theme = theme.THEMES.get(mask_theme_name, theme.THEMES['Mask'])
+        
+        artifacts = {}
+        for side in self._sides():
+            for variant, variant_theme in (('base', base_theme), ('mask', mask_theme)):
+                artifacts[f"{side}.{variant}.preview"] = {
+                    'data': self._render_png(side, variant_theme, self.PREVIEW_SIZE, self.PREVIEW_SIZE,
+                                             self.PREVIEW_MIN_FEATURE, tiles=1),
+                    'cache_key': self._generate_cache_key_v2(file_hash, side, self.PREVIEW_SIZE,
+                                                             f"{variant}.preview"),
+                    'size': self.PREVIEW_SIZE,
+                    'type': variant
+                }
+        return artifacts
+
     def generate_base_mask_artifacts(self, file_hash: str) -> dict:
         """
         Generate all base/mask artifacts for both sides and sizes.
@@ -390,59 +499,30 @@ class QuoteGenerator:
         
         print("🚀 Starting base/mask artifact generation...")
         
-        # Determine which sides exist
-        sides = []
-        if self._pcb.has_top_layers():
-            sides.append('top')
-        if self._pcb.has_bottom_layers():
-            sides.append('bottom')
-        
-        if not sides:
-            raise RuntimeError("No PCB layers found")
-        
+        sides = self._sides()
         print(f"📋 Found sides: {sides}")
         
         artifacts = {}
         
+        base_theme_name, mask_theme_name = self._base_mask_theme_names()
+        base_theme = theme.THEMES.get(base_theme_name, theme.THEMES['Base'])
+        mask_theme = theme.THEMES.get(mask_theme_name, theme.THEMES['Mask'])
+        
         for side in sides:
             print(f"🎯 Processing {side} side...")
             
-            # Render at full resolution first
-            base_1024, mask_1024 = self._render_base_and_mask_layers(side, 1024)
-            
-            # Generate smaller versions
-            print(f"📐 Downscaling {side} images to 256px...")
-            base_256 = self._downscale_image(base_1024, 256)
-            mask_256 = self._downscale_image(mask_1024, 256)
-            
-            # Store artifacts with cache keys
-            artifacts[f"{side}.base.256"] = {
-                'data': base_256,
-                'cache_key': self._generate_cache_key_v2(file_hash, side, 256, 'base'),
-                'size': 256,
-                'type': 'base'
-            }
-            
-            artifacts[f"{side}.base.1024"] = {
-                'data': base_1024,
-                'cache_key': self._generate_cache_key_v2(file_hash, side, 1024, 'base'),
-                'size': 1024,
-                'type': 'base'
-            }
-            
-            artifacts[f"{side}.mask.256"] = {
-                'data': mask_256,
-                'cache_key': self._generate_cache_key_v2(file_hash, side, 256, 'mask'),
-                'size': 256,
-                'type': 'mask'
-            }
-            
-            artifacts[f"{side}.mask.1024"] = {
-                'data': mask_1024,
-                'cache_key': self._generate_cache_key_v2(file_hash, side, 1024, 'mask'),
-                'size': 1024,
-                'type': 'mask'
-            }
+            # Render each variant once at full resolution and encode every
+            # size from its pixels
+            for variant, variant_theme in (('base', base_theme), ('mask', mask_theme)):
+                encoded = self._encode_artifacts(*self._render_pixels(side, variant_theme,
+                                                                      max(self.ARTIFACT_ENCODINGS)))
+                for size, data in encoded.items():
+                    artifacts[f"{side}.{variant}.{size}"] = {
+                        'data': data,
+                        'cache_key': self._generate_cache_key_v2(file_hash, side, size, variant),
+                        'size': size,
+                        'type': variant
+                    }
             
             print(f"✅ Completed {side} side artifacts")
         
@@ -508,4 +588,31 @@ class QuoteGenerator:
                     "material": str(self._params.base_material),
                     "quantity": getattr(self._params, 'quantity', 1)
                 }
-            )
\ No newline at end of file
+            )
+
+# --- Render pool jobs ---
+# Module-level so the render executor can send them to its worker processes.
+
+def run_full_quote(archive_content: bytes, filename: str, params: ManufacturingParameters
+                   ) -> Tuple[bytes, bytes, Optional[BoardDimensions], Optional[PriceQuote]]:
+    """Parses, renders and prices an archive. See QuoteGenerator.process."""
+    return QuoteGenerator(archive_content, filename, params).process()
+
+
+def run_quote_only(archive_content: bytes, filename: str, params: ManufacturingParameters
+                   ) -> Tuple[Optional[BoardDimensions], Optional[PriceQuote]]:
+    """Parses and prices an archive. See QuoteGenerator.process_quote_only."""
+    return QuoteGenerator(archive_content, filename, params).process_quote_only()
+
+
+def run_quote_v2_artifacts(archive_content: bytes, filename: str, params: ManufacturingParameters,
+                           file_hash: str) -> dict:
+    """
+    Parses an archive once, reports its low-resolution previews with
+    report_progress, then renders and returns its base/mask artifacts.
+    See generate_preview_artifacts and generate_base_mask_artifacts.
+    """
+    quote_gen = QuoteGenerator(archive_content, filename, params)
+    quote_gen._load_pcb()
+    report_progress(quote_gen.generate_preview_artifacts(file_hash))
+    return quote_gen.generate_base_mask_artifacts(file_hash)
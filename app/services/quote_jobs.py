@@ -0,0 +1,127 @@
+# app/services/quote_jobs.py
+
+import asyncio
+import hashlib
+from typing import Dict, List
+
+from app.schemas.pcb import ManufacturingParameters
+from app.services.artifact_store import StoredArtifact, artifact_store
+from app.services.job_store import Job, JobStore
+from app.services.job_worker import PermanentJobError, ProgressReporter
+from app.services.quote_generator import run_quote_v2_artifacts
+from app.services.render_executor import render_executor
+
+# Job kinds
+QUOTE_V2 = "quote_v2"
+
+# Where the API serves a job's stored artifacts
+ARTIFACT_URL = "/api/v1/pcb/quotes/{job_id}/artifacts/{name}"
+
+
+def enqueue_quote_v2(store: JobStore, archive_content: bytes, filename: str,
+                     params: ManufacturingParameters) -> str:
+    """Queue a /quotes/v2 render job; the archive is stored with the job."""
+    return store.enqueue(
+        QUOTE_V2,
+        {"filename": filename, "params": params.model_dump(mode="json")},
+        payload=archive_content,
+    )
+
+
+def store_artifacts(artifacts: Dict[str, Dict]) -> Dict[str, StoredArtifact]:
+    """Put rendered artifacts in the artifact store, by name."""
+    return {name: artifact_store.put(artifact['data']) for name, artifact in artifacts.items()}
+
+
+def release_artifacts(results: List[Dict]):
+    """
+    Purge hook of the quote job worker: delete the artifacts of purged jobs,
+    then any others past their TTL, e.g. previews of jobs that never finished.
+    """
+    digests = {info["sha256"] for result in results for info in (result.get("artifacts") or {}).values()}
+    removed = artifact_store.remove(digests) + artifact_store.cleanup_expired()
+    if removed:
+        print(f"🧹 Removed {removed} quote artifacts of expired jobs")
+
+
+def artifact_info(job_id: str, name: str, data: bytes, ref: StoredArtifact) -> Dict:
+    """Where a stored artifact is served, and what it is."""
+    return {
+        "url": ARTIFACT_URL.format(job_id=job_id, name=name),
+        "size": ref.size,
+        "contentType": "image/webp" if data[:4] == b'RIFF' else "image/png",
+        "sha256": ref.digest,
+    }
+
+
+def build_manifest(job_id: str, artifacts: Dict[str, Dict], stored: Dict[str, StoredArtifact]) -> Dict:
+    """Manifest pointing at a job's stored artifacts by URL, with their sizes."""
+    manifest = {"renderVersion": "v2", "sides": {}, "artifacts": {}}
+    for name, artifact in artifacts.items():
+        side, variant, size = name.split('.')
+        info = artifact_info(job_id, name, artifact['data'], stored[name])
+
+        if side not in manifest["sides"]:
+            manifest["sides"][side] = {"base": {}, "mask": {}}
+        manifest["sides"][side][variant][size] = info["url"]
+        manifest["artifacts"][name] = info
+    return manifest
+
+
+def build_preview(job_id: str, previews: Dict[str, Dict], stored: Dict[str, StoredArtifact]) -> Dict:
+    """Preview of a job's manifest: the base/mask preview URL of each side."""
+    preview = {"renderVersion": "v2", "sides": {}, "artifacts": {}}
+    for name, artifact in previews.items():
+        side, variant, _ = name.split('.')
+        info = artifact_info(job_id, name, artifact['data'], stored[name])
+
+        preview["sides"].setdefault(side, {})[variant] = info["url"]
+        preview["artifacts"][name] = info
+    return preview
+
+
+async def process_render_job_v2(job: Job, report: ProgressReporter) -> Dict:
+    """Render base/mask artifacts for a queued /quotes/v2 job and return its manifest."""
+    if job.payload is None:
+        raise PermanentJobError("Job has no uploaded archive")
+    filename = job.args["filename"]
+    params = ManufacturingParameters.model_validate(job.args["params"])
+    file_hash = hashlib.md5(job.payload).hexdigest()
+
+    print(f"🔍 Processing job {job.id} for file {filename} (attempt {job.attempts}/{job.max_attempts})")
+    print(f"📁 File hash: {file_hash[:16]}...")
+    await report("parsing", 30)
+
+    # Parse the archive once in the render pool. The job reports quick
+    # low-resolution previews first, so the client has an image to show
+    # while the full artifacts render
+    preview = {"artifacts": {}}
+
+    async def publish_preview(previews: Dict[str, Dict]):
+        stored_previews = await asyncio.to_thread(store_artifacts, previews)
+        preview.update(build_preview(job.id, previews, stored_previews))
+        await report("preview", 40, preview)
+        await report("rendering", 50)
+        print(f"🎨 Starting base/mask generation for job {job.id}")
+
+    artifacts = await render_executor.submit(
+        run_quote_v2_artifacts, job.payload, filename, params, file_hash, on_progress=publish_preview
+    )
+
+    await report("uploading", 80)
+
+    # Write the images to the artifact store; the manifest only links to them
+    stored = await asyncio.to_thread(store_artifacts, artifacts)
+    manifest = build_manifest(job.id, artifacts, stored)
+    # Previews stay servable for clients still showing them
+    manifest["artifacts"].update(preview["artifacts"])
+
+    print(f"✅ Job {job.id} completed successfully with {len(artifacts)} artifacts")
+    print(f"📊 Generated manifest with sides: {list(manifest['sides'].keys())}")
+    return manifest
+
+
+# Handlers by job kind, for JobWorker
+HANDLERS = {
+    QUOTE_V2: process_render_job_v2,
+}
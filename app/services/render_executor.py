@@ -0,0 +1,282 @@
+# app/services/render_executor.py
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional
+
+from app.core.config import settings
+from app.core.monitoring.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RenderQueueFull(Exception):
+    """Raised when a job is submitted while every worker is busy and the queue is full."""
+
+
+class RenderTimeout(Exception):
+    """Raised when a job runs longer than its timeout. Its worker has been killed."""
+
+
+# The worker process's end of its pipe, for report_progress
+_worker_conn = None
+
+
+def report_progress(value: Any):
+    """
+    Send `value` to the `on_progress` callback of the job running in this
+    render worker; the job carries on meanwhile. `value` must be picklable.
+    Does nothing outside a render worker.
+    """
+    if _worker_conn is not None:
+        _worker_conn.send(("progress", value))
+
+
+def _worker_main(conn):
+    """
+    Worker process loop: receive (func, args, kwargs), run it, send back
+    ("ok", result) or ("error", exception), after any ("progress", value)
+    messages the job sent. Exits on None or when the pipe closes.
+    """
+    global _worker_conn
+    _worker_conn = conn
+    if hasattr(os, "setpgrp"):
+        # Lead a process group so killing the worker takes any processes
+        # its jobs started (e.g. PCB parse pools) with it
+        os.setpgrp()
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+
+        func, args, kwargs = message
+        try:
+            reply = ("ok", func(*args, **kwargs))
+        except Exception as e:
+            reply = ("error", e)
+            try:
+                pickle.loads(pickle.dumps(e))
+            except Exception:
+                # Not every exception survives a round trip; keep the message
+                reply = ("error", RuntimeError(f"{type(e).__name__}: {e}"))
+
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # The result or exception could not be pickled
+            conn.send(("error", RuntimeError(f"Render worker could not return its result: {e}")))
+
+
+class _Worker:
+    """A worker process and the parent's end of its pipe."""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        # Not a daemon: daemon processes can't start processes of their own,
+        # and jobs parse boards in a process pool
+        self.process = context.Process(target=_worker_main, args=(child_conn,))
+        self.process.start()
+        child_conn.close()
+
+    def _kill_group(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            # No process groups here, or the worker hasn't made its own yet
+            self.process.kill()
+        self.process.join()
+
+    def kill(self):
+        self._kill_group()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self._kill_group()
+        self.conn.close()
+
+
+class RenderExecutor:
+    """
+    Bounded pool of render worker processes for CPU-heavy Gerber work.
+
+    Jobs run outside the event loop so a large board can't stall other
+    requests. At most `max_workers` jobs run at once and at most `queue_size`
+    more wait for a worker; further submissions raise RenderQueueFull. A job
+    that exceeds its timeout has its worker process killed and replaced.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int, timeout: Optional[float] = None):
+        """
+        Args:
+            max_workers: Number of worker processes.
+            queue_size: Number of jobs allowed to wait for a free worker.
+            timeout: Default per-job timeout in seconds. None for no limit.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._context = multiprocessing.get_context()
+        self._workers: List[_Worker] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._pollers: Optional[ThreadPoolExecutor] = None
+        self._waiting = 0
+        self._busy = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a free worker."""
+        return self._waiting
+
+    @property
+    def busy_workers(self) -> int:
+        """Number of workers currently running a job."""
+        return self._busy
+
+    def _start(self):
+        # Workers are started on first use, from the event loop that uses them
+        self._idle = asyncio.Queue()
+        self._pollers = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix="render-poll")
+        for _ in range(self.max_workers):
+            worker = _Worker(self._context)
+            self._workers.append(worker)
+            self._idle.put_nowait(worker)
+        # Workers aren't daemons, so stop them before multiprocessing joins them at exit
+        atexit.register(self.shutdown)
+        logger.info(f"Started {self.max_workers} render workers")
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.kill()
+        replacement = _Worker(self._context)
+        self._workers[self._workers.index(worker)] = replacement
+        return replacement
+
+    def _update_metrics(self):
+        metrics.update_render_pool(self._waiting, self._busy)
+
+    async def submit(self, func: Callable[..., Any], *args, timeout: Optional[float] = None,
+                     on_progress: Optional[Callable[[Any], Awaitable[None]]] = None, **kwargs) -> Any:
+        """
+        Run `func(*args, **kwargs)` in a worker process and return its result.
+
+        `func`, its arguments and its result must be picklable. Exceptions
+        raised by `func` are re-raised here.
+
+        Args:
+            func: Module-level function to run.
+            timeout: Seconds the job may run once it has a worker. Defaults
+                to the executor's timeout.
+            on_progress: Awaited with each value `func` passes to
+                report_progress, while the job runs on. If it raises, the
+                job's worker is killed and the exception re-raised here.
+
+        Raises:
+            RenderQueueFull: If every worker is busy and the queue is full.
+            RenderTimeout: If the job ran out of time.
+        """
+        if self._idle is None:
+            self._start()
+        timeout = self.timeout if timeout is None else timeout
+
+        if self._idle.empty() and self._waiting >= self.queue_size:
+            metrics.record_render_job("rejected")
+            raise RenderQueueFull(
+                f"All {self.max_workers} render workers are busy and {self._waiting} jobs are queued"
+            )
+        # Pickle up front so a bad argument fails here rather than in a worker
+        payload = pickle.dumps((func, args, kwargs))
+
+        self._waiting += 1
+        self._update_metrics()
+        try:
+            worker = await self._idle.get()
+        finally:
+            self._waiting -= 1
+
+        self._busy += 1
+        self._update_metrics()
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        failure = None
+        try:
+            worker.conn.send_bytes(payload)
+            while True:
+                # Wait for a message in a thread; poll() returns False on timeout
+                remaining = None if deadline is None else max(deadline - loop.time(), 0)
+                ready = await loop.run_in_executor(self._pollers, worker.conn.poll, remaining)
+                if not ready:
+                    worker = self._replace(worker)
+                    metrics.record_render_job("timeout")
+                    raise RenderTimeout(f"Render job exceeded {timeout:g}s and its worker was killed")
+                status, value = worker.conn.recv()
+                if status != "progress":
+                    break
+                if on_progress is not None:
+                    try:
+                        await on_progress(value)
+                    except Exception as e:
+                        # The job is still running, so its worker can't take another
+                        worker = self._replace(worker)
+                        failure = e
+                        break
+        except asyncio.CancelledError:
+            # Nobody is waiting for the result any more; free the worker
+            worker = self._replace(worker)
+            metrics.record_render_job("cancelled")
+            raise
+        except (EOFError, OSError) as e:
+            # The worker process died
+            worker = self._replace(worker)
+            metrics.record_render_job("failed")
+            raise RuntimeError(f"Render worker failed: {e}") from e
+        finally:
+            self._busy -= 1
+            self._idle.put_nowait(worker)
+            self._update_metrics()
+
+        if failure is not None:
+            metrics.record_render_job("failed")
+            raise failure
+        if status == "error":
+            metrics.record_render_job("failed")
+            raise value
+        metrics.record_render_job("completed")
+        return value
+
+    def shutdown(self):
+        """Stop all worker processes."""
+        atexit.unregister(self.shutdown)
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+        if self._pollers is not None:
+            self._pollers.shutdown(wait=False)
+            self._pollers = None
+        self._idle = None
+        self._waiting = self._busy = 0
+        self._update_metrics()
+
+
+# Global render executor instance
+render_executor = RenderExecutor(
+    max_workers=settings.RENDER_WORKERS,
+    queue_size=settings.RENDER_QUEUE_SIZE,
+    timeout=settings.RENDER_JOB_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,85 @@
+# app/utils/image_encoding.py
+
+import io
+import sys
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Memory order of the channels of a native-endian cairo ARGB32 pixel,
+# as indices that put them in R, G, B, A order
+_RGBA_ORDER = [2, 1, 0, 3] if sys.byteorder == 'little' else [1, 2, 3, 0]
+
+def argb32_to_rgba(data, width: int, height: int, stride: Optional[int] = None,
+                   premultiplied: bool = False) -> np.ndarray:
+    """
+    Convert a cairo ARGB32 pixel buffer to RGBA.
+
+    Args:
+        data: The pixels, e.g. ImageSurface.get_data() or LayerMasks.composite()
+        width: Image width in pixels
+        height: Image height in pixels
+        stride: Bytes per row, defaults to width * 4
+        premultiplied: Leave the colors premultiplied by alpha, as Pillow's
+            "RGBa" mode holds them
+
+    Returns:
+        np.ndarray: (height, width, 4) uint8 array. Colors are divided by alpha
+        with cairo's rounding, so the pixels are those write_to_png writes.
+    """
+    stride = width * 4 if stride is None else stride
+    rows = np.frombuffer(data, dtype=np.uint8, count=stride * height).reshape(height, stride)
+    rgba = np.ascontiguousarray(rows[:, :width * 4].reshape(height, width, 4)[..., _RGBA_ORDER])
+    if premultiplied:
+        return rgba
+
+    alpha = rgba[..., 3:].astype(np.uint32)
+    color = rgba[..., :3].astype(np.uint32)
+    divisor = np.maximum(alpha, 1)
+    rgba[..., :3] = np.where(alpha == 0, 0, (color * 255 + divisor // 2) // divisor)
+    return rgba
+
+def encode_sizes(data, width: int, height: int, encodings: Dict[int, Tuple[str, dict]],
+                 stride: Optional[int] = None) -> Dict[int, bytes]:
+    """
+    Encode one rendered image at several sizes and formats.
+
+    The pixel buffer is converted once per use: sizes the image already fits
+    in are encoded from the unpremultiplied pixels, smaller sizes are scaled
+    down with LANCZOS from the premultiplied ones (as Image.thumbnail does
+    for an RGBA image, without unpremultiplying and premultiplying first).
+
+    Args:
+        data: cairo ARGB32 pixels, see argb32_to_rgba
+        width: Image width in pixels
+        height: Image height in pixels
+        encodings: {size: (Pillow format, save options)}; the image is scaled
+            to fit in size x size pixels
+        stride: Bytes per row, defaults to width * 4
+
+    Returns:
+        Dict[int, bytes]: Encoded image for each size
+    """
+    full = None
+    premultiplied = None
+    encoded = {}
+    for size, (image_format, options) in encodings.items():
+        if width <= size and height <= size:
+            if full is None:
+                pixels = argb32_to_rgba(data, width, height, stride)
+                full = Image.frombuffer('RGBA', (width, height), pixels, 'raw', 'RGBA', 0, 1)
+            image = full
+        else:
+            if premultiplied is None:
+                pixels = argb32_to_rgba(data, width, height, stride, premultiplied=True)
+                premultiplied = Image.frombuffer('RGBa', (width, height), pixels, 'raw', 'RGBa', 0, 1)
+            image = premultiplied.copy()
+            # RGBA thumbnails are resampled in one pass, without reducing first
+            image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=None)
+            image = image.convert('RGBA')
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, **options)
+        encoded[size] = buffer.getvalue()
+    return encoded
@@ -3,9 +3,13 @@
 import io
 import json
 import zipfile
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Tuple, Union
 from app.schemas.pcb import BoardDimensions
 
+# Entries in these formats are stored as they are; deflating them again
+# costs CPU and saves nothing
+PRECOMPRESSED_EXTENSIONS = ('.png', '.webp', '.jpg', '.jpeg', '.gif', '.zip')
+
 def create_response_zip(
     top_image_bytes: bytes,
     bottom_image_bytes: bytes,
@@ -22,4 +26,49 @@ def create_response_zip(
             zip_out.writestr("dimensions.json", dimensions_json)
     
     zip_buffer.seek(0)
-    return zip_buffer
\ No newline at end of file
+    return zip_buffer
+
+class _ZipSink:
+    """Write-only, unseekable file that collects what ZipFile writes."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        chunks, self._chunks = self._chunks, []
+        return b"".join(chunks)
+
+def stream_zip(entries: Iterable[Tuple[str, Union[bytes, str]]]) -> Iterator[bytes]:
+    """
+    Build a ZIP archive piece by piece, for StreamingResponse.
+
+    Each entry is written and yielded as soon as `entries` produces it; the
+    archive is never buffered whole. Entries are held only as long as
+    `entries` holds them, so a generator producing them one at a time keeps
+    one in memory at a time. Images are stored uncompressed, everything else
+    is deflated. Sizes and CRCs follow each entry's data (the sink cannot
+    seek back), which every ZIP reader handles.
+
+    Args:
+        entries: (name, data) pairs
+
+    Yields:
+        bytes: The archive, one entry at a time, then the central directory
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w") as zip_out:
+        for name, data in entries:
+            if name.lower().endswith(PRECOMPRESSED_EXTENSIONS):
+                compression = zipfile.ZIP_STORED
+            else:
+                compression = zipfile.ZIP_DEFLATED
+            zip_out.writestr(name, data, compress_type=compression)
+            yield sink.drain()
+    yield sink.drain()
@@ -704,6 +704,9 @@ class AMThermalPrimitive(AMPrimitive):
     ------
     ValueError, TypeError
     """
+    # Lines approximating each arc of the outlines
+    ARC_STEPS = 10
+
     @classmethod
     def from_gerber(cls, primitive):
         modifiers = primitive.strip(' *').split(",")
@@ -768,7 +771,9 @@ class AMThermalPrimitive(AMPrimitive):
 
         # The total sweep
         sweep_angle = end_angle - start_angle
-        num_steps = 10
+        # A fixed count for consumers that need points (areas, the RS-274X
+        # writer); renderers draw the outline's `arcs` at their own scale
+        num_steps = self.ARC_STEPS
 
         angle_step = sweep_angle / num_steps
 
@@ -813,6 +818,10 @@ class AMThermalPrimitive(AMPrimitive):
         # Add in the last point since outlines should be closed
         points.append(points[0])
 
+        # The inner arc runs counterclockwise over the first ARC_STEPS lines,
+        # the outer arc clockwise over the ARC_STEPS after the radial line
+        steps = self.ARC_STEPS
+
         # There are four outlines at rotated sections
         for rotation in [0, 90.0, 180.0, 270.0]:
 
@@ -823,9 +832,12 @@ class AMThermalPrimitive(AMPrimitive):
 
                 lines.append(Line(prev_point, cur_point, aperture))
 
-            prev_point = cur_point
+                prev_point = cur_point
 
-            outlines.append(Outline(lines, units=units, level_polarity=self._level_polarity))
+            turn = math.radians(rotation)
+            arcs = [(0, steps, inner_start_angle + turn, inner_end_angle + turn),
+                    (steps + 1, 2 * steps + 1, outer_end_angle + turn, outer_start_angle + turn)]
+            outlines.append(Outline(lines, arcs=arcs, units=units, level_polarity=self._level_polarity))
 
         return outlines
 
@@ -22,6 +22,8 @@ CAM File
 This module provides common base classes for Excellon/Gerber CNC files
 """
 
+from .utils import gerber_value_decoder
+
 
 class FileSettings(object):
     """ CAM File Settings
@@ -91,6 +93,8 @@ class FileSettings(object):
         if angle_units not in ('degrees', 'radians'):
             raise ValueError('Angle units may be degrees or radians')
         self.angle_units = angle_units
+        self._decoder = None
+        self._decoder_key = None
 
     @property
     def zero_suppression(self):
@@ -111,6 +115,26 @@ class FileSettings(object):
         self._zeros = value
         self._zero_suppression = 'leading' if value == 'trailing' else 'trailing'
 
+    @property
+    def decoder(self):
+        """ Function converting formatted number strings to floats with these
+        settings' format and zero suppression.
+
+        Memoized until either of them changes. See
+        :func:`gerber.utils.gerber_value_decoder`.
+        """
+        key = (self.format, self.zero_suppression)
+        if self._decoder is None or self._decoder_key != key:
+            self._decoder = gerber_value_decoder(self.format, self.zero_suppression)
+            self._decoder_key = key
+        return self._decoder
+
+    def parse_values(self, values):
+        """ Convert formatted number strings to floats, passing `None` through
+        """
+        decode = self.decoder
+        return [None if value is None else decode(value) for value in values]
+
     def __getitem__(self, key):
         if key == 'notation':
             return self.notation
@@ -210,6 +234,9 @@ class CamFile(object):
     format : tuple (<int>, <int>)
         File decimal representation format as a tuple of (integer digits,
         decimal digits)
+
+    revision : int
+        Number of times the contents have changed, see `_changed()`
     """
 
     def __init__(self, statements=None, settings=None, primitives=None,
@@ -231,6 +258,9 @@ class CamFile(object):
             self.primitives = primitives
         self.filename = filename
         self.layer_name = layer_name
+        self._bounds = None
+        self._bounding_box = None
+        self.revision = 0
 
     @property
     def settings(self):
@@ -260,6 +290,17 @@ class CamFile(object):
     def to_metric(self):
         pass
 
+    def _changed(self):
+        """ Clear memoized bounds.
+
+        `bounds` and `bounding_box` are only calculated once. Anything that
+        moves or resizes the file's contents must call this, or update the
+        memoized values itself.
+        """
+        self._bounds = None
+        self._bounding_box = None
+        self.revision += 1
+
     def render(self, ctx=None, invert=False, filename=None):
         """ Generate image of layer.
 
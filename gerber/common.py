@@ -59,6 +59,38 @@ def read(filename):
         raise ParseError(f"Could not read file {filename}: {e}")
 
 
+def loads_bytes(data, filename=None):
+    """ Read gerber or excellon file contents from bytes and return a
+    representative object.
+
+    The bytes are decoded the same way :func:`read` decodes files.
+
+    Parameters
+    ----------
+    data : bytes
+        Source file contents.
+
+    filename : string, optional
+        String containing the filename of the data source.
+
+    Returns
+    -------
+    file : CncFile subclass
+        CncFile object representing the data, either GerberFile, ExcellonFile,
+        or IPCNetlist.
+    """
+    for encoding in ('utf-8', 'latin-1', 'cp1252', 'ascii'):
+        try:
+            return loads(data.decode(encoding), filename)
+        except Exception:
+            continue
+
+    try:
+        return loads(data.decode('utf-8', errors='ignore'), filename)
+    except Exception as e:
+        raise ParseError(f"Could not read file {filename}: {e}")
+
+
 def loads(data, filename=None):
     """ Read gerber or excellon file contents from a string and return a
     representative object.
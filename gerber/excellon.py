@@ -25,12 +25,16 @@ This module provides Excellon file classes and parsing utilities
 
 import math
 import operator
+import re
+
+import numpy as np
 
 from .cam import CamFile, FileSettings
 from .excellon_statements import *
+from .excellon_statements import pairwise, split_excellon_coordinates
 from .excellon_tool import ExcellonToolDefinitionParser
 from .primitives import Drill, Slot
-from .utils import inch, metric
+from .utils import inch, metric, gerber_value_decoder
 
 
 try:
@@ -168,6 +172,109 @@ class DrillSlot(object):
         self.end = tuple(map(operator.add, self.end, (x_offset, y_offset)))
 
 
+class DrillTable(object):
+    """ The hits of an Excellon file as NumPy arrays
+
+    Row `i` of each array describes `hits[i]`. A drill hit starts and ends at
+    its position.
+
+    Parameters
+    ----------
+    hits : list
+        `DrillHit` and `DrillSlot` objects, e.g. `ExcellonFile.hits`
+
+    Attributes
+    ----------
+    start, end : numpy.ndarray
+        (n, 2) arrays of hit positions, or of slot end points
+
+    slot : numpy.ndarray
+        True for the hits that are slots
+
+    tool_number : numpy.ndarray
+        Number of each hit's tool
+
+    diameter : numpy.ndarray
+        Diameter of each hit's tool
+    """
+
+    def __init__(self, hits):
+        count = len(hits)
+        starts = []
+        ends = []
+        slot = []
+        for hit in hits:
+            if isinstance(hit, DrillHit):
+                starts.append(hit.position)
+                ends.append(hit.position)
+                slot.append(False)
+            elif isinstance(hit, DrillSlot):
+                starts.append(hit.start)
+                ends.append(hit.end)
+                slot.append(True)
+            else:
+                raise ValueError('Unknown hit type')
+        self.start = np.array(starts, dtype=float).reshape(count, 2)
+        self.end = np.array(ends, dtype=float).reshape(count, 2)
+        self.slot = np.array(slot, dtype=bool)
+        self.tool_number = np.array([hit.tool.number for hit in hits], dtype=np.int64)
+        self.diameter = np.array([hit.tool.diameter for hit in hits], dtype=float)
+
+    def __len__(self):
+        return len(self.slot)
+
+    def primitives(self, units):
+        """ `Drill` and `Slot` primitives for the hits, in order
+        """
+        primitives = []
+        for start, end, slot, diameter in zip(self.start.tolist(), self.end.tolist(),
+                                              self.slot.tolist(), self.diameter.tolist()):
+            if slot:
+                primitives.append(Slot(tuple(start), tuple(end), diameter, units=units))
+            else:
+                primitives.append(Drill(tuple(start), diameter, units=units))
+        return primitives
+
+    def bounding_box(self):
+        """ Extents of the hits, ((xmin, xmax), (ymin, ymax))
+        """
+        xmin = ymin = 100000000000
+        xmax = ymax = -100000000000
+        if len(self):
+            radius = self.diameter / 2.
+            low = np.minimum(self.start, self.end) - radius[:, None]
+            high = np.maximum(self.start, self.end) + radius[:, None]
+            xmin, ymin = [min(value, xmin) for value in low.min(axis=0).tolist()]
+            xmax, ymax = [max(value, xmax) for value in high.max(axis=0).tolist()]
+        return ((xmin, xmax), (ymin, ymax))
+
+    def hit_counts(self):
+        """ Number of hits of each tool, {tool number: count}
+        """
+        numbers, counts = np.unique(self.tool_number, return_counts=True)
+        return dict(zip(numbers.tolist(), counts.tolist()))
+
+    def path_lengths(self):
+        """ Distance each tool travels, {tool number: length}
+
+        Each tool starts at the origin and visits its hits in order; a slot
+        is entered at its start and left at its end.
+        """
+        lengths = {}
+        for number in np.unique(self.tool_number).tolist():
+            rows = np.flatnonzero(self.tool_number == number)
+            # Alternating moves to each hit and along it
+            points = np.empty((2 * len(rows) + 1, 2))
+            points[0] = 0.
+            points[1::2] = self.start[rows]
+            points[2::2] = self.end[rows]
+            steps = np.diff(points, axis=0)
+            distances = np.hypot(steps[:, 0], steps[:, 1])
+            # Summed in order, as the moves are made
+            lengths[number] = float(np.cumsum(distances)[-1])
+        return lengths
+
+
 class ExcellonFile(CamFile):
     """ A class representing a single excellon file
 
@@ -203,35 +310,41 @@ class ExcellonFile(CamFile):
                                            filename=filename)
         self.tools = tools
         self.hits = hits
+        self._drill_table = None
+        self._primitives = None
+
+    @property
+    def drill_table(self):
+        """ The hits as a `DrillTable`, memoized.
+        """
+        if self._drill_table is None:
+            self._drill_table = DrillTable(self.hits)
+        return self._drill_table
 
     @property
     def primitives(self):
         """
-        Gets the primitives. Note that unlike Gerber, this generates new objects
+        Gets the primitives, memoized. They are made from the hits the first
+        time they are needed, and again after the hits change.
         """
-        primitives = []
-        for hit in self.hits:
-            if isinstance(hit, DrillHit):
-                primitives.append(Drill(hit.position, hit.tool.diameter,
-                                        units=self.settings.units))
-            elif isinstance(hit, DrillSlot):
-                primitives.append(Slot(hit.start, hit.end, hit.tool.diameter,
-                                       units=self.settings.units))
-            else:
-                raise ValueError('Unknown hit type')
-        return primitives
+        if self._primitives is None:
+            self._primitives = self.drill_table.primitives(self.settings.units)
+        return self._primitives
 
     @property
     def bounding_box(self):
-        xmin = ymin = 100000000000
-        xmax = ymax = -100000000000
-        for hit in self.hits:
-            bbox = hit.bounding_box
-            xmin = min(bbox[0][0], xmin)
-            xmax = max(bbox[0][1], xmax)
-            ymin = min(bbox[1][0], ymin)
-            ymax = max(bbox[1][1], ymax)
-        return ((xmin, xmax), (ymin, ymax))
+        """ Extents of the hits in the file, memoized.
+        """
+        if self._bounding_box is None:
+            self._bounding_box = self.drill_table.bounding_box()
+        return self._bounding_box
+
+    def _changed(self):
+        """ Clear memoized bounds, drill table and primitives.
+        """
+        super(ExcellonFile, self)._changed()
+        self._drill_table = None
+        self._primitives = None
 
     def report(self, filename=None):
         """ Print or save drill report
@@ -253,7 +366,7 @@ class ExcellonFile(CamFile):
         rprt += '  --------------------------------------\n'
         for tool in iter(self.tools.values()):
             rprt += toolfmt.format(tool.number, tool.diameter,
-                                   tool.hit_count, self.path_length(tool.number))
+                                   self.hit_count(tool.number), self.path_length(tool.number))
         if filename is not None:
             with open(filename, 'w') as f:
                 f.write(rprt)
@@ -293,6 +406,7 @@ class ExcellonFile(CamFile):
             #for hit in self.hits:
             #    hit.to_inch()
             self.units = 'inch'
+            self._changed()
 
     def to_metric(self):
         """  Convert units to metric
@@ -309,39 +423,32 @@ class ExcellonFile(CamFile):
             for hit in self.hits:
                 hit.to_metric()
             self.units = 'metric'
+            self._changed()
 
     def offset(self, x_offset=0, y_offset=0):
         for statement in self.statements:
             statement.offset(x_offset, y_offset)
-        for primitive in self.primitives:
-            primitive.offset(x_offset, y_offset)
-        for hit in self. hits:
+        # The primitives are made again from the moved hits
+        for hit in self.hits:
             hit.offset(x_offset, y_offset)
+        self._changed()
 
     def path_length(self, tool_number=None):
         """ Return the path length for a given tool
         """
-        lengths = {}
-        positions = {}
-        for hit in self.hits:
-            tool = hit.tool
-            num = tool.number
-            positions[num] = ((0, 0) if positions.get(num) is None
-                              else positions[num])
-            lengths[num] = 0.0 if lengths.get(num) is None else lengths[num]
-            lengths[num] = lengths[
-                num] + math.hypot(*tuple(map(operator.sub, positions[num], hit.position)))
-            positions[num] = hit.position
-
+        lengths = self.drill_table.path_lengths()
         if tool_number is None:
             return lengths
         else:
             return lengths.get(tool_number)
 
     def hit_count(self, tool_number=None):
+        """ Return the number of hits for a given tool
+        """
+        hits = self.drill_table.hit_counts()
         counts = {}
         for tool in iter(self.tools.values()):
-            counts[tool.number] = tool.hit_count
+            counts[tool.number] = hits.get(tool.number, 0)
         if tool_number is None:
             return counts
         else:
@@ -367,6 +474,7 @@ class ExcellonFile(CamFile):
         for hit in self.hits:
             if hit.tool.number == newtool.number:
                 hit.tool = newtool
+        self._changed()
 
 
 class ExcellonParser(object):
@@ -376,8 +484,12 @@ class ExcellonParser(object):
     ----------
     settings : FileSettings or dict-like
         Excellon file settings to use when interpreting the excellon file.
+
+    digits : _DrillDigits, optional
+        Recorder told what each line does, used by detect_excellon_format
+        to score every candidate format from a single parse.
     """
-    def __init__(self, settings=None, ext_tools=None):
+    def __init__(self, settings=None, ext_tools=None, digits=None):
         self.notation = 'absolute'
         self.units = 'inch'
         self.zeros = 'leading'
@@ -392,6 +504,8 @@ class ExcellonParser(object):
         self.pos = [0., 0.]
         self.drill_down = False
         self._previous_line = ''
+        self._coordinates = None
+        self._digits = digits
         # Default for plated is None, which means we don't know
         self.plated = ExcellonTool.PLATED_UNKNOWN
         if settings is not None:
@@ -402,19 +516,30 @@ class ExcellonParser(object):
 
     @property
     def coordinates(self):
-        return [(stmt.x, stmt.y) for stmt in self.statements if isinstance(stmt, CoordinateStmt)]
+        """ (x, y) of each coordinate statement, memoized until more
+        statements are parsed
+        """
+        count = len(self.statements)
+        if self._coordinates is None or self._coordinates[0] != count:
+            self._coordinates = (count, [(stmt.x, stmt.y) for stmt in self.statements
+                                         if isinstance(stmt, CoordinateStmt)])
+        return self._coordinates[1]
 
     @property
     def bounds(self):
         xmin = ymin = 100000000000
         xmax = ymax = -100000000000
-        for x, y in self.coordinates:
-            if x is not None:
-                xmin = x if x < xmin else xmin
-                xmax = x if x > xmax else xmax
-            if y is not None:
-                ymin = y if y < ymin else ymin
-                ymax = y if y > ymax else ymax
+        coordinates = self.coordinates
+        if coordinates:
+            # Missing coordinates become NaN, which the extents skip
+            values = np.array(coordinates, dtype=float)
+            present = ~np.isnan(values)
+            if present[:, 0].any():
+                xs = values[present[:, 0], 0]
+                xmin, xmax = min(float(xs.min()), xmin), max(float(xs.max()), xmax)
+            if present[:, 1].any():
+                ys = values[present[:, 1], 1]
+                ymin, ymax = min(float(ys.min()), ymin), max(float(ys.max()), ymax)
         return ((xmin, xmax), (ymin, ymax))
 
     @property
@@ -458,6 +583,7 @@ class ExcellonParser(object):
                     [int(x) for x in comment_stmt.comment.split('=')[1].split(":")])
                 if detected_format:
                     self.format = detected_format
+                    self._record('format', detected_format)
 
             if "TYPE=PLATED" in comment_stmt.comment:
                 self.plated = ExcellonTool.PLATED_YES
@@ -470,6 +596,7 @@ class ExcellonParser(object):
 
             if " Holesize " in comment_stmt.comment:
                 self.state = "HEADER"
+                self._record('unsupported_line', line)
 
                 # Parse this as a hole definition
                 tools = ExcellonToolDefinitionParser(self._settings()).parse_raw(comment_stmt.comment)
@@ -530,6 +657,7 @@ class ExcellonParser(object):
 
             stmt = CoordinateStmt.from_excellon(line[3:], self._settings())
             stmt.mode = self.state
+            self._record('move', line[3:], self.notation)
 
             x = stmt.x
             y = stmt.y
@@ -557,6 +685,7 @@ class ExcellonParser(object):
 
             stmt = CoordinateStmt.from_excellon(line[3:], self._settings())
             stmt.mode = self.state
+            self._record('move', line[3:], self.notation)
 
             # The start position is where we were before the rout command
             start = (self.pos[0], self.pos[1])
@@ -584,6 +713,7 @@ class ExcellonParser(object):
 
                 self.hits.append(DrillSlot(self.active_tool, start, end, DrillSlot.TYPE_ROUT))
                 self.active_tool._hit()
+                self._record('hit', self.active_tool, True)
 
         elif line[:3] == 'G05':
             self.statements.append(DrillModeStmt())
@@ -594,8 +724,10 @@ class ExcellonParser(object):
             stmt = UnitStmt.from_excellon(line)
             self.units = stmt.units
             self.zeros = stmt.zeros
+            self._record('zeros', stmt.zeros)
             if stmt.format:
                 self.format = stmt.format
+                self._record('format', stmt.format)
             self.statements.append(stmt)
 
         elif line[:3] == 'M71' or line[:3] == 'M72':
@@ -616,6 +748,7 @@ class ExcellonParser(object):
             stmt = FormatStmt.from_excellon(line)
             self.statements.append(stmt)
             self.format = stmt.format_tuple
+            self._record('format', stmt.format_tuple)
 
         elif line[:3] == 'G40':
             self.statements.append(CutterCompensationOffStmt())
@@ -640,6 +773,7 @@ class ExcellonParser(object):
                 self._merge_properties(tool)
                 self.tools[tool.number] = tool
                 self.statements.append(tool)
+                self._record('tool', line, tool.number)
             else:
                 self.statements.append(UnknownStmt.from_excellon(line))
 
@@ -674,6 +808,7 @@ class ExcellonParser(object):
         elif line[0] == 'R' and self.state != 'HEADER':
             stmt = RepeatHoleStmt.from_excellon(line, self._settings())
             self.statements.append(stmt)
+            self._record('unsupported_line', line)
             for i in range(stmt.count):
                 self.pos[0] += stmt.xdelta if stmt.xdelta is not None else 0
                 self.pos[1] += stmt.ydelta if stmt.ydelta is not None else 0
@@ -690,6 +825,7 @@ class ExcellonParser(object):
                 y = stmt.y_end
 
                 self.statements.append(stmt)
+                self._record('slot', line, self.notation)
 
                 if self.notation == 'absolute':
                     if x is not None:
@@ -708,8 +844,10 @@ class ExcellonParser(object):
 
                     self.hits.append(DrillSlot(self.active_tool, (stmt.x_start, stmt.y_start), (stmt.x_end, stmt.y_end), DrillSlot.TYPE_G85))
                     self.active_tool._hit()
+                    self._record('hit', self.active_tool, True)
             else:
                 stmt = CoordinateStmt.from_excellon(line, self._settings())
+                self._record('move', line, self.notation)
 
                 # We need this in case we are in rout mode
                 start = (self.pos[0], self.pos[1])
@@ -733,6 +871,8 @@ class ExcellonParser(object):
                         self.active_tool = self._get_tool(1)
 
                     self.hits.append(DrillSlot(self.active_tool, start, tuple(self.pos), DrillSlot.TYPE_ROUT))
+                    self.active_tool._hit()
+                    self._record('hit', self.active_tool, True)
 
                 elif self.state == 'DRILL' or self.state == 'HEADER':
                     # Yes, drills in the header doesn't follow the specification, but it there are many
@@ -742,6 +882,7 @@ class ExcellonParser(object):
 
                     self.hits.append(DrillHit(self.active_tool, tuple(self.pos)))
                     self.active_tool._hit()
+                    self._record('hit', self.active_tool, False)
 
         else:
             self.statements.append(UnknownStmt.from_excellon(line))
@@ -750,6 +891,19 @@ class ExcellonParser(object):
         return FileSettings(units=self.units, format=self.format,
                             zeros=self.zeros, notation=self.notation)
 
+    def _record(self, event, *args):
+        """ Tell the digit recorder, if any, what a line did. Anything it
+        can't follow stops the recording, and detect_excellon_format parses
+        the file per candidate format instead.
+        """
+        digits = self._digits
+        if digits is None or digits.unsupported is not None:
+            return
+        try:
+            getattr(digits, event)(*args)
+        except Exception as e:
+            digits.unsupported = e
+
     def _add_comment_tool(self, tool):
         """
         Add a tool that was defined in the comments to this file.
@@ -794,9 +948,198 @@ class ExcellonParser(object):
 
         return tool
 
+
+class _UnsupportedDrillData(Exception):
+    """ Raised by `_DrillDigits` for input it does not model """
+
+
+# Digit strings the recorder decodes itself; anything else is left to the parser
+_DIGITS = re.compile(r'^\+*-*(\d*)$')
+
+
+class _DrillDigits(object):
+    """ The raw coordinate digits of an Excellon file
+
+    Given to `ExcellonParser` as `digits`, it is told what each line did, and
+    keeps every coordinate and tool diameter the parser read as the digit
+    string from the file, and each hit as the indices of the digit strings
+    giving its position and diameter. `measure` then decodes the digits with
+    NumPy for one candidate format and returns what `detect_excellon_format`
+    scores, as parsing the file with those settings would. Incremental
+    coordinates, repeats, tools not defined in the header and anything else
+    it does not model set `unsupported`; the caller then parses the file
+    once per candidate instead.
+    """
+
+    def __init__(self):
+        self.unsupported = None
+        # Digit strings, and the (format, zeros) the file set where each was
+        # read, by index into _settings (None: the candidate's)
+        self._values = ['0.0']
+        self._settings = {(None, None): 0}
+        self._value_settings = [0]
+        # Per hit: start x, start y, end x, end y, diameter (value indices)
+        self._hits = []
+        self._prepared = False
+
+        self._format = None
+        self._zeros = None
+        self._tools = {}
+        self._pos = [0, 0]
+        self._start = (0, 0)
+
+    def _value(self, digits):
+        if digits is None:
+            return None
+        if '.' in digits:
+            float(digits)
+        elif _DIGITS.match(digits) is None:
+            raise _UnsupportedDrillData(digits)
+        self._values.append(digits)
+        key = (self._format, self._zeros)
+        self._value_settings.append(self._settings.setdefault(key, len(self._settings)))
+        return len(self._values) - 1
+
+    # Events, named as ExcellonParser._record passes them
+
+    def format(self, format):
+        self._format = format
+
+    def zeros(self, zeros):
+        self._zeros = zeros
+
+    def unsupported_line(self, line):
+        raise _UnsupportedDrillData(line)
+
+    def tool(self, line, number):
+        commands = dict(pairwise(re.split('([BCFHSTZ])', line)[1:]))
+        if 'C' in commands:
+            self._tools[number] = self._value(commands['C'])
+        else:
+            self._tools.pop(number, None)
+
+    def move(self, line, notation):
+        if notation != 'absolute':
+            raise _UnsupportedDrillData('incremental coordinates')
+        x, y = split_excellon_coordinates(line)
+        self._start = tuple(self._pos)
+        if x is not None:
+            self._pos[0] = self._value(x)
+        if y is not None:
+            self._pos[1] = self._value(y)
+
+    def slot(self, line, notation):
+        if notation != 'absolute':
+            raise _UnsupportedDrillData('incremental coordinates')
+        start, end = line.split('G85')[:2]
+        x_start, y_start = [self._value(value) for value in split_excellon_coordinates(start)]
+        x_end, y_end = [self._value(value) for value in split_excellon_coordinates(end)]
+        if x_start is None or y_start is None:
+            raise _UnsupportedDrillData(line)
+        self._start = (x_start, y_start)
+        self._pos = [x_start if x_end is None else x_end,
+                     y_start if y_end is None else y_end]
+
+    def hit(self, tool, rout):
+        if tool is None or tool.number not in self._tools:
+            raise _UnsupportedDrillData('tool not defined in the header')
+        start = self._start if rout else tuple(self._pos)
+        self._hits.append(start + tuple(self._pos) + (self._tools[tool.number],))
+
+    def _prepare(self):
+        # Everything about the digit strings that does not depend on the format
+        if self._prepared:
+            return
+        values = self._values
+        self._decimal = np.array(['.' in value for value in values])
+        self._decimal_values = np.array([float(value) if '.' in value else 0.0
+                                         for value in values])
+        digits = ['' if '.' in value else _DIGITS.match(value).group(1) for value in values]
+        self._lengths = np.array([len(value) for value in digits], dtype=np.int64)
+        if self._lengths.max() > 15:
+            raise _UnsupportedDrillData('too many digits')
+        self._magnitudes = np.array([int(value) if value else 0 for value in digits],
+                                    dtype=np.int64)
+        self._negative = np.array(['-' in value for value in values])
+        self._value_settings = np.array(self._value_settings, dtype=np.int64)
+        self._hits = np.array(self._hits, dtype=np.int64).reshape(-1, 5)
+        # Tool diameters, and each hit's index among them
+        self._diameters, self._hit_tools = np.unique(self._hits[:, 4], return_inverse=True)
+        self._prepared = True
+
+    def _decode(self, format, zeros):
+        """ The values of the digit strings read with `format` and `zeros`
+        """
+        values = self._decimal_values.copy()
+        for (value_format, value_zeros), index in self._settings.items():
+            # Explicit decimals are read as they are
+            selected = (self._value_settings == index) & ~self._decimal
+            if not selected.any():
+                continue
+            zero_suppression = FileSettings(zeros=value_zeros or zeros).zero_suppression
+            values[selected] = _decode_digits(self._lengths[selected],
+                                              self._magnitudes[selected],
+                                              self._negative[selected],
+                                              value_format or format, zero_suppression)
+        return values
+
+    def measure(self, format, zeros):
+        """ Board size, hole count and hole area of the hits, as
+        `detect_excellon_format` computes them from a parsed file
+        """
+        self._prepare()
+        values = self._decode(format, zeros)
+        hits = self._hits
+        if not len(hits):
+            return (2e11, 2e11), 0, 0.0
+        x_start, y_start, x_end, y_end = [values[hits[:, i]] for i in range(4)]
+        radius = values[hits[:, 4]] / 2.
+        # Extents as ExcellonFile.bounding_box finds them
+        xmin = min((np.minimum(x_start, x_end) - radius).min(), 100000000000)
+        xmax = max((np.maximum(x_start, x_end) + radius).max(), -100000000000)
+        ymin = min((np.minimum(y_start, y_end) - radius).min(), 100000000000)
+        ymax = max((np.maximum(y_start, y_end) + radius).max(), -100000000000)
+
+        # Summed hit by hit, in file order, like the original loop
+        tool_areas = np.array([math.pow(math.pi * diameter / 2., 2)
+                               for diameter in values[self._diameters].tolist()])
+        hole_area = float(np.cumsum(tool_areas[self._hit_tools])[-1])
+        return (float(xmin - xmax), float(ymin - ymax)), len(hits), hole_area
+
+
+_POWERS_OF_TEN = np.array([10 ** exponent for exponent in range(19)], dtype=np.int64)
+
+
+def _decode_digits(lengths, magnitudes, negative, format, zero_suppression):
+    """ Vectorized `gerber_value_decoder` for digit strings without a decimal
+    point, given their lengths, integer values and signs; gives the same floats
+    """
+    # Rejects the formats the decoder rejects
+    gerber_value_decoder(format, zero_suppression)
+    if zero_suppression not in ('leading', 'trailing'):
+        raise _UnsupportedDrillData(zero_suppression)
+    integer_digits, decimal_digits = format
+
+    missing = integer_digits + decimal_digits - lengths
+    padded = missing >= 0
+    numerator = magnitudes.copy()
+    if zero_suppression == 'trailing':
+        numerator[padded] *= _POWERS_OF_TEN[missing[padded]]
+    denominator = np.where(padded, _POWERS_OF_TEN[decimal_digits],
+                           _POWERS_OF_TEN[np.maximum(lengths - integer_digits, 0)])
+    # Both are exact in float64, so the division rounds as int / int does
+    result = numerator.astype(np.float64) / denominator.astype(np.float64)
+    return np.where(negative, -result, result)
+
+
 def detect_excellon_format(data=None, filename=None):
     """ Detect excellon file decimal format and zero-suppression settings.
 
+    The file is parsed once, recording its coordinate digit strings; each
+    candidate format is scored from those. Files using constructs the
+    recorder does not model, and candidates it can't score, are parsed with
+    the candidate's settings instead, with the same result.
+
     Parameters
     ----------
     data : string
@@ -821,9 +1164,12 @@ def detect_excellon_format(data=None, filename=None):
         with open(filename, 'rU') as f:
             data = f.read()
 
-    # Check for obvious clues:
-    p = ExcellonParser()
+    # Check for obvious clues, recording the digits as we go:
+    digits = _DrillDigits()
+    p = ExcellonParser(digits=digits)
     p.parse_raw(data)
+    if digits.unsupported is not None:
+        digits = None
 
     # Get zero_suppression from a unit statement
     zero_statements = [stmt.zeros for stmt in p.statements
@@ -849,10 +1195,20 @@ def detect_excellon_format(data=None, filename=None):
     if detected_zeros is not None:
         zeros_options = (detected_zeros,)
 
-    # Brute force all remaining options, and pick the best looking one...
+    # Try all remaining options, and pick the best looking one...
     for zeros in zeros_options:
         for fmt in format_options:
             key = (fmt, zeros)
+            if digits is not None:
+                try:
+                    results[key] = digits.measure(fmt, zeros)
+                    continue
+                except _UnsupportedDrillData:
+                    digits = None
+                except Exception:
+                    # Left to the parser, which decides whether these
+                    # settings work
+                    pass
             settings = FileSettings(zeros=zeros, format=fmt)
             try:
                 p = ExcellonParser(settings)
@@ -377,18 +377,10 @@ class CoordinateStmt(ExcellonStatement):
 
     @classmethod
     def from_excellon(cls, line, settings, **kwargs):
-        x_coord = None
-        y_coord = None
-        if line[0] == 'X':
-            splitline = line.strip('X').split('Y')
-            x_coord = parse_gerber_value(splitline[0], settings.format,
-                                         settings.zero_suppression)
-            if len(splitline) == 2:
-                y_coord = parse_gerber_value(splitline[1], settings.format,
-                                             settings.zero_suppression)
-        else:
-            y_coord = parse_gerber_value(line.strip(' Y'), settings.format,
-                                         settings.zero_suppression)
+        x_coord, y_coord = [
+            parse_gerber_value(value, settings.format, settings.zero_suppression)
+            if value is not None else None
+            for value in split_excellon_coordinates(line)]
         c = cls(x_coord, y_coord, **kwargs)
         c.units = settings.units
         return c
@@ -872,22 +864,10 @@ class SlotStmt(ExcellonStatement):
 
     @staticmethod
     def parse_sub_coords(line, settings):
-
-        x_coord = None
-        y_coord = None
-
-        if line[0] == 'X':
-            splitline = line.strip('X').split('Y')
-            x_coord = parse_gerber_value(splitline[0], settings.format,
-                                         settings.zero_suppression)
-            if len(splitline) == 2:
-                y_coord = parse_gerber_value(splitline[1], settings.format,
-                                             settings.zero_suppression)
-        else:
-            y_coord = parse_gerber_value(line.strip(' Y'), settings.format,
-                                         settings.zero_suppression)
-
-        return (x_coord, y_coord)
+        return tuple(
+            parse_gerber_value(value, settings.format, settings.zero_suppression)
+            if value is not None else None
+            for value in split_excellon_coordinates(line))
 
 
     def __init__(self, x_start=None, y_start=None, x_end=None, y_end=None, **kwargs):
@@ -968,6 +948,14 @@ class SlotStmt(ExcellonStatement):
 
         return '<Slot Statement: %s to %s>' % (start_str, end_str)
 
+def split_excellon_coordinates(line):
+    """ The X and Y digit strings of an Excellon coordinate, None if absent
+    """
+    if line[0] == 'X':
+        splitline = line.strip('X').split('Y')
+        return splitline[0], (splitline[1] if len(splitline) == 2 else None)
+    return None, line.strip(' Y')
+
 def pairwise(iterator):
     """ Iterate over list taking two elements at a time.
 
@@ -28,6 +28,10 @@ class ExcellonParseError(ParseError):
     pass
 
 
+class ArchiveError(ParseError):
+    pass
+
+
 class ExcellonFileError(IOError):
     pass
 
@@ -20,8 +20,7 @@ Gerber (RS-274X) Statements
 **Gerber RS-274X file statement classes**
 
 """
-from .utils import (parse_gerber_value, write_gerber_value, decimal_string,
-                    inch, metric)
+from .utils import write_gerber_value, decimal_string, inch, metric
 
 from .am_statements import *
 from .am_read import read_macro
@@ -895,18 +894,7 @@ class CoordStmt(Statement):
         j = stmt_dict.get('j')
         op = stmt_dict.get('op')
 
-        if x is not None:
-            x = parse_gerber_value(stmt_dict.get('x'), settings.format,
-                                   settings.zero_suppression)
-        if y is not None:
-            y = parse_gerber_value(stmt_dict.get('y'), settings.format,
-                                   settings.zero_suppression)
-        if i is not None:
-            i = parse_gerber_value(stmt_dict.get('i'), settings.format,
-                                   settings.zero_suppression)
-        if j is not None:
-            j = parse_gerber_value(stmt_dict.get('j'), settings.format,
-                                   settings.zero_suppression)
+        x, y, i, j = settings.parse_values((x, y, i, j))
         return cls(function, x, y, i, j, op, settings)
 
     @classmethod
@@ -22,6 +22,7 @@ from collections import namedtuple
 from . import common
 from .excellon import ExcellonFile
 from .ipc356 import IPCNetlist
+from .spatial import SpatialIndex
 
 
 Hint = namedtuple('Hint', 'layer ext name regex content')
@@ -132,6 +133,10 @@ def guess_layer_class(filename):
     except:
         pass
 
+    return guess_layer_class_by_name(filename)
+
+
+def guess_layer_class_by_name(filename):
     try:
         directory, filename = os.path.split(filename)
         name, ext = os.path.splitext(filename.lower())
@@ -207,6 +212,9 @@ class PCBLayer(object):
     filename : string
         Source Filename
 
+    spatial_index : SpatialIndex
+        Index of the layer's primitives by bounding box, built on first use
+
     """
     @classmethod
     def from_cam(cls, camfile):
@@ -235,6 +243,32 @@ class PCBLayer(object):
         else:
             return None
 
+    @property
+    def spatial_index(self):
+        # Rebuilt when the primitives are replaced, or when the source moves
+        # them in place (offset, unit conversion)
+        revision = getattr(self.cam_source, 'revision', None)
+        index = getattr(self, '_spatial_index', None)
+        if (index is None or index.primitives is not self.primitives
+                or self._spatial_revision != revision):
+            index = self._spatial_index = SpatialIndex(self.primitives)
+            self._spatial_revision = revision
+        return index
+
+    def query(self, bbox):
+        """ Primitives whose bounding box overlaps `bbox`, in drawing order
+
+        Parameters
+        ----------
+        bbox : tuple
+            ((xmin, xmax), (ymin, ymax)) in the layer's units
+
+        Returns
+        -------
+        primitives : list
+        """
+        return self.spatial_index.query(bbox)
+
     def __repr__(self):
         return '<PCBLayer: {}>'.format(self.layer_class)
 
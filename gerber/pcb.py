@@ -16,57 +16,335 @@
 # limitations under the License.
 
 
+import io
+import multiprocessing
 import os
-from .exceptions import ParseError
-from .layers import PCBLayer, sort_layers, layer_signatures
-from .common import read as gerber_read
+import posixpath
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .exceptions import ArchiveError, ParseError
+from .layers import PCBLayer, sort_layers, layer_signatures, guess_layer_class_by_name
+from .common import read as gerber_read, loads_bytes as gerber_loads_bytes
 from .utils import listdir
 
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+
+# Default limits for PCB.from_archive()
+MAX_ARCHIVE_MEMBERS = 1000
+MAX_ARCHIVE_SIZE = 256 * 1024 * 1024
+
+# Archive members that are never layers and are not decompressed
+ARCHIVE_IGNORED_DIRECTORIES = ('__MACOSX',)
+ARCHIVE_IGNORED_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg', '.bmp', '.gif',
+                              '.zip', '.rar', '.7z', '.doc', '.docx', '.xls',
+                              '.xlsx', '.step', '.stp', '.html', '.htm')
+
+# Gerber and drill extensions that mark a folder as holding the board, on top
+# of the layer names and extensions known to guess_layer_class_by_name()
+ARCHIVE_LAYER_EXTENSIONS = ('.gbr', '.ger', '.pho', '.art', '.gm1', '.drl',
+                            '.drd', '.xln', '.exc', '.txt')
+
+
+def _read_layer(path):
+    """ Parse one file into a PCBLayer, or return None if it isn't a layer.
+
+    Module level so it can be sent to worker processes.
+    """
+    try:
+        return PCBLayer.from_cam(gerber_read(path))
+    except (ParseError, IOError):
+        return None
+
+
+def _load_layer(data, filename):
+    """ Parse file contents into a PCBLayer, or return None if they aren't
+    a layer.
+    """
+    try:
+        return PCBLayer.from_cam(gerber_loads_bytes(data, filename))
+    except (ParseError, IOError):
+        return None
+
+
+# Errors raised for corrupt archives
+if rarfile is not None:
+    _ARCHIVE_ERRORS = (zipfile.BadZipFile, rarfile.Error)
+else:
+    _ARCHIVE_ERRORS = (zipfile.BadZipFile,)
+
+
+def _open_archive(fileobj):
+    """ Open a ZIP or RAR archive from a seekable file object.
+    """
+    header = fileobj.read(8)
+    fileobj.seek(0)
+    if header.startswith(b'Rar!\x1a\x07'):
+        if rarfile is None:
+            raise ArchiveError('RAR archives need the rarfile package.')
+        opener = rarfile.RarFile
+    elif header.startswith(b'PK'):
+        opener = zipfile.ZipFile
+    else:
+        raise ArchiveError('Unsupported archive type.')
+    try:
+        return opener(fileobj, 'r')
+    except _ARCHIVE_ERRORS as e:
+        raise ArchiveError('Not a valid archive: {}'.format(e))
+
+
+def _is_layer_name(basename):
+    """ Whether a file name looks like a Gerber or drill file.
+    """
+    return (basename.lower().endswith(ARCHIVE_LAYER_EXTENSIONS) or
+            guess_layer_class_by_name(basename) != 'unknown')
+
+
+def _board_members(members):
+    """ Pick the archive members that make up the board.
+
+    Like a directory given to PCB.from_directory(), only the files directly
+    in one folder are used: the top of the archive if it holds any layer
+    files, otherwise the archive's only folder, and so on down. If no folder
+    on the way holds layer files, the first one with any candidate files is
+    used.
+    """
+    os_files = ('.DS_Store', 'Thumbs.db', 'ethumbs.db')
+    files = []
+    for member in members:
+        name = member.filename.replace('\\', '/')
+        parts = name.split('/')
+        if member.is_dir() or any(part in ARCHIVE_IGNORED_DIRECTORIES for part in parts):
+            continue
+        basename = parts[-1]
+        if basename.startswith('.') or basename in os_files:
+            continue
+        files.append((posixpath.dirname(name), basename, member))
+
+    folder = ''
+    fallback = None
+    while True:
+        candidates = [entry for entry in files if entry[0] == folder and
+                      not entry[1].lower().endswith(ARCHIVE_IGNORED_EXTENSIONS)]
+        if any(_is_layer_name(entry[1]) for entry in candidates):
+            return folder, candidates
+        if candidates and fallback is None:
+            fallback = folder, candidates
+        prefix = folder + '/' if folder else ''
+        subfolders = set(entry[0][len(prefix):].split('/')[0] for entry in files
+                         if entry[0].startswith(prefix) and entry[0] != folder)
+        if len(subfolders) != 1:
+            return fallback or (folder, [])
+        folder = prefix + subfolders.pop()
+
+
+# Errors starting a process pool: no fork/semaphore support
+_POOL_ERRORS = (OSError, NotImplementedError, BrokenProcessPool)
+
+
+def _map_layers(function, args, workers=1, verbose=False):
+    """ Call `function` on each tuple in `args`, in a process pool when
+    `workers` allows, and return the results in order.
+
+    Falls back to calling `function` serially only if the pool can't be
+    started, or in a daemon process, which may not start children; errors
+    raised by `function` are raised as they are.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(args))
+    if workers > 1 and multiprocessing.current_process().daemon:
+        if verbose:
+            print('[PCB]: Daemon processes may not start a pool, parsing serially')
+        workers = 1
+    if workers > 1:
+        executor = None
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            futures = [executor.submit(function, *arg) for arg in args]
+        except _POOL_ERRORS as e:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            if verbose:
+                print('[PCB]: Parallel parse failed ({}), parsing serially'.format(e))
+        else:
+            with executor:
+                return [future.result() for future in futures]
+    return [function(*arg) for arg in args]
+
 
 class PCB(object):
 
     @classmethod
-    def from_directory(cls, directory, board_name=None, verbose=False):
-        layers = []
-        names = set()
+    def from_directory(cls, directory, board_name=None, verbose=False,
+                       workers=1):
+        """ Load every layer file in a directory.
+
+        Parameters
+        ----------
+        directory : string
+            Directory containing the layer files.
+
+        board_name : string, optional
+            Name of the board. Guessed from the filenames if not given.
+
+        verbose : bool, optional
+            Print which files were added or skipped.
+
+        workers : int, optional
+            Number of processes used to parse the files in parallel. 1 (the
+            default) parses them one after another, None uses one process
+            per CPU. Falls back to parsing serially if the process pool
+            can't be used.
 
+        Returns
+        -------
+        pcb : PCB
+        """
         # Validate
         directory = os.path.abspath(directory)
         if not os.path.isdir(directory):
             raise TypeError('{} is not a directory.'.format(directory))
 
         # Load gerber files
-        for filename in listdir(directory, True, True):
-            try:
-                camfile = gerber_read(os.path.join(directory, filename))
-                layer = PCBLayer.from_cam(camfile)
-                layers.append(layer)
-                name = os.path.splitext(filename)[0]
-                if len(os.path.splitext(filename)) > 1:
-                    _name, ext = os.path.splitext(name)
-                    if ext[1:] in layer_signatures(layer.layer_class):
-                        name = _name
-                    if layer.layer_class == 'drill' and 'drill' in ext:
-                        name = _name
-                names.add(name)
-                if verbose:
-                    print('[PCB]: Added {} layer <{}>'.format(layer.layer_class,
-                                                              filename))
-            except ParseError:
-                if verbose:
-                    print('[PCB]: Skipping file {}'.format(filename))
-            except IOError:
+        filenames = listdir(directory, True, True)
+        layers = _map_layers(_read_layer,
+                             [(os.path.join(directory, filename),) for filename in filenames],
+                             workers, verbose)
+        return cls._from_layers(filenames, layers, board_name,
+                                os.path.basename(directory), verbose)
+
+    @classmethod
+    def from_archive(cls, archive, board_name=None, verbose=False, workers=1,
+                     rename=None, max_members=MAX_ARCHIVE_MEMBERS,
+                     max_size=MAX_ARCHIVE_SIZE):
+        """ Load a board from a ZIP or RAR archive held in memory.
+
+        Nothing is written to disk. The layer files are picked the way
+        :meth:`from_directory` would if the archive were extracted: the
+        files at the top of the archive, or in its only folder. Members that
+        can't be layers are not decompressed.
+
+        Parameters
+        ----------
+        archive : bytes or file object
+            Archive contents, or a seekable binary file object.
+
+        board_name : string, optional
+            Name of the board. Guessed from the filenames if not given.
+
+        verbose : bool, optional
+            Print which files were added or skipped.
+
+        workers : int, optional
+            Number of processes used to parse the files in parallel. See
+            :meth:`from_directory`.
+
+        rename : callable, optional
+            Called with each member's filename. Returns the filename to use
+            instead, which decides the layer class, or None to skip the
+            member.
+
+        max_members : int, optional
+            Maximum number of entries in the archive. None for no limit.
+
+        max_size : int, optional
+            Maximum total uncompressed size in bytes of the members that are
+            read. None for no limit.
+
+        Returns
+        -------
+        pcb : PCB
+
+        Raises
+        ------
+        ArchiveError
+            If the archive can't be read or exceeds a limit.
+        """
+        if isinstance(archive, (bytes, bytearray, memoryview)):
+            archive = io.BytesIO(archive)
+
+        with _open_archive(archive) as archive_file:
+            members = archive_file.infolist()
+            if max_members is not None and len(members) > max_members:
+                raise ArchiveError('Archive has {} entries, more than the limit of {}.'
+                                   .format(len(members), max_members))
+
+            folder, candidates = _board_members(members)
+            selected = []
+            for _, filename, member in candidates:
+                name = rename(filename) if rename is not None else filename
+                if name is None:
+                    if verbose:
+                        print('[PCB]: Skipping file {}'.format(filename))
+                    continue
+                selected.append((name, member))
+
+            # Check the sizes in the archive directory first, then make sure
+            # the data actually read doesn't exceed them.
+            remaining = max_size
+            if max_size is not None:
+                declared = sum(member.file_size for _, member in selected)
+                if declared > max_size:
+                    raise ArchiveError('Archive layers are {} bytes uncompressed, more than the limit of {}.'
+                                       .format(declared, max_size))
+
+            args = []
+            for name, member in selected:
+                try:
+                    with archive_file.open(member) as f:
+                        data = f.read() if remaining is None else f.read(remaining + 1)
+                except _ARCHIVE_ERRORS as e:
+                    raise ArchiveError('Could not read {}: {}'.format(member.filename, e))
+                if remaining is not None:
+                    remaining -= len(data)
+                    if remaining < 0:
+                        raise ArchiveError('Archive layers exceed the uncompressed size limit of {} bytes.'
+                                           .format(max_size))
+                args.append((data, name))
+
+        names = [name for _, name in args]
+        layers = _map_layers(_load_layer, args, workers, verbose)
+        return cls._from_layers(names, layers, board_name,
+                                posixpath.basename(folder) or None, verbose)
+
+    @classmethod
+    def _from_layers(cls, filenames, layers, board_name, default_name, verbose):
+        """ Build a PCB from parsed files, guessing the board name from the
+        filenames if it isn't given. Files that aren't layers are None.
+        """
+        names = set()
+        board_layers = []
+        for filename, layer in zip(filenames, layers):
+            if layer is None:
                 if verbose:
                     print('[PCB]: Skipping file {}'.format(filename))
+                continue
+            board_layers.append(layer)
+            name = os.path.splitext(filename)[0]
+            if len(os.path.splitext(filename)) > 1:
+                _name, ext = os.path.splitext(name)
+                if ext[1:] in layer_signatures(layer.layer_class):
+                    name = _name
+                if layer.layer_class == 'drill' and 'drill' in ext:
+                    name = _name
+            names.add(name)
+            if verbose:
+                print('[PCB]: Added {} layer <{}>'.format(layer.layer_class,
+                                                          filename))
 
         # Try to guess board name
         if board_name is None:
             if len(names) == 1:
                 board_name = names.pop()
             else:
-                board_name = os.path.basename(directory)
+                board_name = default_name
         # Return PCB
-        return cls(layers, board_name)
+        return cls(board_layers, board_name)
 
     def __init__(self, layers, name=None):
         self.layers = sort_layers(layers)
@@ -91,6 +369,18 @@ class PCB(object):
         # Drill layer goes under soldermask for proper rendering of tented vias
         return [board_layers[0]] + drill_layers + board_layers[1:]
 
+    def has_top_layers(self):
+        """ True if the board has a top copper, mask or silkscreen layer
+        """
+        return any(l.layer_class in ('topsilk', 'topmask', 'top')
+                   for l in self.layers)
+
+    def has_bottom_layers(self):
+        """ True if the board has a bottom copper, mask or silkscreen layer
+        """
+        return any(l.layer_class in ('bottomsilk', 'bottommask', 'bottom')
+                   for l in self.layers)
+
     @property
     def drill_layers(self):
         return [l for l in self.layers if l.layer_class == 'drill']
@@ -16,6 +16,7 @@
 # limitations under the License.
 
 
+import copy
 import math
 from operator import add
 from itertools import combinations
@@ -1359,9 +1360,14 @@ class Outline(Primitive):
     They don't exist outside of AMGroup objects
     """
 
-    def __init__(self, primitives, **kwargs):
+    def __init__(self, primitives, arcs=None, **kwargs):
         super(Outline, self).__init__(**kwargs)
         self.primitives = primitives
+        # (first, last, start_angle, end_angle) for each run of lines
+        # primitives[first:last] that approximates a circular arc, so that
+        # renderers can draw the arc itself. The arc's center and radius
+        # follow from the run's end points, so they need no conversion.
+        self.arcs = arcs or []
         self._to_convert = ['primitives']
 
         if self.primitives[0].start != self.primitives[-1].end:
@@ -1389,6 +1395,22 @@ class Outline(Primitive):
         for p in self.primitives:
             p.offset(x_offset, y_offset)
 
+    def arc_circle(self, first, last, start_angle, end_angle):
+        """ Return the (center, radius) of the arc approximated by
+        primitives[first:last], or None if its sweep is too small to tell.
+        Like the outline's path, the run starts where the line before it
+        ends, or at the outline's start.
+        """
+        start = self.primitives[first - 1].end if first else self.primitives[0].start
+        end = self.primitives[last - 1].end
+        half_sweep = abs(math.sin((end_angle - start_angle) / 2.0))
+        if half_sweep < 1e-9:
+            return None
+        radius = math.hypot(end[0] - start[0], end[1] - start[1]) / (2 * half_sweep)
+        center = (start[0] - radius * math.cos(start_angle),
+                  start[1] - radius * math.sin(start_angle))
+        return center, radius
+
     @property
     def vertices(self):
         if self._vertices is None:
@@ -1695,3 +1717,164 @@ class TestRecord(Primitive):
         self.net_name = net_name
         self.layer = layer
         self._to_convert = ['position']
+
+
+class Flash(object):
+    """ A single flash of an aperture
+
+    Parsers emit one of these for every flash instead of a positioned copy of
+    the aperture. The aperture, placed at the origin, is shared by all flashes
+    of it and must not be modified; the record only holds what differs from
+    one flash to the next. `position`, `level_polarity`, `units`,
+    `rotation`, `flashed` and `bounding_box` are answered by the record and
+    moving it with `offset` only updates the record. Other attributes are read
+    from a concrete primitive that is built for the read and not kept. Any
+    other mutation makes a concrete primitive that takes over from the record
+    from then on.
+
+    Parameters
+    ----------
+    aperture : Primitive
+        Aperture primitive positioned at (0, 0)
+
+    position : tuple
+        Position of the flash
+
+    level_polarity : string
+        'dark' or 'clear'
+
+    units : string
+        'inch' or 'metric'
+    """
+    __slots__ = ('aperture', '_position', '_level_polarity', '_units',
+                 '_primitive')
+
+    def __init__(self, aperture, position, level_polarity='dark', units=None):
+        object.__setattr__(self, 'aperture', aperture)
+        object.__setattr__(self, '_position', position)
+        object.__setattr__(self, '_level_polarity', level_polarity)
+        object.__setattr__(self, '_units', units)
+        object.__setattr__(self, '_primitive', None)
+
+    def __getattr__(self, name):
+        # Only called for names the record doesn't have itself
+        if name.startswith('__') or name in Flash.__slots__:
+            raise AttributeError(name)
+        return getattr(self.to_primitive(), name)
+
+    def __setattr__(self, name, value):
+        if hasattr(Flash, name):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.primitive, name, value)
+
+    def __repr__(self):
+        return '<Flash {} at {}>'.format(self.shape, self.position)
+
+    @property
+    def materialized(self):
+        """ True once the flash has its own concrete primitive """
+        return self._primitive is not None
+
+    @property
+    def primitive(self):
+        """ The concrete primitive for this flash, made on first use """
+        if self._primitive is None:
+            object.__setattr__(self, '_primitive', self._build())
+        return self._primitive
+
+    @property
+    def shape(self):
+        """ The concrete primitive if there is one, otherwise the shared
+        aperture. Either way it has the flash's shape, but only the concrete
+        primitive has the flash's position.
+        """
+        return self.aperture if self._primitive is None else self._primitive
+
+    @property
+    def flashed(self):
+        return True
+
+    @property
+    def position(self):
+        return self._position if self._primitive is None else self._primitive.position
+
+    @position.setter
+    def position(self, value):
+        if self._primitive is None:
+            object.__setattr__(self, '_position', value)
+        else:
+            self._primitive.position = value
+
+    @property
+    def level_polarity(self):
+        return (self._level_polarity if self._primitive is None
+                else self._primitive.level_polarity)
+
+    @level_polarity.setter
+    def level_polarity(self, value):
+        if self._primitive is None:
+            object.__setattr__(self, '_level_polarity', value)
+        else:
+            self._primitive.level_polarity = value
+
+    @property
+    def units(self):
+        return self._units if self._primitive is None else self._primitive.units
+
+    @units.setter
+    def units(self, value):
+        if self._primitive is None:
+            object.__setattr__(self, '_units', value)
+        else:
+            self._primitive.units = value
+
+    @property
+    def rotation(self):
+        return self.shape.rotation
+
+    @rotation.setter
+    def rotation(self, value):
+        self.primitive.rotation = value
+
+    @property
+    def bounding_box(self):
+        if self._primitive is not None:
+            return self._primitive.bounding_box
+        (min_x, max_x), (min_y, max_y) = self.aperture.bounding_box
+        x, y = self._position
+        return ((min_x + x, max_x + x), (min_y + y, max_y + y))
+
+    def offset(self, x_offset=0, y_offset=0):
+        if self._primitive is None:
+            self.position = tuple(map(add, self._position, (x_offset, y_offset)))
+        else:
+            self._primitive.offset(x_offset, y_offset)
+
+    def to_inch(self):
+        if self.units == 'metric':
+            self.primitive.to_inch()
+
+    def to_metric(self):
+        if self.units == 'inch':
+            self.primitive.to_metric()
+
+    def to_primitive(self):
+        """ Return a concrete primitive for this flash
+
+        Returns the flash's own primitive if it has been made. Otherwise a new
+        one is built and not kept, which suits read-only callers such as
+        renderers.
+        """
+        return self._primitive if self._primitive is not None else self._build()
+
+    def _build(self):
+        if isinstance(self.aperture, AMGroup):
+            # Moving a macro moves its sub-primitives, so they can't be shared
+            primitive = copy.deepcopy(self.aperture)
+        else:
+            primitive = copy.copy(self.aperture)
+        primitive.position = self._position
+        primitive.level_polarity = self._level_polarity
+        primitive.units = self._units
+        return primitive
@@ -21,24 +21,58 @@ try:
 except ImportError:
     import cairocffi as cairo
 
+from concurrent.futures import ThreadPoolExecutor
 from operator import mul
 import tempfile
 import copy
 import os
 
-from .render import GerberContext, RenderSettings
+from .render import (GerberContext, RenderSettings, DotRun, batch_primitives,
+                     lod_primitives)
 from .theme import THEMES
 from ..primitives import *
 from ..utils import rotate_point
 
 from io import BytesIO
 
+# Flashes whose stamp would be larger than this many pixels on a side are
+# drawn as vectors instead; big pads gain nothing from caching.
+STAMP_MAX_SIZE = 256
+
+# With level of detail enabled, curves are flattened to within this fraction
+# of the LOD threshold (cairo's default tolerance is 0.1 pixel)
+LOD_CURVE_TOLERANCE = 0.25
+
+# Number of sub-pixel positions a stamp is cached for along each axis. Stamps
+# are placed at most half a step away from the exact flash position.
+STAMP_SUBPIXEL_STEPS = 4
+
+# Flashes narrower than this many pixels are drawn as vectors, as are flashes
+# whose stamp would land further from the exact position than this fraction
+# of their width; a snapped edge shows on small pads.
+STAMP_MIN_SIZE = 4
+STAMP_MAX_ERROR = 0.01
 
 class GerberCairoContext(GerberContext):
 
-    def __init__(self, scale=300):
+    def __init__(self, scale=300, raster=False, batch=True, stamp=True,
+                 min_feature=0.0, lod=0.0, tiles=1, threads=None):
         super(GerberCairoContext, self).__init__()
         self.scale = (scale, scale)
+        self.raster = raster
+        self.batch = batch
+        self.stamp = stamp
+        # Primitives smaller than this many pixels both ways are not drawn
+        self.min_feature = min_feature
+        # Level of detail: primitives smaller than this many pixels both ways
+        # are merged into dot fills (see `lod_primitives`), and curves are
+        # flattened to LOD_CURVE_TOLERANCE of it. 0 draws everything exactly.
+        self.lod = lod
+        # Raster mode: draw each layer as this many horizontal strips on a
+        # pool of `threads` threads (default one per strip); cairo releases
+        # the GIL while it rasterizes
+        self.tiles = tiles
+        self.threads = threads
         self.surface = None
         self.surface_buffer = None
         self.ctx = None
@@ -50,6 +84,9 @@ class GerberCairoContext(GerberContext):
         self.size_in_inch = None
         self._xform_matrix = None
         self._render_count = 0
+        self._stamp_cache = {}
+        self._stamp_sizes = {}
+        self._flash_stamp_keys = {}
 
     @property
     def origin_in_pixels(self):
@@ -72,8 +109,13 @@ class GerberCairoContext(GerberContext):
                                           x0=-self.origin_in_pixels[0],
                                           y0=self.size_in_pixels[1])
         if (self.surface is None) or new_surface:
-            self.surface_buffer = tempfile.NamedTemporaryFile()
-            self.surface = cairo.SVGSurface(self.surface_buffer, size_in_pixels[0], size_in_pixels[1])
+            if self.raster:
+                self.surface_buffer = None
+                self.surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                                  *self._surface_size(size_in_pixels))
+            else:
+                self.surface_buffer = tempfile.NamedTemporaryFile()
+                self.surface = cairo.SVGSurface(self.surface_buffer, size_in_pixels[0], size_in_pixels[1])
             self.output_ctx = cairo.Context(self.surface)
 
     def render_layer(self, layer, filename=None, settings=None, bgsettings=None,
@@ -99,11 +141,12 @@ class GerberCairoContext(GerberContext):
         if filename is not None:
             self.dump(filename, verbose)
 
-    def render_layers(self, layers, filename, theme=THEMES['default'],
-                      verbose=False, max_width=800, max_height=600):
-        """ Render a set of layers
+    def fit_layers(self, layers, max_width=800, max_height=600):
+        """ Set the scale at which `layers` fit in max_width x max_height pixels
+
+        This is the scale `render_layers` renders at. The scale is rounded
+        down to a whole number of pixels per unit.
         """
-        # Calculate scale parameter
         x_range = [10000, -10000]
         y_range = [10000, -10000]
         for layer in layers:
@@ -120,6 +163,11 @@ class GerberCairoContext(GerberContext):
         scale = math.floor(min(float(max_width)/width, float(max_height)/height))
         self.scale = (scale, scale)
 
+    def render_layers(self, layers, filename, theme=THEMES['default'],
+                      verbose=False, max_width=800, max_height=600):
+        """ Render a set of layers
+        """
+        self.fit_layers(layers, max_width, max_height)
         self.clear()
 
         # Render layers
@@ -130,6 +178,44 @@ class GerberCairoContext(GerberContext):
                               verbose=verbose)
         self.dump(filename, verbose)
 
+    def render_window(self, layers, window, filename=None, theme=THEMES['default'],
+                      verbose=False):
+        """ Render the part of a set of layers inside `window`
+
+        The image covers `window` at the current scale, as `render_layers`
+        would draw that part of the board. Only the primitives the layers'
+        spatial indexes find in the window are drawn, so a small window of a
+        large board renders in a fraction of the time of the whole board.
+        Mirrored layers are mirrored about the center of the window.
+
+        Parameters
+        ----------
+        layers : list of PCBLayer
+            Layers in drawing order
+
+        window : tuple
+            ((xmin, xmax), (ymin, ymax)) region to render, in board units
+
+        filename : string
+            Where to save the image; None returns PNG data in raster mode
+        """
+        self.clear()
+        self.set_bounds(window)
+        self.paint_background(theme['background'])
+        # Primitives up to a pixel outside the window can still touch its
+        # edge pixels
+        (xmin, xmax), (ymin, ymax) = window
+        margin_x = 1.0 / self.scale[0]
+        margin_y = 1.0 / self.scale[1]
+        query = ((xmin - margin_x, xmax + margin_x), (ymin - margin_y, ymax + margin_y))
+        for layer in layers:
+            settings = theme.get(layer.layer_class, RenderSettings())
+            if verbose:
+                print('[Render]: Rendering {} Layer window.'.format(layer.layer_class))
+            self._render_count += 1
+            self._render_layer(layer, settings, layer.query(query))
+        return self.dump(filename, verbose)
+
     def dump(self, filename=None, verbose=False):
         """ Save image as `filename`
         """
@@ -139,6 +225,8 @@ class GerberCairoContext(GerberContext):
             is_svg = False
         if verbose:
             print('[Render]: Writing image to {}'.format(filename))
+        if is_svg and self.raster:
+            raise ValueError('SVG output is not available in raster mode')
         if is_svg:
             self.surface.finish()
             self.surface_buffer.flush()
@@ -159,6 +247,8 @@ class GerberCairoContext(GerberContext):
     def dump_svg_str(self):
         """ Return a string containg the rendered SVG.
         """
+        if self.raster:
+            raise ValueError('SVG output is not available in raster mode')
         self.surface.finish()
         self.surface_buffer.flush()
         return self.surface_buffer.read()
@@ -173,35 +263,497 @@ class GerberCairoContext(GerberContext):
         self._render_count = 0
         self.surface_buffer = None
 
-    def _new_mask(self):
+    def _new_mask(self, isolated=False):
+        """ Return a context manager providing a drawing target for one primitive
+
+        In vector mode every primitive is drawn into its own full-size mask
+        surface, which is composited onto the layer on exit. In raster mode the
+        primitive is drawn straight onto the layer context using the operator
+        already selected for its polarity. Primitives that punch holes into
+        themselves must pass `isolated=True`; they are then drawn into a
+        temporary group bounded by the current clip so the hole does not
+        erase whatever is underneath.
+        """
         class Mask:
             def __enter__(msk):
                 size_in_pixels = self.size_in_pixels
                 msk.surface = cairo.SVGSurface(None, size_in_pixels[0],
                                                size_in_pixels[1])
                 msk.ctx = cairo.Context(msk.surface)
+                msk.ctx.set_tolerance(self._curve_tolerance())
                 msk.ctx.translate(-self.origin_in_pixels[0], -self.origin_in_pixels[1])
                 return msk
 
 
             def __exit__(msk, exc_type, exc_val, traceback):
+                if exc_type is None:
+                    self.ctx.mask_surface(msk.surface, self.origin_in_pixels[0])
                 if hasattr(msk.surface, 'finish'):
                     msk.surface.finish()
 
-        return Mask()
+        class DirectMask:
+            def __enter__(msk):
+                msk.ctx = self.ctx
+                if isolated:
+                    msk.ctx.push_group_with_content(cairo.CONTENT_ALPHA)
+                    msk.ctx.set_operator(cairo.OPERATOR_OVER)
+                return msk
+
+            def __exit__(msk, exc_type, exc_val, traceback):
+                if isolated:
+                    # pop_group() restores the operator chosen for the
+                    # primitive's polarity before the group is applied
+                    pattern = msk.ctx.pop_group()
+                    if exc_type is None:
+                        msk.ctx.mask(pattern)
+
+        return DirectMask() if self.raster else Mask()
+
+    def render_layer_mask(self, layer, mirror=False, invert=False):
+        """ Rasterize a layer into an 8-bit coverage mask
+
+        The layer is drawn exactly as `render_layer` draws it before
+        compositing it in its color, so compositing the mask in that color
+        gives the same pixels. Only available in raster mode, once the
+        bounds are set.
+
+        Parameters
+        ----------
+        layer : PCBLayer
+            Layer to rasterize
+
+        mirror : bool
+            Mirror the layer horizontally, as `RenderSettings.mirror` does
+
+        invert : bool
+            Cover everything but the layer's primitives, as
+            `RenderSettings.invert` does
+
+        Returns
+        -------
+        mask : cairo.ImageSurface
+            FORMAT_A8 surface the size of the image
+        """
+        if not self.raster:
+            raise ValueError('Layer masks are only available in raster mode')
+        self.invert = invert
+        self._draw_layer(layer, mirror)
+        mask = self.active_layer
+        mask.flush()
+        self.ctx = None
+        self.active_layer = None
+        self.active_matrix = None
+        return mask
 
-    def _render_layer(self, layer, settings):
+    def _render_layer(self, layer, settings, primitives=None):
         self.invert = settings.invert
-        # Get a new clean layer to render on
-        self.new_render_layer(mirror=settings.mirror)
-        for prim in layer.primitives:
-            self.render(prim)
+        # Get a new clean layer to render on, and draw the primitives
+        self._draw_layer(layer, settings.mirror, primitives)
         # Add layer to image
         self.flatten(settings.color, settings.alpha)
 
+    def _draw_layer(self, layer, mirror, primitives=None):
+        """ Draw a layer's primitives (or `primitives`) into a new active layer
+        """
+        if primitives is None:
+            primitives = layer.primitives
+        rows = self._surface_size(self.size_in_pixels)[1]
+        if not self.raster or self.tiles <= 1 or rows < 2:
+            self.new_render_layer(mirror=mirror)
+            self._draw_primitives(primitives)
+            return
+
+        tiles = min(self.tiles, rows)
+        edges = [rows * index // tiles for index in range(tiles + 1)]
+        strips = list(zip(edges[:-1], edges[1:]))
+        if primitives is layer.primitives:
+            # Build the index once, before the strips query it
+            layer.spatial_index
+        with ThreadPoolExecutor(max_workers=self.threads or tiles) as executor:
+            surfaces = list(executor.map(
+                lambda strip: self._draw_tile(layer, mirror, primitives, *strip), strips))
+
+        # Stitch the strips into a full size layer
+        self.new_render_layer(mirror=mirror)
+        width = self._surface_size(self.size_in_pixels)[0]
+        ctx = cairo.Context(self.active_layer)
+        ctx.set_operator(cairo.OPERATOR_SOURCE)
+        for (top, bottom), surface in zip(strips, surfaces):
+            ctx.set_source_surface(surface, 0, top)
+            ctx.rectangle(0, top, width, bottom - top)
+            ctx.fill()
+
+    def _draw_tile(self, layer, mirror, primitives, top, bottom):
+        """ Draw the rows from `top` to `bottom` of a layer on a new surface
+
+        The strip is drawn by a context of its own, with the layer's matrix
+        shifted up by a whole number of pixels so the pixels are the same as
+        the single surface render's. Only primitives within a pixel of the
+        strip are drawn.
+        """
+        tile = self.__class__(raster=True, batch=self.batch, stamp=self.stamp,
+                              min_feature=self.min_feature, lod=self.lod)
+        tile.scale = self.scale
+        tile.origin_in_inch = self.origin_in_inch
+        tile.size_in_inch = self.size_in_inch
+        tile._xform_matrix = self._xform_matrix
+        tile.invert = self.invert
+        tile.new_render_layer(mirror=mirror, rows=(top, bottom))
+
+        # Device row r is at y = (size + origin - r) / scale
+        top_y = (self.size_in_pixels[1] + self.origin_in_pixels[1] - top + 1) / self.scale[1]
+        bottom_y = (self.size_in_pixels[1] + self.origin_in_pixels[1] - bottom - 1) / self.scale[1]
+        window = ((float('-inf'), float('inf')), (bottom_y, top_y))
+        if primitives is layer.primitives:
+            primitives = layer.query(window)
+        else:
+            primitives = [primitive for primitive in primitives
+                          if bottom_y <= primitive.bounding_box[1][1] and
+                          primitive.bounding_box[1][0] <= top_y]
+        tile._draw_primitives(primitives)
+        tile.active_layer.flush()
+        return tile.active_layer
+
+    def _draw_primitives(self, primitives):
+        if self.min_feature > 0:
+            primitives = self._visible_primitives(primitives)
+        if self.lod > 0:
+            primitives = lod_primitives(primitives, 1.0 / self.scale[0], self.lod)
+        if self.batch:
+            for batch in batch_primitives(primitives):
+                self.render_batch(batch)
+        else:
+            for prim in primitives:
+                self.render(prim)
+
+    def _visible_primitives(self, primitives):
+        """ Primitives at least `min_feature` pixels wide or high
+
+        Smaller ones only tint a pixel or two; leaving them out makes quick
+        previews cheaper.
+        """
+        min_width = self.min_feature / self.scale[0]
+        min_height = self.min_feature / self.scale[1]
+        for primitive in primitives:
+            (xmin, xmax), (ymin, ymax) = primitive.bounding_box
+            if xmax - xmin >= min_width or ymax - ymin >= min_height:
+                yield primitive
+
+    def render(self, primitive):
+        if isinstance(primitive, DotRun):
+            self._render_dots(primitive)
+        else:
+            super(GerberCairoContext, self).render(primitive)
+
+    def _render_dots(self, run):
+        """ Fill the dots of a `DotRun` from the level-of-detail pass at once
+        """
+        self.ctx.set_operator(cairo.OPERATOR_OVER
+                              if (not self.invert)
+                                 and run.level_polarity == 'dark'
+                              else cairo.OPERATOR_CLEAR)
+        with self._new_mask() as mask:
+            mask.ctx.set_line_width(0)
+            for x, y, side in run.dots:
+                x, y = self.scale_point((x, y))
+                side *= self.scale[0]
+                mask.ctx.rectangle(x - side / 2.0, y - side / 2.0, side, side)
+            mask.ctx.fill()
+
+    def _curve_tolerance(self):
+        if self.lod > 0:
+            return max(0.1, self.lod * LOD_CURVE_TOLERANCE)
+        return 0.1
+
+    def render_batch(self, batch):
+        """ Draw a batch from `batch_primitives` with a single stroke or fill
+        """
+        if len(batch) == 1:
+            self.render(batch[0])
+            return
+        first = batch[0]
+        self.ctx.set_operator(cairo.OPERATOR_OVER
+                              if (not self.invert)
+                                 and first.level_polarity == 'dark'
+                              else cairo.OPERATOR_CLEAR)
+        with self._new_mask() as mask:
+            if isinstance(first, (Line, Arc)):
+                mask.ctx.set_line_width(first.aperture.diameter * self.scale[0])
+                mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+                for primitive in batch:
+                    if isinstance(primitive, Line):
+                        self._line_path(mask.ctx, primitive)
+                    else:
+                        self._arc_path(mask.ctx, primitive)
+                mask.ctx.stroke()
+            else:
+                # Flash outlines all wind the same way, so a single
+                # non-zero fill gives the union of the pads.
+                shape = first.shape if isinstance(first, Flash) else first
+                add_path = {Circle: self._circle_path,
+                            Rectangle: self._rectangle_path,
+                            Obround: self._obround_path,
+                            Polygon: self._polygon_path}[type(shape)]
+                mask.ctx.set_line_width(0)
+                for primitive in batch:
+                    if self._stamp_flash(primitive):
+                        continue
+                    if isinstance(primitive, Flash):
+                        primitive = primitive.to_primitive()
+                    add_path(mask.ctx, primitive)
+                mask.ctx.fill()
+
+    def _line_path(self, ctx, line):
+        ctx.move_to(*self.scale_point(line.start))
+        ctx.line_to(*self.scale_point(line.end))
+
+    def _arc_path(self, ctx, arc):
+        center = self.scale_point(arc.center)
+        radius = self.scale[0] * arc.radius
+        two_pi = 2 * math.pi
+        angle1 = (arc.start_angle + two_pi) % two_pi
+        angle2 = (arc.end_angle + two_pi) % two_pi
+        if angle1 == angle2 and arc.quadrant_mode != 'single-quadrant':
+            # Make the angles slightly different otherwise Cario will draw nothing
+            angle2 -= 0.000000001
+        ctx.move_to(*self.scale_point(arc.start))  # You actually have to do this...
+        if arc.direction == 'counterclockwise':
+            ctx.arc(center[0], center[1], radius, angle1, angle2)
+        else:
+            ctx.arc_negative(center[0], center[1], radius, angle1, angle2)
+        ctx.move_to(*self.scale_point(arc.end))  # ...lame
+
+    def _circle_path(self, ctx, circle):
+        center = self.scale_point(circle.position)
+        # arc() would otherwise join this circle to the previous one
+        ctx.new_sub_path()
+        ctx.arc(center[0], center[1], (circle.radius * self.scale[0]), 0, (2 * math.pi))
+
+    def _rectangle_path(self, ctx, rectangle):
+        lower_left = self.scale_point(rectangle.lower_left)
+        width, height = tuple([abs(coord) for coord in
+                               self.scale_point((rectangle.width,
+                                                 rectangle.height))])
+        ctx.rectangle(lower_left[0], lower_left[1], width, height)
+
+    def _obround_path(self, ctx, obround):
+        subshapes = obround.subshapes
+        for circle in (subshapes['circle1'], subshapes['circle2']):
+            self._circle_path(ctx, circle)
+        self._rectangle_path(ctx, subshapes['rectangle'])
+
+    def _polygon_path(self, ctx, polygon):
+        vertices = polygon.vertices
+        # Start from before the end so it is easy to iterate and make sure
+        # it is closed
+        ctx.move_to(*self.scale_point(vertices[-1]))
+        for v in vertices:
+            ctx.line_to(*self.scale_point(v))
+        ctx.close_path()
+
+    def _outline_path(self, ctx, outline):
+        """ Add an outline, drawing the arcs its lines approximate as arcs
+        so cairo flattens them to its tolerance at the render scale
+        """
+        arcs = dict((arc[0], arc) for arc in outline.arcs)
+        primitives = outline.primitives
+        ctx.move_to(*self.scale_point(primitives[0].start))
+        index = 0
+        while index < len(primitives):
+            arc = arcs.get(index)
+            circle = outline.arc_circle(*arc) if arc is not None else None
+            if circle is None:
+                ctx.line_to(*self.scale_point(primitives[index].end))
+                index += 1
+                continue
+            first, last, angle1, angle2 = arc
+            center = self.scale_point(circle[0])
+            radius = self.scale[0] * circle[1]
+            if angle2 > angle1:
+                ctx.arc(center[0], center[1], radius, angle1, angle2)
+            else:
+                ctx.arc_negative(center[0], center[1], radius, angle1, angle2)
+            index = last
+        ctx.close_path()
+
+    def _stamp_flash(self, primitive):
+        """ Draw a flash by stamping a cached raster of its aperture
+
+        Stamps are kept per render layer, keyed by the flash geometry, the
+        scale, the layer transform and the flash's sub-pixel phase, so every
+        distinct pad shape is rasterized at most `STAMP_SUBPIXEL_STEPS ** 2`
+        times per layer. The operator selected for the flash's polarity is
+        used to apply the stamp.
+
+        Returns False, leaving the flash to the vector path, if stamping is
+        disabled, the context is not in raster mode or the flash can't be
+        stamped (holes, clear sub-primitives, oversized pads). Flashes under
+        `STAMP_MIN_SIZE` pixels wide, or that the phase would move by more
+        than `STAMP_MAX_ERROR` of their width, are left to it too.
+        """
+        if not (self.raster and self.stamp):
+            return False
+        if isinstance(primitive, Flash) and not primitive.materialized:
+            # Flash records share their aperture, so its identity is enough
+            # to look up the shape's key.
+            shape = primitive.aperture
+            try:
+                key = self._flash_stamp_keys[id(shape)]
+            except KeyError:
+                key = self._stamp_key(shape, (0, 0))
+                if key is not None:
+                    key = ('Flash', id(shape))
+                self._flash_stamp_keys[id(shape)] = key
+            shape_center = (0.0, 0.0)
+        else:
+            shape = primitive.to_primitive() if isinstance(primitive, Flash) else primitive
+            key = self._stamp_key(shape, shape.position)
+            shape_center = None
+        if key is None:
+            return False
+
+        matrix = self.ctx.get_matrix()
+        key = (key, self.scale, matrix.xx, matrix.yx, matrix.xy, matrix.yy)
+        try:
+            size = self._stamp_sizes[key]
+        except KeyError:
+            size = self._stamp_sizes[key] = self._device_size(shape, matrix)
+        if size < STAMP_MIN_SIZE:
+            return False
+
+        center = self.scale_point(primitive.position)
+        if shape_center is None:
+            shape_center = center
+        x, y = self.ctx.user_to_device(*center)
+        steps = STAMP_SUBPIXEL_STEPS
+        phase_x = int(round((x - math.floor(x)) * steps))
+        phase_y = int(round((y - math.floor(y)) * steps))
+        error = max(abs(x - math.floor(x) - float(phase_x) / steps),
+                    abs(y - math.floor(y) - float(phase_y) / steps))
+        if error > STAMP_MAX_ERROR * size:
+            return False
+        # A phase that rounds up to a whole step lands on the next pixel
+        pixel_x = int(math.floor(x)) + phase_x // steps
+        pixel_y = int(math.floor(y)) + phase_y // steps
+        phase_x, phase_y = phase_x % steps, phase_y % steps
+
+        key += (phase_x, phase_y)
+        try:
+            stamp = self._stamp_cache[key]
+        except KeyError:
+            stamp = self._new_stamp(shape, shape_center, matrix,
+                                    float(phase_x) / steps,
+                                    float(phase_y) / steps)
+            self._stamp_cache[key] = stamp
+        if stamp is None:
+            return False
+
+        surface, left, top = stamp
+        self.ctx.save()
+        self.ctx.identity_matrix()
+        self.ctx.mask_surface(surface, pixel_x + left, pixel_y + top)
+        self.ctx.restore()
+        return True
+
+    def _stamp_key(self, primitive, origin):
+        """ Return a hashable description of a flash's shape relative to
+        `origin`, or None if the flash can't be stamped.
+        """
+        def relative(point):
+            return (round(point[0] - origin[0], 9), round(point[1] - origin[1], 9))
+
+        kind = type(primitive)
+        if kind is AMGroup:
+            if primitive.position is None or not primitive.primitives:
+                return None
+            parts = []
+            for sub in primitive.primitives:
+                # Clear sub-primitives erase copper outside the macro too
+                if sub.level_polarity != 'dark':
+                    return None
+                part = self._stamp_key(sub, origin)
+                if part is None:
+                    return None
+                parts.append(part)
+            return ('AMGroup',) + tuple(parts)
+        if kind is Outline:
+            if not all(type(line) is Line for line in primitive.primitives):
+                return None
+            return (('Outline', tuple(primitive.arcs))
+                    + tuple((relative(line.start), relative(line.end))
+                            for line in primitive.primitives))
+        if kind in (Circle, Drill):
+            if self._has_hole(primitive):
+                return None
+            return ('Circle', primitive.diameter, relative(primitive.position))
+        if kind in (Rectangle, Obround):
+            if self._has_hole(primitive):
+                return None
+            return (kind.__name__, primitive.width, primitive.height,
+                    primitive.rotation, relative(primitive.position))
+        if kind is Polygon:
+            if self._has_hole(primitive):
+                return None
+            return ('Polygon', primitive.sides, primitive.radius,
+                    primitive.rotation, relative(primitive.position))
+        return None
+
+    def _device_size(self, primitive, matrix):
+        """ Narrower side, in device pixels, of a flash's bounding box
+        """
+        (min_x, max_x), (min_y, max_y) = primitive.bounding_box
+        corners = [matrix.transform_distance(self.scale[0] * px, self.scale[1] * py)
+                   for px in (min_x, max_x) for py in (min_y, max_y)]
+        xs, ys = zip(*corners)
+        return min(max(xs) - min(xs), max(ys) - min(ys))
+
+    def _new_stamp(self, primitive, center, matrix, phase_x, phase_y):
+        """ Rasterize a flash into an A8 stamp
+
+        The flash center is placed `phase_x`, `phase_y` pixels into the pixel
+        that is moved to the flash's device position when stamping. Returns
+        (surface, left, top), with `left` and `top` the offset of the stamp's
+        top left corner from that pixel, or None if the stamp would be larger
+        than `STAMP_MAX_SIZE`.
+        """
+        (min_x, max_x), (min_y, max_y) = primitive.bounding_box
+        corners = [matrix.transform_distance(self.scale[0] * px - center[0],
+                                             self.scale[1] * py - center[1])
+                   for px in (min_x, max_x) for py in (min_y, max_y)]
+        xs, ys = zip(*corners)
+        # One pixel of padding covers antialiasing and the phase shift
+        left = int(math.floor(min(xs))) - 1
+        top = int(math.floor(min(ys))) - 1
+        width = int(math.ceil(max(xs))) + 2 - left
+        height = int(math.ceil(max(ys))) + 2 - top
+        if max(width, height) > STAMP_MAX_SIZE:
+            return None
+
+        surface = cairo.ImageSurface(cairo.FORMAT_A8, width, height)
+        ctx = cairo.Context(surface)
+        ctx.set_tolerance(self._curve_tolerance())
+        offset_x, offset_y = matrix.transform_distance(*center)
+        ctx.set_matrix(cairo.Matrix(matrix.xx, matrix.yx, matrix.xy, matrix.yy,
+                                    phase_x - left - offset_x,
+                                    phase_y - top - offset_y))
+        shapes = (primitive.primitives if isinstance(primitive, AMGroup)
+                  else [primitive])
+        for shape in shapes:
+            if isinstance(shape, Outline):
+                self._outline_path(ctx, shape)
+            elif isinstance(shape, Rectangle):
+                self._rectangle_path(ctx, shape)
+            elif isinstance(shape, Obround):
+                self._obround_path(ctx, shape)
+            elif isinstance(shape, Polygon):
+                self._polygon_path(ctx, shape)
+            else:
+                self._circle_path(ctx, shape)
+            ctx.fill()
+        surface.flush()
+        return surface, left, top
+
     def _render_line(self, line, color):
-        start = self.scale_point(line.start)
-        end = self.scale_point(line.end)
         self.ctx.set_operator(cairo.OPERATOR_OVER
                               if (not self.invert)
                                  and line.level_polarity == 'dark'
@@ -213,8 +765,7 @@ class GerberCairoContext(GerberContext):
                     width = line.aperture.diameter
                     mask.ctx.set_line_width(width * self.scale[0])
                     mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND)
-                    mask.ctx.move_to(*start)
-                    mask.ctx.line_to(*end)
+                    self._line_path(mask.ctx, line)
                     mask.ctx.stroke()
 
                 elif hasattr(line, 'vertices') and line.vertices is not None:
@@ -224,19 +775,8 @@ class GerberCairoContext(GerberContext):
                     for point in points:
                         mask.ctx.line_to(*point)
                     mask.ctx.fill()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
 
     def _render_arc(self, arc, color):
-        center = self.scale_point(arc.center)
-        start = self.scale_point(arc.start)
-        end = self.scale_point(arc.end)
-        radius = self.scale[0] * arc.radius
-        two_pi = 2 * math.pi
-        angle1 = (arc.start_angle + two_pi) % two_pi
-        angle2 = (arc.end_angle + two_pi) % two_pi
-        if angle1 == angle2 and arc.quadrant_mode != 'single-quadrant':
-            # Make the angles slightly different otherwise Cario will draw nothing
-            angle2 -= 0.000000001
         if isinstance(arc.aperture, Circle):
             width = arc.aperture.diameter if arc.aperture.diameter != 0 else 0.001
         else:
@@ -250,13 +790,7 @@ class GerberCairoContext(GerberContext):
             with self._new_mask() as mask:
                 mask.ctx.set_line_width(width * self.scale[0])
                 mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND if isinstance(arc.aperture, Circle) else cairo.LINE_CAP_SQUARE)
-                mask.ctx.move_to(*start)  # You actually have to do this...
-                if arc.direction == 'counterclockwise':
-                    mask.ctx.arc(center[0], center[1], radius, angle1, angle2)
-                else:
-                    mask.ctx.arc_negative(center[0], center[1], radius,
-                                          angle1, angle2)
-                mask.ctx.move_to(*end)  # ...lame
+                self._arc_path(mask.ctx, arc)
                 mask.ctx.stroke()
 
                 #if isinstance(arc.aperture, Rectangle):
@@ -271,8 +805,6 @@ class GerberCairoContext(GerberContext):
                 #                           point[1] - height/2.0, width, height)
                 #        mask.ctx.fill()
 
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
-
     def _render_region(self, region, color):
         self.ctx.set_operator(cairo.OPERATOR_OVER
                               if (not self.invert) and region.level_polarity == 'dark'
@@ -281,23 +813,25 @@ class GerberCairoContext(GerberContext):
             with self._new_mask() as mask:
                 mask.ctx.set_line_width(0)
                 mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND)
-                mask.ctx.move_to(*self.scale_point(region.primitives[0].start))
-                for prim in region.primitives:
-                    if isinstance(prim, Line):
-                        mask.ctx.line_to(*self.scale_point(prim.end))
-                    else:
-                        center = self.scale_point(prim.center)
-                        radius = self.scale[0] * prim.radius
-                        angle1 = prim.start_angle
-                        angle2 = prim.end_angle
-                        if prim.direction == 'counterclockwise':
-                            mask.ctx.arc(center[0], center[1], radius,
-                                         angle1, angle2)
+                if isinstance(region, Outline):
+                    self._outline_path(mask.ctx, region)
+                else:
+                    mask.ctx.move_to(*self.scale_point(region.primitives[0].start))
+                    for prim in region.primitives:
+                        if isinstance(prim, Line):
+                            mask.ctx.line_to(*self.scale_point(prim.end))
                         else:
-                            mask.ctx.arc_negative(center[0], center[1], radius,
-                                                  angle1, angle2)
+                            center = self.scale_point(prim.center)
+                            radius = self.scale[0] * prim.radius
+                            angle1 = prim.start_angle
+                            angle2 = prim.end_angle
+                            if prim.direction == 'counterclockwise':
+                                mask.ctx.arc(center[0], center[1], radius,
+                                             angle1, angle2)
+                            else:
+                                mask.ctx.arc_negative(center[0], center[1], radius,
+                                                      angle1, angle2)
                 mask.ctx.fill()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
 
     def _render_circle(self, circle, color):
         center = self.scale_point(circle.position)
@@ -305,10 +839,12 @@ class GerberCairoContext(GerberContext):
                               if (not self.invert)
                                  and circle.level_polarity == 'dark'
                               else cairo.OPERATOR_CLEAR)
+        if self._stamp_flash(circle):
+            return
         with self._clip_primitive(circle):
-            with self._new_mask() as mask:
+            with self._new_mask(isolated=self._has_hole(circle)) as mask:
                 mask.ctx.set_line_width(0)
-                mask.ctx.arc(center[0], center[1], (circle.radius * self.scale[0]), 0, (2 * math.pi))
+                self._circle_path(mask.ctx, circle)
                 mask.ctx.fill()
 
                 if hasattr(circle, 'hole_diameter') and circle.hole_diameter is not None and circle.hole_diameter > 0:
@@ -338,21 +874,18 @@ class GerberCairoContext(GerberContext):
                     for point in points:
                         mask.ctx.line_to(*point)
                     mask.ctx.fill()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
 
     def _render_rectangle(self, rectangle, color):
-        lower_left = self.scale_point(rectangle.lower_left)
-        width, height = tuple([abs(coord) for coord in
-                               self.scale_point((rectangle.width,
-                                                 rectangle.height))])
         self.ctx.set_operator(cairo.OPERATOR_OVER
                               if (not self.invert)
                                  and rectangle.level_polarity == 'dark'
                               else cairo.OPERATOR_CLEAR)
+        if self._stamp_flash(rectangle):
+            return
         with self._clip_primitive(rectangle):
-            with self._new_mask() as mask:
+            with self._new_mask(isolated=self._has_hole(rectangle)) as mask:
                 mask.ctx.set_line_width(0)
-                mask.ctx.rectangle(lower_left[0], lower_left[1], width, height)
+                self._rectangle_path(mask.ctx, rectangle)
                 mask.ctx.fill()
 
                 center = self.scale_point(rectangle.position)
@@ -381,15 +914,16 @@ class GerberCairoContext(GerberContext):
                     for point in points:
                         mask.ctx.line_to(*point)
                     mask.ctx.fill()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
 
     def _render_obround(self, obround, color):
         self.ctx.set_operator(cairo.OPERATOR_OVER
                               if (not self.invert)
                                  and obround.level_polarity == 'dark'
                               else cairo.OPERATOR_CLEAR)
+        if self._stamp_flash(obround):
+            return
         with self._clip_primitive(obround):
-            with self._new_mask() as mask:
+            with self._new_mask(isolated=self._has_hole(obround)) as mask:
                 mask.ctx.set_line_width(0)
 
                 # Render circles
@@ -434,24 +968,18 @@ class GerberCairoContext(GerberContext):
                         mask.ctx.line_to(*point)
                     mask.ctx.fill()
 
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
-
     def _render_polygon(self, polygon, color):
         self.ctx.set_operator(cairo.OPERATOR_OVER
                               if (not self.invert)
                                  and polygon.level_polarity == 'dark'
                               else cairo.OPERATOR_CLEAR)
+        if self._stamp_flash(polygon):
+            return
         with self._clip_primitive(polygon):
-            with self._new_mask() as mask:
-
-                vertices = polygon.vertices
+            with self._new_mask(isolated=self._has_hole(polygon)) as mask:
                 mask.ctx.set_line_width(0)
                 mask.ctx.set_line_cap(cairo.LINE_CAP_ROUND)
-                # Start from before the end so it is easy to iterate and make sure
-                # it is closed
-                mask.ctx.move_to(*self.scale_point(vertices[-1]))
-                for v in vertices:
-                    mask.ctx.line_to(*self.scale_point(v))
+                self._polygon_path(mask.ctx, polygon)
                 mask.ctx.fill()
 
                 center = self.scale_point(polygon.position)
@@ -487,8 +1015,6 @@ class GerberCairoContext(GerberContext):
                         mask.ctx.line_to(*point)
                     mask.ctx.fill()
 
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
-
     def _render_drill(self, circle, color=None):
         color = color if color is not None else self.drill_color
         self._render_circle(circle, color)
@@ -509,12 +1035,28 @@ class GerberCairoContext(GerberContext):
                 mask.ctx.move_to(*start)
                 mask.ctx.line_to(*end)
                 mask.ctx.stroke()
-                self.ctx.mask_surface(mask.surface, self.origin_in_pixels[0])
 
     def _render_amgroup(self, amgroup, color):
+        self.ctx.set_operator(cairo.OPERATOR_CLEAR if self.invert
+                              else cairo.OPERATOR_OVER)
+        if self._stamp_flash(amgroup):
+            return
         for primitive in amgroup.primitives:
             self.render(primitive)
 
+    def _render_flash_record(self, flash, color):
+        if flash.materialized:
+            self.render(flash.primitive)
+            return
+        # Macro sub-primitives carry their own polarity
+        dark = (isinstance(flash.aperture, AMGroup)
+                or flash.level_polarity == 'dark')
+        self.ctx.set_operator(cairo.OPERATOR_OVER
+                              if (not self.invert) and dark
+                              else cairo.OPERATOR_CLEAR)
+        if not self._stamp_flash(flash):
+            self.render(flash.to_primitive())
+
     def _render_test_record(self, primitive, color):
         position = [pos + origin for pos, origin in
                     zip(primitive.position, self.origin_in_inch)]
@@ -530,12 +1072,22 @@ class GerberCairoContext(GerberContext):
         self.ctx.show_text(primitive.net_name)
         self.ctx.scale(1, -1)
 
-    def new_render_layer(self, color=None, mirror=False):
+    def new_render_layer(self, color=None, mirror=False, rows=None):
         size_in_pixels = self.scale_point(self.size_in_inch)
         old = self._xform_matrix
         matrix = cairo.Matrix(old.xx, old.yx, old.xy, old.yy, old.x0, old.y0)
-        layer = cairo.SVGSurface(None, size_in_pixels[0], size_in_pixels[1])
+        if self.raster:
+            # Layers are only ever used as masks, so coverage is all we need
+            width, height = self._surface_size(size_in_pixels)
+            if rows is not None:
+                # A strip of the layer: rows[0] becomes the top row
+                height = rows[1] - rows[0]
+                matrix.y0 -= rows[0]
+            layer = cairo.ImageSurface(cairo.FORMAT_A8, width, height)
+        else:
+            layer = cairo.SVGSurface(None, size_in_pixels[0], size_in_pixels[1])
         ctx = cairo.Context(layer)
+        ctx.set_tolerance(self._curve_tolerance())
 
         if self.invert:
             ctx.set_source_rgba(0.0, 0.0, 0.0, 1.0)
@@ -546,6 +1098,13 @@ class GerberCairoContext(GerberContext):
             matrix.x0 = self.origin_in_pixels[0] + self.size_in_pixels[0]
         self.ctx = ctx
         self.ctx.set_matrix(matrix)
+        self._stamp_cache = {}
+        self._stamp_sizes = {}
+        self._flash_stamp_keys = {}
+        if self.raster:
+            # Vector mode applies the y origin when compositing each mask,
+            # raster mode draws in place so it has to live in the matrix.
+            self.ctx.translate(0, -self.origin_in_pixels[1])
         self.active_layer = layer
         self.active_matrix = matrix
 
@@ -592,11 +1151,16 @@ class GerberCairoContext(GerberContext):
                 clp.xmax = math.ceil(self.scale[0] * xmax)
 
                 # We need to offset Y to take care of the difference in y-pos
-                # caused by flipping the axis.
-                clp.ymin = math.floor(
-                    (self.scale[1] * ymin) - math.ceil(self.origin_in_pixels[1]))
-                clp.ymax = math.floor(
-                    (self.scale[1] * ymax) - math.floor(self.origin_in_pixels[1]))
+                # caused by flipping the axis. Raster layers already carry
+                # that offset in their matrix.
+                if self.raster:
+                    clp.ymin = math.floor(self.scale[1] * ymin)
+                    clp.ymax = math.ceil(self.scale[1] * ymax)
+                else:
+                    clp.ymin = math.floor(
+                        (self.scale[1] * ymin) - math.ceil(self.origin_in_pixels[1]))
+                    clp.ymax = math.floor(
+                        (self.scale[1] * ymax) - math.floor(self.origin_in_pixels[1]))
 
                 # Calculate width and height, rounded to the nearest pixel
                 clp.width = abs(clp.xmax - clp.xmin)
@@ -613,5 +1177,16 @@ class GerberCairoContext(GerberContext):
 
         return Clip(primitive)
 
+    def _has_hole(self, primitive):
+        hole_diameter = getattr(primitive, 'hole_diameter', None)
+        hole_width = getattr(primitive, 'hole_width', None)
+        hole_height = getattr(primitive, 'hole_height', None)
+        return bool((hole_diameter is not None and hole_diameter > 0) or
+                    (hole_width and hole_height and
+                     hole_width > 0 and hole_height > 0))
+
+    def _surface_size(self, size_in_pixels):
+        return tuple([max(int(math.ceil(dim)), 1) for dim in size_in_pixels])
+
     def scale_point(self, point):
         return tuple([coord * scale for coord, scale in zip(point, self.scale)])
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Theme compositing
+=================
+**Rasterize layers once, color them with any theme**
+
+Rendering a board in another theme only changes the colors the layers are
+filled with, not their shapes. `LayerMasks` rasterizes each layer into an
+8-bit coverage mask the first time it is needed and composites themes from
+the masks with NumPy, using the same integer arithmetic as cairo's image
+backend (pixman), so the result matches `GerberCairoContext.render_layers`
+pixel for pixel.
+"""
+
+import sys
+import threading
+
+import numpy as np
+
+from .cairo_backend import GerberCairoContext, cairo
+from .render import RenderSettings
+from .theme import THEMES
+
+# Index of the alpha byte in a native-endian ARGB32 pixel
+_ALPHA = 3 if sys.byteorder == 'little' else 0
+
+
+def _mul_un8(a, b):
+    """ a * b / 255, rounded as pixman does, for uint16 arrays of 8-bit values
+    """
+    t = a * b + 0x80
+    return (t + (t >> 8)) >> 8
+
+
+def _color_to_short(value):
+    # cairo's conversion of a color channel to 16 bits
+    return int(value * (65536.0 - 1e-5))
+
+
+def solid_pixel(color, alpha=1.0):
+    """ Premultiplied ARGB32 pixel cairo fills with for `color` at `alpha`
+
+    Returns
+    -------
+    pixel : numpy.ndarray
+        uint16 array of the pixel's 4 bytes in memory order
+    """
+    channels = [_color_to_short(alpha)] + [_color_to_short(c * alpha) for c in color[:3]]
+    value = 0
+    for channel in channels:
+        value = (value << 8) | (channel >> 8)
+    return np.array([value], dtype=np.uint32).view(np.uint8).astype(np.uint16)
+
+
+class LayerMasks(object):
+    """ Coverage masks of a set of layers, composited with any theme
+
+    The layers are laid out as `GerberCairoContext.render_layers` lays them
+    out for the same arguments. A mask is rasterized the first time a theme
+    needs it and kept; since layers are only mirrored or inverted by the
+    theme's settings, compositing a series of themes usually rasterizes each
+    layer once. Masks may be requested from several threads.
+
+    Parameters
+    ----------
+    layers : list of PCBLayer
+        Layers in drawing order, e.g. `PCB.top_layers`
+
+    max_width, max_height : int
+        Image size limits, as for `render_layers`
+
+    batch, stamp : bool
+        Rasterization options, as for `GerberCairoContext`
+
+    min_feature, lod : float
+        Leave out or merge small primitives, as `GerberCairoContext` does.
+        0 draws everything exactly.
+
+    tiles, threads : int
+        Rasterize each mask as `tiles` strips on `threads` threads, as
+        `GerberCairoContext` does
+    """
+
+    def __init__(self, layers, max_width=800, max_height=600, batch=True, stamp=True,
+                 min_feature=0.0, lod=0.0, tiles=1, threads=None):
+        self.layers = list(layers)
+        self._ctx = GerberCairoContext(raster=True, batch=batch, stamp=stamp,
+                                       min_feature=min_feature, lod=lod,
+                                       tiles=tiles, threads=threads)
+        self._ctx.fit_layers(self.layers, max_width, max_height)
+        self._ctx.clear()
+        # render_layers takes the image bounds from the first layer
+        self._ctx.set_bounds(self.layers[0].bounds)
+        self.width, self.height = self._ctx._surface_size(self._ctx.size_in_pixels)
+        self._masks = {}
+        self._lock = threading.Lock()
+
+    def mask(self, index, mirror=False, invert=False):
+        """ Coverage mask of `layers[index]` as a (height, width) uint8 array
+        """
+        key = (index, bool(mirror), bool(invert))
+        with self._lock:
+            if key not in self._masks:
+                self._masks[key] = self._rasterize(index, *key[1:])
+            return self._masks[key]
+
+    def _rasterize(self, index, mirror, invert):
+        surface = self._ctx.render_layer_mask(self.layers[index], mirror, invert)
+        stride = surface.get_stride()
+        data = np.frombuffer(surface.get_data(), dtype=np.uint8)
+        return data.reshape(self.height, stride)[:, :self.width].copy()
+
+    def composite(self, theme=THEMES['default']):
+        """ Composite the layers in the colors of `theme`
+
+        Returns
+        -------
+        pixels : numpy.ndarray
+            (height, width, 4) uint8 array of premultiplied ARGB32 pixels in
+            cairo's memory layout
+        """
+        background = theme['background']
+        image = np.empty((self.height, self.width, 4), dtype=np.uint16)
+        image[...] = solid_pixel(background.color, background.alpha)
+        for index, layer in enumerate(self.layers):
+            settings = theme.get(layer.layer_class, RenderSettings())
+            source = solid_pixel(settings.color, settings.alpha)
+            if not source.any():
+                # A transparent layer leaves the image unchanged
+                continue
+            mask = self.mask(index, settings.mirror, settings.invert).astype(np.uint16)
+            # OVER with a solid source through an A8 mask
+            covered = _mul_un8(mask[..., None], source)
+            image = covered + _mul_un8(image, 255 - covered[..., _ALPHA:_ALPHA + 1])
+            np.minimum(image, 255, out=image)
+        return image.astype(np.uint8)
+
+    def surface(self, theme=THEMES['default']):
+        """ Composite `theme` into a new cairo ARGB32 ImageSurface
+        """
+        pixels = self.composite(theme)
+        data = bytearray(pixels.tobytes())
+        return cairo.ImageSurface.create_for_data(data, cairo.FORMAT_ARGB32,
+                                                  self.width, self.height,
+                                                  self.width * 4)
+
+    def dump(self, theme=THEMES['default'], filename=None):
+        """ Composite `theme` and save it as a PNG, like `GerberCairoContext.dump`
+
+        Returns the PNG data when `filename` is None.
+        """
+        return self.surface(theme).write_to_png(filename)
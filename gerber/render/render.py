@@ -24,6 +24,7 @@ Render Gerber and Excellon files to a variety of formats. The render module
 currently supports SVG rendering using the `svgwrite` library.
 """
 
+import math
 
 from ..primitives import *
 from ..gerber_statements import (CommentStmt, UnknownStmt, EofStmt, ParamStmt,
@@ -138,6 +139,10 @@ class GerberContext(object):
     def render(self, primitive):
         if not primitive:
             return
+        if isinstance(primitive, Flash):
+            # The render callbacks see the concrete primitive, if any
+            self._render_flash_record(primitive, self.color)
+            return
 
         self.pre_render_primitive(primitive)
 
@@ -169,6 +174,15 @@ class GerberContext(object):
 
         self.post_render_primitive(primitive)
 
+    def render_batch(self, batch):
+        """ Render a batch of primitives produced by `batch_primitives`.
+
+        Subclasses that can draw a whole batch with a single path should
+        override this. The default renders the primitives one at a time.
+        """
+        for primitive in batch:
+            self.render(primitive)
+
     def set_bounds(self, bounds, *args, **kwargs):
         """Called by the renderer to set the extents of the file to render.
 
@@ -236,6 +250,15 @@ class GerberContext(object):
     def _render_test_record(self, primitive, color):
         pass
 
+    def _render_flash_record(self, flash, color):
+        """ Render a `Flash` record.
+
+        Contexts that can draw an aperture at an offset should override this.
+        The default renders a concrete primitive for the flash, which is not
+        kept afterwards.
+        """
+        self.render(flash.to_primitive())
+
 
 class RenderSettings(object):
     def __init__(self, color=(0.0, 0.0, 0.0), alpha=1.0, invert=False,
@@ -244,3 +267,157 @@ class RenderSettings(object):
         self.alpha = alpha
         self.invert = invert
         self.mirror = mirror
+
+
+def batch_primitives(primitives):
+    """ Group consecutive primitives that can be drawn as a single path.
+
+    Traces drawn with the same round aperture are grouped so they can be
+    stroked together, and runs of identical hole-less flash shapes are grouped
+    so they can be filled together. A batch is flushed on any change of
+    polarity, aperture or shape, so drawing the batches in order gives the
+    same image as drawing the primitives one by one.
+
+    Parameters
+    ----------
+    primitives : iterable
+        Primitives in drawing order, e.g. `PCBLayer.primitives`
+
+    Returns
+    -------
+    batches : generator of lists
+        Lists of consecutive primitives. Primitives that cannot be batched
+        are yielded as single-element lists.
+    """
+    batch = []
+    batch_key = None
+    for primitive in primitives:
+        key = _batch_key(primitive)
+        if batch and (key is None or key != batch_key):
+            yield batch
+            batch = []
+        batch.append(primitive)
+        batch_key = key
+        if key is None:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _batch_key(primitive):
+    polarity = getattr(primitive, 'level_polarity', None)
+    if isinstance(primitive, (Line, Arc)):
+        aperture = primitive.aperture
+        if type(aperture) is Circle and aperture.diameter > 0:
+            # Apertures are shared between all the draws that select them
+            return ('stroke', polarity, id(aperture))
+        return None
+    shape = primitive.shape if isinstance(primitive, Flash) else primitive
+    if type(shape) in (Circle, Rectangle, Obround, Polygon):
+        hole_diameter = getattr(shape, 'hole_diameter', None) or 0
+        hole_width = getattr(shape, 'hole_width', None) or 0
+        hole_height = getattr(shape, 'hole_height', None) or 0
+        if hole_diameter > 0 or (hole_width > 0 and hole_height > 0):
+            return None
+        return ('fill', polarity, type(shape))
+    return None
+
+
+class DotRun(object):
+    """ Consecutive sub-pixel primitives, to be drawn with a single fill
+
+    Attributes
+    ----------
+    level_polarity : str
+        Polarity shared by every primitive of the run
+
+    dots : list of tuples
+        One (x, y, side) square per primitive, in board units. The square is
+        centered on the primitive's bounding box and has the primitive's area.
+    """
+
+    def __init__(self, level_polarity):
+        self.level_polarity = level_polarity
+        self.dots = []
+
+
+def lod_primitives(primitives, pixel_size, threshold=1.0):
+    """ Level-of-detail pass: merge primitives too small to draw individually
+
+    Primitives whose bounding box is smaller than `threshold` pixels both ways
+    are replaced by a square dot of the same area, centered on the bounding
+    box, and consecutive dots of the same polarity are gathered into a
+    `DotRun`. Other primitives are passed through in order.
+
+    Error bound: a merged primitive and its dot both lie within the
+    primitive's bounding box grown to a `threshold`-pixel square, so only
+    pixels touching that square change, and their total coverage is kept
+    for shapes whose area is known (round, rectangular, obround and polygon
+    pads, drills, round-aperture traces, regions). Other shapes use the
+    area of their bounding box.
+
+    Parameters
+    ----------
+    primitives : iterable
+        Primitives in drawing order
+
+    pixel_size : float
+        Size of an output pixel in board units, i.e. 1 / scale
+
+    threshold : float
+        Size in pixels below which primitives are merged
+
+    Returns
+    -------
+    primitives : generator
+        Primitives and `DotRun` objects in drawing order
+    """
+    limit = threshold * pixel_size
+    run = None
+    for primitive in primitives:
+        (xmin, xmax), (ymin, ymax) = primitive.bounding_box
+        width = xmax - xmin
+        height = ymax - ymin
+        if width < limit and height < limit:
+            polarity = primitive.level_polarity
+            if run is None or run.level_polarity != polarity:
+                if run is not None:
+                    yield run
+                run = DotRun(polarity)
+            area = min(_primitive_area(primitive), width * height)
+            run.dots.append(((xmin + xmax) / 2.0, (ymin + ymax) / 2.0,
+                             math.sqrt(max(area, 0.0))))
+            continue
+        if run is not None:
+            yield run
+            run = None
+        yield primitive
+    if run is not None:
+        yield run
+
+
+def _primitive_area(primitive):
+    shape = primitive.aperture if isinstance(primitive, Flash) else primitive
+    if isinstance(shape, (Circle, Drill)):
+        hole = getattr(shape, 'hole_diameter', None) or 0
+        return math.pi * (shape.diameter ** 2 - hole ** 2) / 4.0
+    if isinstance(shape, Rectangle):
+        return shape.width * shape.height
+    if isinstance(shape, Obround):
+        radius = min(shape.width, shape.height) / 2.0
+        return shape.width * shape.height - (4 - math.pi) * radius ** 2
+    if isinstance(shape, Polygon):
+        return shape.sides * shape.radius ** 2 * math.sin(2 * math.pi / shape.sides) / 2.0
+    if isinstance(shape, Line) and type(shape.aperture) is Circle:
+        diameter = shape.aperture.diameter
+        length = math.hypot(shape.end[0] - shape.start[0], shape.end[1] - shape.start[1])
+        return length * diameter + math.pi * diameter ** 2 / 4.0
+    if isinstance(shape, (Region, Outline)):
+        # Shoelace formula over the segment end points; arcs count as chords
+        area = 0.0
+        for segment in shape.primitives:
+            area += segment.start[0] * segment.end[1] - segment.end[0] * segment.start[1]
+        return abs(area) / 2.0
+    (xmin, xmax), (ymin, ymax) = shape.bounding_box
+    return (xmax - xmin) * (ymax - ymin)
@@ -100,10 +100,12 @@ class GerberFile(CamFile):
 
     """
 
-    def __init__(self, statements, settings, primitives, apertures, filename=None):
+    def __init__(self, statements, settings, primitives, apertures, filename=None,
+                 bounds=None):
         super(GerberFile, self).__init__(statements, settings, primitives, filename)
 
         self.apertures = apertures
+        self._bounds = bounds
 
     @property
     def comments(self):
@@ -117,34 +119,45 @@ class GerberFile(CamFile):
 
     @property
     def bounds(self):
-        min_x = min_y = 1000000
-        max_x = max_y = -1000000
+        """ Extents of the coordinates in the file, memoized.
 
-        for stmt in [stmt for stmt in self.statements if isinstance(stmt, CoordStmt)]:
-            if stmt.x is not None:
-                min_x = min(stmt.x, min_x)
-                max_x = max(stmt.x, max_x)
+        The parser passes them in, so they are only recalculated here after
+        a unit conversion or an explicit `_changed()`.
+        """
+        if self._bounds is None:
+            min_x = min_y = 1000000
+            max_x = max_y = -1000000
+
+            for stmt in [stmt for stmt in self.statements if isinstance(stmt, CoordStmt)]:
+                if stmt.x is not None:
+                    min_x = min(stmt.x, min_x)
+                    max_x = max(stmt.x, max_x)
 
-            if stmt.y is not None:
-                min_y = min(stmt.y, min_y)
-                max_y = max(stmt.y, max_y)
+                if stmt.y is not None:
+                    min_y = min(stmt.y, min_y)
+                    max_y = max(stmt.y, max_y)
 
-        return ((min_x, max_x), (min_y, max_y))
+            self._bounds = ((min_x, max_x), (min_y, max_y))
+        return self._bounds
 
     @property
     def bounding_box(self):
-        min_x = min_y = 1000000
-        max_x = max_y = -1000000
+        """ Extents of the primitives in the file, memoized.
+        """
+        if self._bounding_box is None:
+            min_x = min_y = 1000000
+            max_x = max_y = -1000000
 
-        for prim in self.primitives:
-            bounds = prim.bounding_box
-            min_x = min(bounds[0][0], min_x)
-            max_x = max(bounds[0][1], max_x)
+            for prim in self.primitives:
+                bounds = prim.bounding_box
+                min_x = min(bounds[0][0], min_x)
+                max_x = max(bounds[0][1], max_x)
 
-            min_y = min(bounds[1][0], min_y)
-            max_y = max(bounds[1][1], max_y)
+                min_y = min(bounds[1][0], min_y)
+                max_y = max(bounds[1][1], max_y)
 
-        return ((min_x, max_x), (min_y, max_y))
+            self._bounding_box = ((min_x, max_x), (min_y, max_y))
+        return self._bounding_box
 
     def write(self, filename, settings=None):
         """ Write data out to a gerber file.
@@ -161,6 +174,7 @@ class GerberFile(CamFile):
                 statement.to_inch()
             for primitive in self.primitives:
                 primitive.to_inch()
+            self._changed()
 
     def to_metric(self):
         if self.units != 'metric':
@@ -169,6 +183,7 @@ class GerberFile(CamFile):
                 statement.to_metric()
             for primitive in self.primitives:
                 primitive.to_metric()
+            self._changed()
 
     def offset(self, x_offset=0,  y_offset=0):
         for statement in self.statements:
@@ -176,6 +191,34 @@ class GerberFile(CamFile):
         for primitive in self.primitives:
             primitive.offset(x_offset, y_offset)
 
+        # Shifting every coordinate shifts their extremes by exactly the same
+        # amount, so the statement bounds can be kept. Primitive extents are
+        # rounded differently once moved and are recalculated.
+        bounds = self._bounds
+        self._changed()
+        if bounds is not None:
+            (min_x, max_x), (min_y, max_y) = bounds
+            if min_x <= max_x:
+                min_x, max_x = min_x + x_offset, max_x + x_offset
+            if min_y <= max_y:
+                min_y, max_y = min_y + y_offset, max_y + y_offset
+            self._bounds = ((min_x, max_x), (min_y, max_y))
+
+
+def _alternation(exprs):
+    """ Combine compiled expressions into one expression that matches
+    whichever of them matches first, in the given order.
+
+    Each expression becomes a group named by its key in `exprs`, so
+    `match.lastgroup` tells which one matched. Named groups inside the
+    expressions are renamed to keep them unique.
+    """
+    alternatives = []
+    for name, expr in exprs:
+        pattern = re.sub(r"\(\?P<(\w+)>", r"(?P<{}__\1>".format(name), expr.pattern)
+        alternatives.append("(?P<{}>{})".format(name, pattern))
+    return re.compile("|".join(alternatives))
+
 
 class GerberParser(object):
     """ GerberParser
@@ -234,15 +277,37 @@ class GerberParser(object):
     REGION_MODE_STMT = re.compile(r'(?P<mode>G3[67])\*')
     QUAD_MODE_STMT = re.compile(r'(?P<mode>G7[45])\*')
 
+    # Everything but coordinates, in the order they used to be tried in.
+    # Coordinates are by far the most common statement and are tried first
+    # on their own.
+    STATEMENT_EXPRS = ([('aperture', APERTURE_STMT)] +
+                       [('param{}'.format(index), expr)
+                        for index, expr in enumerate(PARAM_STMT)] +
+                       [('region_mode', REGION_MODE_STMT),
+                        ('quad_mode', QUAD_MODE_STMT),
+                        ('comment', COMMENT_STMT),
+                        ('deprecated_unit', DEPRECATED_UNIT),
+                        ('deprecated_format', DEPRECATED_FORMAT),
+                        ('eof', EOF_STMT)])
+    STATEMENT = _alternation(STATEMENT_EXPRS)
+    _statement_exprs = dict(STATEMENT_EXPRS)
+
+    # Characters that can end or start a command
+    COMMAND_DELIMITER = re.compile(r"[\r\n*%]")
+
     # Keep include loop from crashing us
     INCLUDE_FILE_RECURSION_LIMIT = 10
 
+    # Characters read from a file at a time
+    CHUNK_SIZE = 1 << 16
+
     def __init__(self):
         self.filename = None
         self.settings = FileSettings()
         self.statements = []
         self.primitives = []
         self.apertures = {}
+        self._flash_apertures = {}
         self.macros = {}
         self.current_region = None
         self.x = 0
@@ -257,16 +322,31 @@ class GerberParser(object):
         self.quadrant_mode = 'multi-quadrant'
         self.step_and_repeat = (1, 1, 0, 0)
         self._recursion_depth = 0
+        # min x, max x, min y, max y of the coordinates seen so far
+        self._bounds = [1000000, -1000000, 1000000, -1000000]
+        # The same for the bounding boxes of streamed primitives
+        self._bounding_box = [1000000, -1000000, 1000000, -1000000]
+
+    @property
+    def bounds(self):
+        """ Extents of the coordinates parsed so far,
+        ((min x, max x), (min y, max y))
+        """
+        return ((self._bounds[0], self._bounds[1]),
+                (self._bounds[2], self._bounds[3]))
 
     def parse(self, filename):
         self.filename = filename
-        with open(filename, "rU") as fp:
-            data = fp.read()
-        return self.parse_raw(data, filename)
+        # The file is split into commands as it is read
+        with open(filename, "r") as fp:
+            return self._parse_commands(self._split_stream(fp), filename)
 
     def parse_raw(self, data, filename=None):
+        return self._parse_commands(self._split_commands(data), filename)
+
+    def _parse_commands(self, commands, filename):
         self.filename = filename
-        for stmt in self._parse(self._split_commands(data)):
+        for stmt in self._parse(commands):
             self.evaluate(stmt)
             self.statements.append(stmt)
 
@@ -274,19 +354,92 @@ class GerberParser(object):
         for stmt in self.statements:
             stmt.units = self.settings.units
 
-        return GerberFile(self.statements, self.settings, self.primitives, self.apertures.values(), filename)
+        return GerberFile(self.statements, self.settings, self.primitives, list(self.apertures.values()), filename,
+                          bounds=self.bounds)
+
+    def iter_statements(self, fp, filename=None, chunk_size=None):
+        """ Parse a Gerber file from a file object, one statement at a time.
+
+        The file is read `chunk_size` characters at a time and nothing is
+        kept once it has been yielded: each statement is evaluated, then
+        yielded, and `primitives` then holds only the primitives that
+        statement completed (a region is completed by the statement that
+        ends it). `statements` stays empty. `bounds` and `bounding_box`
+        cover everything parsed so far, so they are the file's once the
+        generator is exhausted. Memory use is bounded by the chunk size, the
+        longest command and the largest region rather than the file size.
+
+        Unlike `parse_raw`, a statement's units are those in effect when it
+        is yielded rather than the file's last.
+
+        Parameters
+        ----------
+        fp : file object
+            Gerber file opened in text mode
+
+        filename : string, optional
+            Name of the file, used to find included files
+
+        chunk_size : int, optional
+            Characters to read at a time, defaults to `CHUNK_SIZE`
+
+        Yields
+        ------
+        statement : Statement
+            The statements of the file, in order
+        """
+        self.filename = filename
+        for stmt in self._parse(self._split_stream(fp, chunk_size)):
+            del self.primitives[:]
+            self.evaluate(stmt)
+            stmt.units = self.settings.units
+            for primitive in self.primitives:
+                self._add_bounding_box(primitive.bounding_box)
+            yield stmt
+        del self.primitives[:]
+
+    def iter_primitives(self, fp, filename=None, chunk_size=None):
+        """ Parse a Gerber file from a file object, one primitive at a time.
+
+        The primitives are those `parse_raw` would make, in the same order.
+        See `iter_statements` for the parameters and memory use.
+
+        Yields
+        ------
+        primitive : Primitive
+            The primitives of the file, in drawing order
+        """
+        for stmt in self.iter_statements(fp, filename, chunk_size):
+            for primitive in self.primitives:
+                yield primitive
+
+    @property
+    def bounding_box(self):
+        """ Extents of the primitives made by `iter_statements` or
+        `iter_primitives` so far, as `GerberFile.bounding_box` gives them
+        """
+        box = self._bounding_box
+        return ((box[0], box[1]), (box[2], box[3]))
+
+    def _add_bounding_box(self, bbox):
+        box = self._bounding_box
+        box[0] = min(bbox[0][0], box[0])
+        box[1] = max(bbox[0][1], box[1])
+        box[2] = min(bbox[1][0], box[2])
+        box[3] = max(bbox[1][1], box[3])
 
     def _split_commands(self, data):
         """
         Split the data into commands. Commands end with * (and also newline to help with some badly formatted files)
         """
 
-        length = len(data)
         start = 0
         in_header = True
 
-        for cur in range(0, length):
+        # Only delimiters can change the state, so skip straight to them
+        for delimiter in self.COMMAND_DELIMITER.finditer(data):
 
+            cur = delimiter.start()
             val = data[cur]
 
             if val == '%' and start == cur:
@@ -307,6 +460,47 @@ class GerberParser(object):
                 start = cur + 1
                 in_header = False
 
+    def _split_stream(self, fp, chunk_size=None):
+        """
+        Split a file object into commands as `_split_commands` splits its
+        contents, reading `chunk_size` characters at a time. Only the
+        unfinished command is kept between reads.
+        """
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        data = ''
+        start = 0
+        in_header = True
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                # Like _split_commands, drop anything after the last delimiter
+                return
+            data = data[start:] + chunk
+            start = 0
+
+            for delimiter in self.COMMAND_DELIMITER.finditer(data):
+
+                cur = delimiter.start()
+                val = data[cur]
+
+                if val == '%' and start == cur:
+                    in_header = True
+                    continue
+
+                if val == '\r' or val == '\n':
+                    if start != cur:
+                        yield data[start:cur]
+                    start = cur + 1
+
+                elif not in_header and val == '*':
+                    yield data[start:cur + 1]
+                    start = cur + 1
+
+                elif in_header and val == '%':
+                    yield data[start:cur + 1]
+                    start = cur + 1
+                    in_header = False
+
     def dump_json(self):
         stmts = {"statements": [stmt.__dict__ for stmt in self.statements]}
         return json.dumps(stmts)
@@ -342,26 +536,25 @@ class GerberParser(object):
                     did_something = True
                     continue
 
+                (kind, fields, r) = self._match_statement(line)
+
                 # coord
-                (coord, r) = _match_one(self.COORD_STMT, line)
-                if coord:
-                    yield CoordStmt.from_dict(coord, self.settings)
+                if kind == 'coord':
+                    yield CoordStmt.from_dict(fields, self.settings)
                     line = r
                     did_something = True
                     continue
 
                 # aperture selection
-                (aperture, r) = _match_one(self.APERTURE_STMT, line)
-                if aperture:
-                    yield ApertureStmt(**aperture)
+                if kind == 'aperture':
+                    yield ApertureStmt(**fields)
                     did_something = True
                     line = r
                     continue
 
                 # parameter
-                (param, r) = _match_one_from_many(self.PARAM_STMT, line)
-
-                if param:
+                if kind == 'param':
+                    param = fields
                     if param["param"] == "FS":
                         stmt = FSParamStmt.from_dict(param)
                         self.settings.zero_suppression = stmt.zero_suppression
@@ -387,9 +580,8 @@ class GerberParser(object):
                         if self._recursion_depth < self.INCLUDE_FILE_RECURSION_LIMIT:
                             self._recursion_depth += 1
                             with open(os.path.join(os.path.dirname(self.filename), param["filename"]), 'r') as f:
-                                inc_data = f.read()
-                            for stmt in self._parse(self._split_commands(inc_data)):
-                                yield stmt
+                                for stmt in self._parse(self._split_stream(f)):
+                                    yield stmt
                             self._recursion_depth -= 1
                         else:
                             raise IOError("Include file nesting depth limit exceeded.")
@@ -422,50 +614,44 @@ class GerberParser(object):
                     continue
 
                 # Region Mode
-                (mode, r) = _match_one(self.REGION_MODE_STMT, line)
-                if mode:
+                if kind == 'region_mode':
                     yield RegionModeStmt.from_gerber(line)
                     line = r
                     did_something = True
                     continue
 
                 # Quadrant Mode
-                (mode, r) = _match_one(self.QUAD_MODE_STMT, line)
-                if mode:
+                if kind == 'quad_mode':
                     yield QuadrantModeStmt.from_gerber(line)
                     line = r
                     did_something = True
                     continue
 
                 # comment
-                (comment, r) = _match_one(self.COMMENT_STMT, line)
-                if comment:
-                    yield CommentStmt(comment["comment"])
+                if kind == 'comment':
+                    yield CommentStmt(fields["comment"])
                     did_something = True
                     line = r
                     continue
 
                 # deprecated codes
-                (deprecated_unit, r) = _match_one(self.DEPRECATED_UNIT, line)
-                if deprecated_unit:
+                if kind == 'deprecated_unit':
                     stmt = MOParamStmt(param="MO", mo="inch" if "G70" in
-                                       deprecated_unit["mode"] else "metric")
+                                       fields["mode"] else "metric")
                     self.settings.units = stmt.mode
                     yield stmt
                     line = r
                     did_something = True
                     continue
 
-                (deprecated_format, r) = _match_one(self.DEPRECATED_FORMAT, line)
-                if deprecated_format:
+                if kind == 'deprecated_format':
                     yield DeprecatedStmt.from_gerber(line)
                     line = r
                     did_something = True
                     continue
 
                 # eof
-                (eof, r) = _match_one(self.EOF_STMT, line)
-                if eof:
+                if kind == 'eof':
                     yield EofStmt()
                     did_something = True
                     line = r
@@ -479,6 +665,29 @@ class GerberParser(object):
 
             oldline = line
 
+    def _match_statement(self, line):
+        """ Identify the statement at the start of `line`.
+
+        Returns
+        -------
+        (kind, fields, rest) : tuple
+            `kind` is 'coord', 'aperture', 'param', 'region_mode',
+            'quad_mode', 'comment', 'deprecated_unit', 'deprecated_format',
+            'eof' or None if nothing matched, `fields` the named groups of
+            the statement's expression and `rest` what follows it.
+        """
+        match = self.COORD_STMT.match(line)
+        if match is not None:
+            return ('coord', match.groupdict(), line[match.end(0):])
+
+        match = self.STATEMENT.match(line)
+        if match is None:
+            return (None, {}, None)
+        name = match.lastgroup
+        # Match again on its own to get the fields under their own names
+        (fields, rest) = _match_one(self._statement_exprs[name], line)
+        return (name.rstrip('0123456789'), fields, rest)
+
     def evaluate(self, stmt):
         """ Evaluate Gerber statement and update image accordingly.
 
@@ -585,6 +794,7 @@ class GerberParser(object):
 
         aperture.units = self.settings.units
         self.apertures[d] = aperture
+        self._flash_apertures.pop(d, None)
 
     def _evaluate_mode(self, stmt):
         if stmt.type == 'RegionMode':
@@ -606,6 +816,8 @@ class GerberParser(object):
             self.settings.notation = stmt.notation
         elif stmt.param == "MO":
             self.settings.units = stmt.mode
+            # Flash apertures are copied in the units in effect at the time
+            self._flash_apertures.clear()
         elif stmt.param == "IP":
             self.image_polarity = stmt.ip
         elif stmt.param == "LP":
@@ -619,6 +831,14 @@ class GerberParser(object):
         x = self.x if stmt.x is None else stmt.x
         y = self.y if stmt.y is None else stmt.y
 
+        bounds = self._bounds
+        if stmt.x is not None:
+            bounds[0] = min(stmt.x, bounds[0])
+            bounds[1] = max(stmt.x, bounds[1])
+        if stmt.y is not None:
+            bounds[2] = min(stmt.y, bounds[2])
+            bounds[3] = max(stmt.y, bounds[3])
+
         if stmt.function in ("G01", "G1"):
             self.interpolation = 'linear'
         elif stmt.function in ('G02', 'G2', 'G03', 'G3'):
@@ -705,16 +925,17 @@ class GerberParser(object):
                 self.current_region = None
 
         elif self.op == "D03" or self.op == "D3":
-            primitive = copy.deepcopy(self.apertures[self.aperture])
+            aperture = self.apertures[self.aperture]
 
-            if primitive is not None:
+            if aperture is not None:
 
-                if not isinstance(primitive, AMParamStmt):
-                    primitive.position = (x, y)
-                    primitive.level_polarity = self.level_polarity
-                    primitive.units = self.settings.units
-                    self.primitives.append(primitive)
+                if not isinstance(aperture, AMParamStmt):
+                    self.primitives.append(Flash(self._flash_aperture(),
+                                                 (x, y),
+                                                 level_polarity=self.level_polarity,
+                                                 units=self.settings.units))
                 else:
+                    primitive = copy.deepcopy(aperture)
                     # Aperture Macro
                     for am_prim in primitive.primitives:
                         renderable = am_prim.to_primitive((x, y),
@@ -724,6 +945,19 @@ class GerberParser(object):
                             self.primitives.append(renderable)
         self.x, self.y = x, y
 
+    def _flash_aperture(self):
+        """ Return the current aperture placed at the origin.
+
+        The copy is made once per aperture and shared by all of its flashes.
+        """
+        aperture = self._flash_apertures.get(self.aperture)
+        if aperture is None:
+            aperture = copy.deepcopy(self.apertures[self.aperture])
+            aperture.position = (0, 0)
+            aperture.units = self.settings.units
+            self._flash_apertures[self.aperture] = aperture
+        return aperture
+
     def _find_center(self, start, end, offsets):
         """
         In single quadrant mode, the offsets are always positive, which means
@@ -790,11 +1024,3 @@ def _match_one(expr, data):
     else:
         return (match.groupdict(), data[match.end(0):])
 
-
-def _match_one_from_many(exprs, data):
-    for expr in exprs:
-        match = expr.match(data)
-        if match:
-            return (match.groupdict(), data[match.end(0):])
-
-    return ({}, None)
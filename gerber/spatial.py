@@ -0,0 +1,158 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Spatial index
+=============
+**Find the primitives of a layer inside a window**
+
+A uniform grid over primitive bounding boxes, for rendering a zoomed region
+or one tile of a large panel without visiting every primitive.
+"""
+
+import math
+
+import numpy as np
+
+
+class SpatialIndex(object):
+    """ Uniform grid index over the bounding boxes of a list of primitives
+
+    Each primitive is listed in every grid cell its bounding box overlaps.
+    Primitives spanning more than `max_cells` cells (board outlines, large
+    pours) are kept in a separate list that every query checks. Queries
+    return primitives in their original order, so drawing the result gives
+    the same image as drawing every primitive, inside the window.
+
+    The index reflects the primitives when it was built; build a new one if
+    they are moved or the list changes.
+
+    Parameters
+    ----------
+    primitives : list
+        Primitives to index, e.g. `PCBLayer.primitives`
+
+    cell_items : int
+        Average number of primitives per cell the grid is sized for
+
+    max_cells : int
+        Primitives overlapping more cells than this are not put in the grid
+    """
+
+    def __init__(self, primitives, cell_items=8, max_cells=64):
+        self.primitives = primitives
+        count = len(primitives)
+        if count:
+            boxes = np.array([primitive.bounding_box for primitive in primitives],
+                             dtype=float).reshape(count, 4)
+        else:
+            boxes = np.zeros((0, 4))
+        # Columns: xmin, xmax, ymin, ymax
+        self.boxes = boxes
+        self._build(cell_items, max_cells)
+
+    def _build(self, cell_items, max_cells):
+        boxes = self.boxes
+        count = len(boxes)
+        if count == 0:
+            self.extent = ((0.0, 0.0), (0.0, 0.0))
+            self.shape = (1, 1)
+            self.cell_size = (1.0, 1.0)
+            self._offsets = np.zeros(2, dtype=np.int64)
+            self._entries = np.zeros(0, dtype=np.int64)
+            self._large = np.zeros(0, dtype=np.int64)
+            return
+
+        xmin, xmax = boxes[:, 0].min(), boxes[:, 1].max()
+        ymin, ymax = boxes[:, 2].min(), boxes[:, 3].max()
+        width = max(xmax - xmin, 1e-9)
+        height = max(ymax - ymin, 1e-9)
+        cells = max(count // cell_items, 1)
+        columns = int(min(max(math.ceil(math.sqrt(cells * width / height)), 1), 4096))
+        rows = int(min(max(math.ceil(float(cells) / columns), 1), 4096))
+        self.extent = ((xmin, xmax), (ymin, ymax))
+        self.shape = (columns, rows)
+        self.cell_size = (width / columns, height / rows)
+
+        x0, x1 = self._cell_range(boxes[:, 0], boxes[:, 1], 0)
+        y0, y1 = self._cell_range(boxes[:, 2], boxes[:, 3], 1)
+        spans_x = x1 - x0 + 1
+        spans = spans_x * (y1 - y0 + 1)
+        large = spans > max_cells
+        self._large = np.flatnonzero(large)
+
+        # One entry per (primitive, overlapped cell), expanded without a loop
+        small = np.flatnonzero(~large)
+        spans_small = spans[small]
+        first_entry = np.cumsum(spans_small) - spans_small
+        owner = np.repeat(np.arange(len(small)), spans_small)
+        step = np.arange(owner.size) - first_entry[owner]
+        cell_x = x0[small][owner] + step % spans_x[small][owner]
+        cell_y = y0[small][owner] + step // spans_x[small][owner]
+        cell = cell_y * columns + cell_x
+
+        # Stable sort keeps each cell's primitives in drawing order
+        order = np.argsort(cell, kind='stable')
+        self._entries = small[owner[order]]
+        self._offsets = np.zeros(columns * rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell, minlength=columns * rows), out=self._offsets[1:])
+
+    def _cell_range(self, low, high, axis):
+        origin = self.extent[axis][0]
+        size = self.cell_size[axis]
+        last = self.shape[axis] - 1
+        first_cell = np.clip(np.floor((low - origin) / size), 0, last).astype(np.int64)
+        last_cell = np.clip(np.floor((high - origin) / size), 0, last).astype(np.int64)
+        return first_cell, last_cell
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def query_indices(self, bbox):
+        """ Indices of the primitives whose bounding box overlaps `bbox`
+
+        Parameters
+        ----------
+        bbox : tuple
+            ((xmin, xmax), (ymin, ymax)) in the units of the primitives
+
+        Returns
+        -------
+        indices : numpy.ndarray
+            Sorted indices into `primitives`
+        """
+        (qx0, qx1), (qy0, qy1) = bbox
+        (xmin, xmax), (ymin, ymax) = self.extent
+        if len(self.boxes) == 0 or qx1 < xmin or qx0 > xmax or qy1 < ymin or qy0 > ymax:
+            return np.zeros(0, dtype=np.int64)
+
+        x0, x1 = [int(v[0]) for v in self._cell_range(np.array([qx0]), np.array([qx1]), 0)]
+        y0, y1 = [int(v[0]) for v in self._cell_range(np.array([qy0]), np.array([qy1]), 1)]
+        columns = self.shape[0]
+        # The cells of a grid row are contiguous in the entry list
+        parts = [self._entries[self._offsets[row * columns + x0]:self._offsets[row * columns + x1 + 1]]
+                 for row in range(y0, y1 + 1)]
+        parts.append(self._large)
+        candidates = np.unique(np.concatenate(parts))
+
+        boxes = self.boxes[candidates]
+        overlap = ((boxes[:, 0] <= qx1) & (boxes[:, 1] >= qx0) &
+                   (boxes[:, 2] <= qy1) & (boxes[:, 3] >= qy0))
+        return candidates[overlap]
+
+    def query(self, bbox):
+        """ Primitives whose bounding box overlaps `bbox`, in drawing order
+        """
+        primitives = self.primitives
+        return [primitives[index] for index in self.query_indices(bbox)]
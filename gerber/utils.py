@@ -63,6 +63,61 @@ def parse_gerber_value(value, format=(2, 5), zero_suppression='trailing'):
     # Handle excellon edge case with explicit decimal. "That was easy!"
     if '.' in value:
         return float(value)
+    return gerber_value_decoder(format, zero_suppression)(value)
+
+
+def parse_gerber_values(values, format=(2, 5), zero_suppression='trailing'):
+    """ Convert a sequence of gerber/excellon formatted strings to floats
+
+    Decodes every value with the same decoder, so the format is only looked
+    up once. `None` entries, e.g. coordinates missing from a statement, are
+    passed through unchanged.
+
+    Parameters
+    ----------
+    values : iterable
+        Gerber/Excellon-formatted strings or `None`
+
+    format :  tuple (int,int)
+        Gerber/Excellon precision format expressed as a tuple containing:
+        (number of integer-part digits, number of decimal-part digits)
+
+    zero_suppression : string
+        Zero-suppression mode. May be 'leading', 'trailing' or 'none'
+
+    Returns
+    -------
+    values : list
+        The values as floating-point numbers (or `None`)
+    """
+    decode = gerber_value_decoder(format, zero_suppression)
+    return [None if value is None else decode(value) for value in values]
+
+
+# Powers of ten for every shift a 6:7 format can need
+_POWERS_OF_TEN = [10 ** exponent for exponent in range(27)]
+
+_decoders = {}
+
+
+def gerber_value_decoder(format=(2, 5), zero_suppression='trailing'):
+    """ Return a function converting gerber/excellon formatted strings to
+    floating-point numbers for one format and zero suppression mode.
+
+    The decoder works on the whole digit string with `int()` and divides by a
+    power of ten chosen from the format, which is exactly the float the
+    digits denote. Decoders are memoized per `(format, zero_suppression)`.
+    See `parse_gerber_value` for the parameters.
+
+    Returns
+    -------
+    decode : callable
+        Function taking a formatted string and returning a float
+    """
+    key = (tuple(format), zero_suppression)
+    decode = _decoders.get(key)
+    if decode is not None:
+        return decode
 
     # Format precision
     integer_digits, decimal_digits = format
@@ -74,24 +129,35 @@ def parse_gerber_value(value, format=(2, 5), zero_suppression='trailing'):
     if MAX_DIGITS > 13 or integer_digits > 6 or decimal_digits > 7:
         raise ValueError('Parser only supports precision up to 6:7 format')
 
-    # Remove extraneous information
-    value = value.lstrip('+')
-    negative = '-' in value
-    if negative:
-        value = value.lstrip('-')
-
-    missing_digits = MAX_DIGITS - len(value)
-
-    if zero_suppression == 'trailing':
-        digits = list(value + ('0' * missing_digits))
-    elif zero_suppression == 'leading':
-        digits = list(('0' * missing_digits) + value)
-    else:
-        digits = list(value)
+    powers = _POWERS_OF_TEN
+    divisor = powers[decimal_digits]
+    pad_trailing = zero_suppression == 'trailing'
+    pad_leading = zero_suppression == 'leading'
+
+    def decode(value):
+        # Handle excellon edge case with explicit decimal. "That was easy!"
+        if '.' in value:
+            return float(value)
+
+        # Remove extraneous information
+        value = value.lstrip('+')
+        negative = '-' in value
+        if negative:
+            value = value.lstrip('-')
+
+        missing_digits = MAX_DIGITS - len(value)
+        if missing_digits >= 0 and pad_trailing:
+            # Suppressed trailing zeros scale the value up
+            result = (int(value) * powers[missing_digits] if value else 0) / divisor
+        elif missing_digits >= 0 and pad_leading:
+            result = (int(value) if value else 0) / divisor
+        else:
+            # Nothing to pad: everything after the integer digits is decimal
+            result = int(value) / powers[max(len(value) - integer_digits, 0)]
+        return -result if negative else result
 
-    result = float(
-        ''.join(digits[:integer_digits] + ['.'] + digits[integer_digits:]))
-    return -result if negative else result
+    _decoders[key] = decode
+    return decode
 
 
 def write_gerber_value(value, format=(2, 5), zero_suppression='trailing'):
@@ -44,6 +44,7 @@ except ImportError as e:
 from app.database.models import Order, OrderItem, UserCart, User
 
 # Load environment variables
+import asyncio
 import os
 import signal
 import time
@@ -86,6 +87,15 @@ async def lifespan(app: FastAPI):
         # Don't fail the entire app if cache cleanup fails - just log and continue
         pass
     
+    # Remove quote artifacts that outlived their jobs
+    try:
+        from app.services.artifact_store import artifact_store
+        removed_count = artifact_store.cleanup_expired()
+        if removed_count > 0:
+            print(f"🧹 Removed {removed_count} expired quote artifacts on startup")
+    except Exception as e:
+        print(f"⚠️ Artifact store cleanup warning: {e}")
+    
     # Start alert manager
     try:
         await alert_manager.start()
@@ -108,6 +118,25 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ Unified pricing engine warmup warning: {e}")
     
+    # Receive job progress events from other processes (when a transport is configured)
+    try:
+        from app.services.job_events import job_events
+        await job_events.start()
+    except Exception as e:
+        print(f"⚠️ Job event bus startup warning: {e}")
+    
+    # Start the in-process quote job worker
+    job_worker_task = None
+    if settings.JOB_WORKER_IN_PROCESS:
+        try:
+            from app.api.endpoints import pcb as pcb_endpoints
+            from app.services.job_worker import create_job_worker
+            pcb_endpoints.job_worker = create_job_worker()
+            job_worker_task = asyncio.create_task(pcb_endpoints.job_worker.run())
+            print("✅ Quote job worker started successfully")
+        except Exception as e:
+            print(f"⚠️ Quote job worker startup warning: {e}")
+    
     print("✅ FastAPI application startup completed successfully")
     
     yield
@@ -124,6 +153,31 @@ async def lifespan(app: FastAPI):
         print("✅ Advanced cache cleaned up successfully")
     except Exception as e:
         print(f"⚠️ Advanced cache cleanup warning: {e}")
+    
+    if job_worker_task is not None:
+        try:
+            from app.api.endpoints import pcb as pcb_endpoints
+            pcb_endpoints.job_worker.stop()
+            # Jobs still running after this have their leases expire and are retried
+            await asyncio.wait_for(job_worker_task, timeout=10)
+            print("✅ Quote job worker stopped successfully")
+        except asyncio.TimeoutError:
+            print("⚠️ Quote job worker stopped with jobs still running")
+        except Exception as e:
+            print(f"⚠️ Quote job worker shutdown warning: {e}")
+    
+    try:
+        from app.services.job_events import job_events
+        await job_events.stop()
+    except Exception as e:
+        print(f"⚠️ Job event bus shutdown warning: {e}")
+    
+    try:
+        from app.services.render_executor import render_executor
+        render_executor.shutdown()
+        print("✅ Render workers stopped successfully")
+    except Exception as e:
+        print(f"⚠️ Render worker shutdown warning: {e}")
 
 app = FastAPI(
     title=settings.API_TITLE,
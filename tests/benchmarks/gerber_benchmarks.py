@@ -0,0 +1,600 @@
+# tests/benchmarks/gerber_benchmarks.py
+
+import copy
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List, Any
+from dataclasses import dataclass, field
+import logging
+
+from gerber.layers import load_layer_data
+from gerber.rs274x import GerberParser
+from tests.support import (QUOTE_THEMES, board_archive, compare_png, from_extracted, synthetic_excellon,
+                           synthetic_gerber, synthetic_layer, window_at, write_board, write_plane_fill)
+from tests.test_excellon import (brute_force_excellon_format, hit_bounding_box, hit_path_lengths,
+                                 hit_primitives)
+from tests.test_rs274x import CascadeParser, parse_peak, statement_stream
+from tests.test_spatial import linear_query
+from tests.test_utils import string_parse_gerber_value
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BenchmarkResult:
+    """Result of a single benchmark case."""
+    name: str
+    case: str
+    runs: int
+    mean_seconds: float
+    min_seconds: float
+    max_seconds: float
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+def time_call(func: Callable[[], Any], runs: int = 3) -> List[float]:
+    """Call `func` `runs` times and return the wall time of each call."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def make_result(name: str, case: str, timings: List[float], **extra) -> BenchmarkResult:
+    return BenchmarkResult(
+        name=name,
+        case=case,
+        runs=len(timings),
+        mean_seconds=statistics.mean(timings),
+        min_seconds=min(timings),
+        max_seconds=max(timings),
+        extra=extra
+    )
+
+# ===================================================================
+#  Parsing benchmarks
+# ===================================================================
+
+def benchmark_parse(pads=(10000, 100000), runs: int = 3) -> List[BenchmarkResult]:
+    """
+    Parse time of pad-heavy layers, next to the cost of the per-flash
+    aperture deepcopy the parser used to make.
+    """
+    results = []
+    for count in pads:
+        data = synthetic_gerber(traces=1000, pads=count, apertures=(11, 12, 13, 14, 16))
+        case = "{} pads".format(count)
+
+        timings = time_call(lambda: GerberParser().parse_raw(data), runs)
+        results.append(make_result("parse", case, timings,
+                                   flashes_per_second=int(count / statistics.mean(timings))))
+
+        parser = GerberParser()
+        parser.parse_raw(data)
+        apertures = list(parser.apertures.values())
+        results.append(make_result("deepcopy_per_flash", case + " [removed]",
+                                   time_call(lambda: [copy.deepcopy(apertures[index % len(apertures)])
+                                                      for index in range(count)], runs)))
+    return results
+
+def benchmark_directory(copper_layers=(2, 4, 8), workers: int = 4, runs: int = 3) -> List[BenchmarkResult]:
+    """Wall time of PCB.from_directory parsing serially and with a process pool."""
+    from gerber.pcb import PCB
+
+    results = []
+    for count in copper_layers:
+        with tempfile.TemporaryDirectory() as directory:
+            write_board(directory, count)
+            case = "{}-layer board".format(count)
+            serial = PCB.from_directory(directory)
+            results.append(make_result("from_directory", case + " [serial]",
+                                       time_call(lambda: PCB.from_directory(directory), runs),
+                                       files=len(serial.layers)))
+            results.append(make_result("from_directory", case + " [{} workers]".format(workers),
+                                       time_call(lambda: PCB.from_directory(directory, workers=workers), runs),
+                                       files=len(serial.layers), cpus=os.cpu_count()))
+    return results
+
+def benchmark_archive(copper_layers=(2, 4, 8), runs: int = 3) -> List[BenchmarkResult]:
+    """Archive ingestion in memory against extracting to disk and parsing from there."""
+    from gerber.pcb import PCB
+
+    skip_ipc = lambda name: None if name.endswith(".ipc") else name
+    results = []
+    for count in copper_layers:
+        data = board_archive(count)
+        case = "{}-layer board".format(count)
+        in_memory = PCB.from_archive(data, rename=skip_ipc)
+        results.append(make_result("archive", case + " [extract + from_directory]",
+                                   time_call(lambda: from_extracted(data), runs)))
+        results.append(make_result("archive", case + " [from_archive]",
+                                   time_call(lambda: PCB.from_archive(data, rename=skip_ipc), runs),
+                                   files=len(in_memory.layers)))
+    return results
+
+def benchmark_board_cache(copper_layers=(2, 8), runs: int = 3) -> List[BenchmarkResult]:
+    """Loading an uploaded board: parsing it against the memory and disk tiers of the parsed board cache."""
+    from gerber.pcb import PCB
+    from app.services.pcb_cache import ParsedBoardCache
+
+    skip_ipc = lambda name: None if name.endswith(".ipc") else name
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for count in copper_layers:
+            data = board_archive(count)
+            case = "{}-layer board".format(count)
+            cache = ParsedBoardCache(os.path.join(directory, str(count)))
+            load = lambda: PCB.from_archive(data, rename=skip_ipc)
+            cache.put(cache.key(data), load(), wait=True)
+            entry = next(cache.directory.glob("*/*.pcb"))
+
+            def disk_hit():
+                cache.clear_memory()
+                cache.get_or_load(data, load)
+
+            results.append(make_result("board_cache", case + " [parse]", time_call(load, runs)))
+            results.append(make_result("board_cache", case + " [disk hit]", time_call(disk_hit, runs),
+                                       entry_bytes=entry.stat().st_size, archive_bytes=len(data)))
+            results.append(make_result("board_cache", case + " [memory hit]",
+                                       time_call(lambda: cache.get_or_load(data, load), runs)))
+    return results
+
+
+def benchmark_tokenizer(runs: int = 3) -> List[BenchmarkResult]:
+    """Throughput of the RS-274X tokenizer against the character-by-character splitter."""
+    results = []
+    data = synthetic_gerber(traces=100000, pads=20000, apertures=(11, 12, 13, 14, 16))
+    megabytes = len(data) / 1e6
+    for label, parser_class in (("cascade", CascadeParser), ("single pass", GerberParser)):
+        timings = time_call(lambda: statement_stream(parser_class, data), runs)
+        results.append(make_result("tokenize", "{:.1f} MB [{}]".format(megabytes, label), timings,
+                                   mb_per_second=round(megabytes / statistics.mean(timings), 2)))
+    return results
+
+def benchmark_bounds(runs: int = 3) -> List[BenchmarkResult]:
+    """Cost of repeated bounds queries on a parsed layer, cached against recomputed."""
+    from gerber.rs274x import loads as loads_gerber
+
+    gerber_file = loads_gerber(synthetic_gerber(traces=50000, pads=20000))
+    def recompute(attribute):
+        gerber_file._changed()
+        return getattr(gerber_file, attribute)
+
+    results = []
+    for attribute in ("bounds", "bounding_box"):
+        results.append(make_result(attribute, "70k statements [recomputed]",
+                                   time_call(lambda: recompute(attribute), runs)))
+        getattr(gerber_file, attribute)
+        results.append(make_result(attribute, "70k statements x 100 [memoized]",
+                                   time_call(lambda: [getattr(gerber_file, attribute) for _ in range(100)], runs)))
+    return results
+
+# ===================================================================
+#  Coordinate decoding
+# ===================================================================
+
+def benchmark_decode(count: int = 200000, runs: int = 3) -> List[BenchmarkResult]:
+    """Per-coordinate cost of decoding Gerber number strings."""
+    from gerber.cam import FileSettings
+    from gerber.utils import parse_gerber_value, parse_gerber_values
+
+    rng = random.Random(1)
+    values = ["{}{}".format(rng.choice(("", "-")), rng.randint(0, 400000)) for _ in range(count)]
+    settings = FileSettings(format=(2, 5), zero_suppression="leading")
+    fmt, zero_suppression = settings.format, settings.zero_suppression
+
+    cases = (
+        ("string slicing", lambda: [string_parse_gerber_value(v, fmt, zero_suppression) for v in values]),
+        ("parse_gerber_value", lambda: [parse_gerber_value(v, fmt, zero_suppression) for v in values]),
+        ("parse_gerber_values", lambda: parse_gerber_values(values, fmt, zero_suppression)),
+        ("FileSettings.parse_values", lambda: settings.parse_values(values)),
+    )
+    results = []
+    for label, func in cases:
+        timings = time_call(func, runs)
+        results.append(make_result("decode", "{} values [{}]".format(count, label), timings,
+                                   ns_per_value=int(statistics.mean(timings) / count * 1e9)))
+    return results
+
+# ===================================================================
+#  Excellon format detection
+# ===================================================================
+
+def benchmark_excellon_format(hits=(5000, 50000), runs: int = 3) -> List[BenchmarkResult]:
+    """
+    Format detection time for drill files with and without a unit
+    statement, next to the brute-force detection parsing once per candidate.
+    """
+    from gerber.excellon import detect_excellon_format
+
+    results = []
+    for count in hits:
+        with_unit = synthetic_excellon(hits=count)
+        without_unit = with_unit.replace("INCH,LZ\n", "")
+        for label, data in (("INCH,LZ", with_unit), ("no unit statement", without_unit)):
+            case = "{} hits, {}".format(count, label)
+            detected = detect_excellon_format(data)
+            results.append(make_result("excellon_format", case + " [parse per candidate]",
+                                       time_call(lambda: brute_force_excellon_format(data), runs)))
+            results.append(make_result("excellon_format", case + " [single parse]",
+                                       time_call(lambda: detect_excellon_format(data), runs),
+                                       detected="{format}/{zeros}".format(**detected)))
+    return results
+
+# ===================================================================
+#  Drill table
+# ===================================================================
+
+def benchmark_drill_table(hits=(5000, 50000), runs: int = 3) -> List[BenchmarkResult]:
+    """
+    Cost of what a quote asks of a drill file (primitives for two renders,
+    bounding box, hit counts and path lengths), hit by hit and from the
+    memoized drill table.
+    """
+    from gerber.excellon import loads
+
+    results = []
+    for count in hits:
+        data = synthetic_excellon(hits=count)
+        drill_file = loads(data)
+
+        def hit_by_hit():
+            hit_primitives(drill_file)
+            hit_primitives(drill_file)
+            hit_bounding_box(drill_file)
+            dict((tool.number, tool.hit_count) for tool in drill_file.tools.values())
+            hit_path_lengths(drill_file)
+
+        def table(rebuild=True):
+            if rebuild:
+                drill_file._changed()
+            drill_file.primitives
+            drill_file.primitives
+            drill_file.bounding_box
+            drill_file.hit_count()
+            drill_file.path_length()
+
+        results.append(make_result("drill_table", "{} hits [hit by hit]".format(count),
+                                   time_call(hit_by_hit, runs)))
+        results.append(make_result("drill_table", "{} hits [drill table]".format(count),
+                                   time_call(table, runs)))
+        results.append(make_result("drill_table", "{} hits [drill table, built]".format(count),
+                                   time_call(lambda: table(rebuild=False), runs)))
+    return results
+
+# ===================================================================
+#  Streaming parse
+# ===================================================================
+
+def benchmark_stream_parse(megabytes=(5, 20)) -> List[BenchmarkResult]:
+    """
+    Parse time and peak RSS growth of plane-fill layers parsed into a
+    GerberFile and streamed primitive by primitive, each in a fresh process.
+    """
+    results = []
+    directory = tempfile.mkdtemp()
+    context = multiprocessing.get_context("spawn")
+    for size in megabytes:
+        path = os.path.join(directory, "plane_{}.gbr".format(size))
+        file_size = write_plane_fill(path, size)
+        served = {}
+        for mode in ("parse", "stream"):
+            with context.Pool(1, maxtasksperchild=1) as pool:
+                served[mode] = pool.apply(parse_peak, (mode, path))
+        for mode in ("parse", "stream"):
+            results.append(make_result("stream_parse", "{:.0f} MB plane fill [{}]".format(
+                file_size / (1024 * 1024), mode), [served[mode]["seconds"]],
+                primitives=served[mode]["primitives"], peak_rss_mb=served[mode]["peak_rss_mb"],
+                process_peak_mb=served[mode]["process_peak_mb"]))
+        os.remove(path)
+    return results
+
+# ===================================================================
+#  Rendering benchmarks
+# ===================================================================
+
+def render_png(layers, raster: bool, batch: bool = True, stamp: bool = True,
+               max_width: int = 1024, max_height: int = 1024, lod: float = 0.0,
+               tiles: int = 1) -> bytes:
+    from gerber.render import theme
+    from gerber.render.cairo_backend import GerberCairoContext
+
+    ctx = GerberCairoContext(raster=raster, batch=batch, stamp=stamp, lod=lod, tiles=tiles)
+    ctx.render_layers(layers, filename=None, theme=theme.THEMES['default'],
+                      max_width=max_width, max_height=max_height)
+    return ctx.dump_str()
+
+def benchmark_raster_mode(sizes=((2000, 500), (10000, 2000), (50000, 5000)), runs: int = 3) -> List[BenchmarkResult]:
+    """Per-layer render time of the SVG-mask path against the raster path."""
+    results = []
+    for traces, pads in sizes:
+        layer = synthetic_layer(traces=traces, pads=pads, clear_every=25)
+        case = "{} traces / {} pads".format(traces, pads)
+
+        vector_png = render_png([layer], raster=False, batch=False)
+        raster_png = render_png([layer], raster=True, batch=False, stamp=False)
+        parity = compare_png(vector_png, raster_png)
+
+        results.append(make_result("render_layer", case + " [svg masks]",
+                                   time_call(lambda: render_png([layer], raster=False, batch=False), runs)))
+        results.append(make_result("render_layer", case + " [raster]",
+                                   time_call(lambda: render_png([layer], raster=True, batch=False, stamp=False), runs),
+                                   **parity))
+    return results
+
+def benchmark_batching(sizes=((50000, 2000), (100000, 5000)), runs: int = 3) -> List[BenchmarkResult]:
+    """Raster render time with and without batching of same-aperture runs."""
+    results = []
+    for traces, pads in sizes:
+        layer = synthetic_layer(traces=traces, pads=pads, clear_every=25)
+        case = "{} segments / {} pads".format(traces, pads)
+
+        parity = compare_png(render_png([layer], raster=True, batch=False, stamp=False),
+                             render_png([layer], raster=True, batch=True, stamp=False))
+
+        results.append(make_result("render_layer", case + " [unbatched]",
+                                   time_call(lambda: render_png([layer], raster=True, batch=False, stamp=False), runs)))
+        results.append(make_result("render_layer", case + " [batched]",
+                                   time_call(lambda: render_png([layer], raster=True, batch=True, stamp=False), runs),
+                                   **parity))
+    return results
+
+def benchmark_stamps(pads=(5000, 20000, 50000), runs: int = 3) -> List[BenchmarkResult]:
+    """Raster render time of pad-heavy layers with and without aperture stamps."""
+    results = []
+    for count in pads:
+        layer = synthetic_layer(traces=1000, pads=count, clear_every=25,
+                                apertures=(11, 12, 13, 14, 16))
+        case = "{} pads".format(count)
+
+        parity = compare_png(render_png([layer], raster=True, stamp=False),
+                             render_png([layer], raster=True, stamp=True))
+
+        results.append(make_result("render_layer", case + " [vector flashes]",
+                                   time_call(lambda: render_png([layer], raster=True, stamp=False), runs)))
+        results.append(make_result("render_layer", case + " [stamped flashes]",
+                                   time_call(lambda: render_png([layer], raster=True, stamp=True), runs),
+                                   **parity))
+    return results
+
+def benchmark_lod(widths=(256, 1024, 2048), lod: float = 1.0, runs: int = 3) -> List[BenchmarkResult]:
+    """
+    Raster render time of a via-heavy copper layer and a drill layer with and
+    without the level-of-detail pass, at several output sizes, with the
+    per-channel error it introduces.
+    """
+    from gerber.render.render import DotRun, lod_primitives
+
+    copper = synthetic_layer(traces=20000, pads=20000, apertures=(17, 17, 11, 14, 16))
+    drill = load_layer_data(synthetic_excellon(hits=30000), "bench.drl")
+    results = []
+    for name, layer in (("copper", copper), ("drill", drill)):
+        for width in widths:
+            case = "{} at {} px".format(name, width)
+            exact = lambda: render_png([layer], raster=True, max_width=width, max_height=width)
+            detailed = lambda: render_png([layer], raster=True, max_width=width, max_height=width, lod=lod)
+            error = compare_png(exact(), detailed())
+
+            # How many primitives the pass merged at this size
+            (xmin, xmax), (ymin, ymax) = layer.bounds
+            scale = math.floor(min(width / (xmax - xmin), width / (ymax - ymin)))
+            merged = sum(len(item.dots) for item in lod_primitives(layer.primitives, 1.0 / scale, lod)
+                         if isinstance(item, DotRun))
+
+            results.append(make_result("render_lod", case + " [exact]", time_call(exact, runs)))
+            results.append(make_result("render_lod", case + " [lod {}]".format(lod), time_call(detailed, runs),
+                                       merged=merged, **error))
+    return results
+
+def benchmark_composite(copper_layers: int = 2, max_width: int = 1024, runs: int = 3) -> List[BenchmarkResult]:
+    """
+    Rendering a board side in every quote theme: a full render per theme against
+    rasterizing the layer masks once and compositing each theme from them.
+    """
+    from gerber.pcb import PCB
+    from gerber.render import theme
+    from gerber.render.cairo_backend import GerberCairoContext
+    from gerber.render.composite import LayerMasks
+
+    skip_ipc = lambda name: None if name.endswith(".ipc") else name
+    pcb = PCB.from_archive(board_archive(copper_layers), rename=skip_ipc)
+    themes = [theme.THEMES[name] for name in QUOTE_THEMES]
+
+    def render_all(layers):
+        images = []
+        for board_theme in themes:
+            ctx = GerberCairoContext(raster=True)
+            ctx.render_layers(layers, filename=None, theme=board_theme, max_width=max_width)
+            images.append(ctx.dump_str())
+        return images
+
+    def composite_all(layers):
+        masks = LayerMasks(layers, max_width=max_width)
+        return [masks.dump(board_theme) for board_theme in themes]
+
+    results = []
+    for side, layers in (("top", pcb.top_layers), ("bottom", pcb.bottom_layers)):
+        case = "{}-layer board, {} side, {} themes".format(copper_layers, side, len(themes))
+        masks = LayerMasks(layers, max_width=max_width)
+        masks.composite(themes[0])
+        results.append(make_result("composite", case + " [render per theme]",
+                                   time_call(lambda: render_all(layers), runs)))
+        results.append(make_result("composite", case + " [masks + composite]",
+                                   time_call(lambda: composite_all(layers), runs)))
+        results.append(make_result("composite", case + " [composite, masks cached]",
+                                   time_call(lambda: masks.composite(themes[1]), runs),
+                                   width=masks.width, height=masks.height))
+    return results
+
+def benchmark_first_image(copper_layers=(2, 8), runs: int = 3) -> List[BenchmarkResult]:
+    """
+    Time to the first image of a /quotes/v2 job once the board is parsed:
+    the full base/mask artifacts, which were the first images before
+    progressive rendering, against the low-resolution previews now published
+    first. Also the total time of previews followed by the full artifacts.
+    """
+    from app.schemas.pcb import ManufacturingParameters
+    from app.services import quote_generator
+
+    results = []
+    for count in copper_layers:
+        data = board_archive(count)
+        generator = quote_generator.QuoteGenerator(data, "board.zip", ManufacturingParameters(quantity=10))
+        generator._load_pcb()
+        file_hash = "0" * 32
+
+        def full():
+            quote_generator._layer_masks.clear()
+            return generator.generate_base_mask_artifacts(file_hash)
+
+        def preview():
+            quote_generator._layer_masks.clear()
+            return generator.generate_preview_artifacts(file_hash)
+
+        def progressive():
+            preview()
+            generator.generate_base_mask_artifacts(file_hash)
+
+        previews = preview()
+        case = "{}-layer board".format(count)
+        results.append(make_result("first_image", case + " [full artifacts]", time_call(full, runs)))
+        results.append(make_result("first_image", case + " [preview]", time_call(preview, runs),
+                                   previews=len(previews)))
+        results.append(make_result("first_image", case + " [preview, then full]", time_call(progressive, runs)))
+    return results
+
+def benchmark_spatial_index(traces: int = 100000, pads: int = 100000,
+                            fractions=(0.001, 0.01, 0.1), runs: int = 3) -> List[BenchmarkResult]:
+    """
+    Build time of a layer's spatial index and window query time against a
+    linear scan of the primitives' bounding boxes, on a 200k primitive layer.
+    """
+    from gerber.spatial import SpatialIndex
+
+    layer = synthetic_layer(traces=traces, pads=pads, clear_every=50)
+    count = len(layer.primitives)
+    results = [make_result("spatial_index", "build {} primitives".format(count),
+                           time_call(lambda: SpatialIndex(layer.primitives), runs))]
+
+    boxes = [primitive.bounding_box for primitive in layer.primitives]
+    for fraction in fractions:
+        windows = [window_at(layer.bounds, fraction, random.Random(seed)) for seed in range(20)]
+        found = len(layer.query(windows[0]))
+        case = "{:g}% window x{}".format(fraction * 100, len(windows))
+        results.append(make_result("spatial_index", case + " [linear]",
+                                   time_call(lambda: [linear_query(boxes, w) for w in windows], runs)))
+        results.append(make_result("spatial_index", case + " [index]",
+                                   time_call(lambda: [layer.query(w) for w in windows], runs),
+                                   primitives=found))
+    return results
+
+def benchmark_render_window(traces: int = 100000, pads: int = 100000, scale: int = 1000,
+                            fractions=(0.001, 0.01), runs: int = 3) -> List[BenchmarkResult]:
+    """
+    Raster render time of a window of a 200k primitive layer with
+    `render_window` against drawing every primitive clipped to the window.
+    """
+    from gerber.render.cairo_backend import GerberCairoContext
+
+    layer = synthetic_layer(traces=traces, pads=pads, clear_every=50)
+    layer.spatial_index
+    results = []
+    for fraction in fractions:
+        window = window_at(layer.bounds, fraction, random.Random(1))
+
+        def windowed():
+            ctx = GerberCairoContext(scale=scale, raster=True)
+            return ctx.render_window([layer], window)
+
+        def clipped():
+            ctx = GerberCairoContext(scale=scale, raster=True)
+            ctx.render_layer(layer, bounds=window)
+            return ctx.dump()
+
+        case = "{:g}% window at {} px/in".format(fraction * 100, scale)
+        results.append(make_result("render_window", case + " [all primitives]", time_call(clipped, runs)))
+        results.append(make_result("render_window", case + " [indexed]", time_call(windowed, runs)))
+    return results
+
+def benchmark_tiled(threads=(1, 2, 4, 8), width: int = 4096, runs: int = 3) -> List[BenchmarkResult]:
+    """
+    Raster render time of a dense copper layer and a mirrored, inverted
+    solder mask drawn as 1 to 8 strips on as many threads.
+    """
+    from gerber.render.cairo_backend import GerberCairoContext
+    from gerber.render.render import RenderSettings
+    from gerber.render.theme import THEMES, Theme
+
+    copper = synthetic_layer(traces=100000, pads=50000, clear_every=50)
+    mask = synthetic_layer("bench.gts", traces=0, pads=50000)
+    mask.layer_class = "topmask"
+    themes = (("copper", [copper], THEMES["default"]),
+              ("mirrored mask", [mask], Theme(topmask=RenderSettings((0.1, 0.5, 0.2), alpha=0.8,
+                                                                      mirror=True, invert=True))))
+    results = []
+    for name, layers, layer_theme in themes:
+        def render(tiles):
+            ctx = GerberCairoContext(raster=True, tiles=tiles)
+            ctx.render_layers(layers, filename=None, theme=layer_theme, max_width=width, max_height=width)
+            return ctx.dump_str()
+
+        baseline = None
+        for count in threads:
+            timings = time_call(lambda: render(count), runs)
+            baseline = baseline or statistics.mean(timings)
+            results.append(make_result("render_tiled", "{} at {} px, {} threads".format(name, width, count),
+                                       timings, speedup=round(baseline / statistics.mean(timings), 2)))
+    return results
+
+BENCHMARKS: Dict[str, Callable[[], List[BenchmarkResult]]] = {
+    "bounds": benchmark_bounds,
+    "decode": benchmark_decode,
+    "excellon_format": benchmark_excellon_format,
+    "drill_table": benchmark_drill_table,
+    "stream_parse": benchmark_stream_parse,
+    "parse": benchmark_parse,
+    "directory": benchmark_directory,
+    "archive": benchmark_archive,
+    "tokenizer": benchmark_tokenizer,
+    "raster": benchmark_raster_mode,
+    "batching": benchmark_batching,
+    "stamps": benchmark_stamps,
+    "board_cache": benchmark_board_cache,
+    "composite": benchmark_composite,
+    "first_image": benchmark_first_image,
+    "lod": benchmark_lod,
+    "spatial_index": benchmark_spatial_index,
+    "render_window": benchmark_render_window,
+    "tiled": benchmark_tiled,
+}
+
+def print_results(results: List[BenchmarkResult]):
+    for result in results:
+        extra = " ".join("{}={}".format(k, v) for k, v in result.extra.items())
+        print("{:<24} {:<44} mean {:>9.4f}s  min {:>9.4f}s  {}".format(
+            result.name, result.case, result.mean_seconds, result.min_seconds, extra))
+
+# Example usage and CLI
+def main():
+    """Main function for running the gerber benchmarks."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run gerber parsing and rendering benchmarks")
+    parser.add_argument("benchmarks", nargs="*",
+                        help="Benchmarks to run: {} (default: all)".format(", ".join(sorted(BENCHMARKS))))
+    args = parser.parse_args()
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmarks: {}".format(", ".join(unknown)))
+
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        print(f"\n=== {name} ===")
+        print_results(BENCHMARKS[name]())
+
+if __name__ == "__main__":
+    main()
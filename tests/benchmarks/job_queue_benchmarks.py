@@ -0,0 +1,290 @@
+# tests/benchmarks/job_queue_benchmarks.py
+
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from app.schemas.pcb import QuoteManifest
+from app.services.artifact_store import ArtifactStore
+from app.services.image_cache_service import ImageCacheService
+from app.services.job_events import JobEventBus
+from app.services.job_store import COMPLETED, FAILED, SQLiteJobStore
+from app.services.quote_jobs import build_manifest
+from app.utils.image_encoding import encode_sizes
+from app.utils.zip_creator import stream_zip
+from tests.benchmarks.gerber_benchmarks import BenchmarkResult, make_result, print_results, time_call
+from tests.test_image_encoding import png_round_trip_artifacts, synthetic_render
+from tests.test_job_store import run_claimers
+from tests.test_zip_creator import quote_entries
+
+def synthetic_artifacts(small: int = 16 * 1024, large: int = 160 * 1024) -> Dict[str, Dict]:
+    """Random (incompressible, like WebP) base/mask images for both sides at 256 and 1024 px."""
+    artifacts = {}
+    for side in ("top", "bottom"):
+        for variant in ("base", "mask"):
+            for size, length in (("256", small), ("1024", large)):
+                artifacts[f"{side}.{variant}.{size}"] = {"data": b"RIFF" + os.urandom(length - 4)}
+    return artifacts
+
+def data_url_manifest(artifacts: Dict[str, Dict]) -> Dict:
+    """The manifest as it was built before the artifact store: images inlined as data URLs."""
+    manifest = {"renderVersion": "v2", "sides": {}}
+    for key, artifact in artifacts.items():
+        side, variant, size = key.split('.')
+        manifest["sides"].setdefault(side, {"base": {}, "mask": {}})
+        encoded = base64.b64encode(artifact['data']).decode()
+        manifest["sides"][side][variant][size] = f"data:image/webp;base64,{encoded}"
+    return manifest
+
+def benchmark_manifest(runs: int = 20) -> List[BenchmarkResult]:
+    """Size of the /quotes/v2 manifest and the time to store it and serve it from /manifest."""
+    artifacts = synthetic_artifacts()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ArtifactStore(directory)
+        stored = {name: store.put(artifact["data"]) for name, artifact in artifacts.items()}
+        manifests = {
+            "data_urls": data_url_manifest(artifacts),
+            "artifact_urls": build_manifest("job", artifacts, stored),
+        }
+
+    results = []
+    for name, manifest in manifests.items():
+        encoded = json.dumps(manifest)
+        QuoteManifest(**manifest)
+        # What the job store writes once, then what every /manifest poll does
+        serialize = time_call(lambda: json.dumps(manifest), runs)
+        serve = time_call(lambda: QuoteManifest(**json.loads(encoded)).model_dump_json(by_alias=True), runs)
+        results.append(make_result(name + ".serialize", "8 artifacts", serialize, manifest_bytes=len(encoded),
+                                   mean_us=round(1e6 * sum(serialize) / runs)))
+        results.append(make_result(name + ".serve", "8 artifacts", serve, manifest_bytes=len(encoded),
+                                   mean_us=round(1e6 * sum(serve) / runs)))
+    return results
+
+def walk_stats(directory: str) -> Dict:
+    """Cache stats as they were computed before the index: a walk over every file."""
+    files = [path for path in Path(directory).rglob("*") if path.is_file()]
+    return {"total_entries": len(files), "total_size_mb": sum(path.stat().st_size for path in files) / 2 ** 20}
+
+def benchmark_image_cache(entries=(1000, 10000), runs: int = 20) -> List[BenchmarkResult]:
+    """Image cache stats from the index against a directory walk, and hit latency of both tiers."""
+    image = os.urandom(8 * 1024)
+    results = []
+    for count in entries:
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+            cache = ImageCacheService(directory, memory_bytes=64 * 1024 * 1024)
+            for index in range(count):
+                cache.cache_images(b"board %d" % index, "green", "FR-4", image, image)
+            cold = ImageCacheService(directory)
+            case = "{} entries".format(count)
+            results.append(make_result("image_cache.stats", case + " [directory walk]",
+                                       time_call(lambda: walk_stats(directory), 3)))
+            results.append(make_result("image_cache.stats", case + " [index]",
+                                       time_call(cache.get_cache_stats, runs)))
+            results.append(make_result("image_cache.get", case + " [disk]",
+                                       time_call(lambda: cold.get_cached_images(b"board 1", "green", "FR-4"), runs)))
+            results.append(make_result("image_cache.get", case + " [memory]",
+                                       time_call(lambda: cache.get_cached_images(b"board 1", "green", "FR-4"), runs)))
+    return results
+
+# ===================================================================
+#  Benchmarks
+# ===================================================================
+
+def benchmark_job_queue(jobs: int = 1000, processes=(1, 2, 4)) -> List[BenchmarkResult]:
+    """Claim + complete throughput of the SQLite job store with several worker processes."""
+    results = []
+    for count in processes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "jobs.db")
+            store = SQLiteJobStore(path)
+            for index in range(jobs):
+                store.enqueue("test", {"n": index}, payload=b"x" * 1024)
+            start = time.perf_counter()
+            run_claimers(path, count)
+            elapsed = time.perf_counter() - start
+        results.append(make_result("claim_complete", "{} jobs, {} processes".format(jobs, count), [elapsed],
+                                   jobs_per_second=int(jobs / elapsed)))
+    return results
+
+def benchmark_job_events(subscribers: int = 1000, seconds: float = 10.0,
+                         poll_interval: float = 1.0) -> List[BenchmarkResult]:
+    """
+    CPU used by `subscribers` clients following one job for `seconds`: the
+    old SSE handler polling the store every 0.5 s vs. JobEventBus.follow()
+    as the SSE handler runs it without a transport, reading the store off
+    the event loop every `poll_interval` seconds while idle. The job is
+    driven either by an in-process worker, which publishes its changes, or
+    by a worker in another process, whose changes only arrive from the store.
+    """
+    stages = ("parsing", "rendering", "uploading")
+
+    async def drive(store: SQLiteJobStore, job_id: str, bus=None):
+        # A job moving through its stages over `seconds`
+        job = store.claim("w", 60)
+        for status in stages:
+            await asyncio.sleep(seconds / (len(stages) + 1))
+            store.update(job.id, "w", status)
+            if bus is not None:
+                bus.publish(job_id, store.get(job_id))
+        await asyncio.sleep(seconds / (len(stages) + 1))
+        store.complete(job.id, "w", {})
+        if bus is not None:
+            bus.publish(job_id, store.get(job_id))
+
+    async def poll(store: SQLiteJobStore, job_id: str):
+        events = 0
+        while True:
+            status = store.get(job_id)
+            events += 1
+            if status["status"] in (COMPLETED, FAILED):
+                return events
+            await asyncio.sleep(0.5)
+
+    async def follow(bus: JobEventBus, load, job_id: str):
+        events = 0
+        async for event in bus.follow(job_id, load, heartbeat_interval=15, poll_interval=poll_interval):
+            events += event is not None
+        return events
+
+    async def polled(store, job_id):
+        counts = await asyncio.gather(drive(store, job_id),
+                                      *(poll(store, job_id) for _ in range(subscribers)))
+        return counts[1:], sum(counts[1:])
+
+    async def followed(store, job_id, publishes):
+        loads = []
+
+        def load():
+            loads.append(job_id)
+            return asyncio.to_thread(store.get, job_id)
+
+        bus = JobEventBus()
+        bus.publish(job_id, store.get(job_id))
+        counts = await asyncio.gather(drive(store, job_id, bus if publishes else None),
+                                      *(follow(bus, load, job_id) for _ in range(subscribers)))
+        return counts[1:], len(loads)
+
+    cases = (("polling", polled),
+             ("follow [in-process worker]", lambda store, job_id: followed(store, job_id, True)),
+             ("follow [worker in another process]", lambda store, job_id: followed(store, job_id, False)))
+    results = []
+    for name, run in cases:
+        with tempfile.TemporaryDirectory() as directory:
+            store = SQLiteJobStore(os.path.join(directory, "jobs.db"))
+            job_id = store.enqueue("test", {})
+            start, cpu_start = time.perf_counter(), time.process_time()
+            counts, reads = asyncio.run(run(store, job_id))
+            elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+        results.append(make_result(name, "{} subscribers".format(subscribers), [elapsed],
+                                   cpu_seconds=round(cpu, 3), cpu_percent=round(100 * cpu / elapsed, 1),
+                                   messages=sum(counts), store_reads=reads))
+    return results
+
+def buffered_zip(entries):
+    """The /generate-quote/ archive as it was built before streaming: deflated into a BytesIO."""
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_out:
+        for name, data in entries:
+            zip_out.writestr(name, data)
+    zip_buffer.seek(0)
+    return zip_buffer
+
+def _serve_zip(mode: str, images: int, size: int) -> Dict:
+    """Serve one archive through StreamingResponse; runs in a fresh process for its peak RSS."""
+    from fastapi.responses import StreamingResponse
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = {"first": None, "bytes": 0}
+
+    async def receive():
+        # The client never disconnects
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            if timings["first"] is None:
+                timings["first"] = time.perf_counter()
+            timings["bytes"] += len(message["body"])
+
+    async def serve():
+        start = time.perf_counter()
+        # Every image is rendered before the archive is, as in /generate-quote/
+        entries = list(quote_entries(images, size))
+        if mode == "buffered":
+            body = buffered_zip(entries)
+        else:
+            body = stream_zip(entries)
+        response = StreamingResponse(body, media_type="application/zip")
+        await response({"type": "http", "method": "POST", "path": "/generate-quote/"}, receive, send)
+        return start
+
+    start = asyncio.run(serve())
+    end = time.perf_counter()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"ttfb": timings["first"] - start, "total": end - start, "bytes": timings["bytes"],
+            "peak_rss_mb": round((peak - baseline) / 1024, 1)}
+
+def benchmark_quote_zip(images=(2, 16, 64), size: int = 2 * 1024 * 1024) -> List[BenchmarkResult]:
+    """Time to first byte, total time and peak RSS growth of the /generate-quote/ archive, buffered vs streamed."""
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for count in images:
+            for mode in ("buffered", "streamed"):
+                served = pool.apply(_serve_zip, (mode, count, size))
+                results.append(make_result(
+                    "quote_zip." + mode, f"{count} x {size // (1024 * 1024)} MiB images", [served["total"]],
+                    ttfb_ms=round(served["ttfb"] * 1000, 1), peak_rss_mb=served["peak_rss_mb"],
+                    archive_mb=round(served["bytes"] / (1024 * 1024), 1)))
+    return results
+
+def benchmark_artifact_encoding(methods=(0, 4, 6), runs: int = 5) -> List[BenchmarkResult]:
+    """Per-render time to encode the 256px WebP and 1024px PNG artifacts, via a PNG round trip and straight from the pixels."""
+    from app.services.quote_generator import QuoteGenerator
+
+    width, height = 1024, 600
+    pixels = synthetic_render(width, height)
+    results = []
+    for method in methods:
+        encodings = dict(QuoteGenerator.ARTIFACT_ENCODINGS)
+        encodings[256] = ('WEBP', {'quality': 85, 'method': method})
+        case = f"{width}x{height}, webp method {method}"
+        sizes = {size: len(data) for size, data in encode_sizes(pixels, width, height, encodings).items()}
+        results.append(make_result("artifact_encoding.png_round_trip", case,
+                                   time_call(lambda: png_round_trip_artifacts(pixels, width, height, encodings), runs)))
+        results.append(make_result("artifact_encoding.pixels", case,
+                                   time_call(lambda: encode_sizes(pixels, width, height, encodings), runs),
+                                   webp_bytes=sizes[256], png_bytes=sizes[1024]))
+    return results
+
+BENCHMARKS: Dict[str, Callable[[], List[BenchmarkResult]]] = {
+    "job_queue": benchmark_job_queue,
+    "job_events": benchmark_job_events,
+    "manifest": benchmark_manifest,
+    "image_cache": benchmark_image_cache,
+    "quote_zip": benchmark_quote_zip,
+    "artifact_encoding": benchmark_artifact_encoding,
+}
+
+def main():
+    """Main function for running the job queue benchmarks."""
+    import sys
+
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"\n=== {name} ===")
+        print_results(BENCHMARKS[name]())
+
+if __name__ == "__main__":
+    main()
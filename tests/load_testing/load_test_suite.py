@@ -234,6 +234,69 @@ class HealthCheckLoadTest(LoadTestScenario):
                 'endpoint': endpoint
             }
 
+class PriceRecalculationLoadTest(LoadTestScenario):
+    """Load test for the dimension-based pricing endpoint, which never renders."""
+    
+    def __init__(self, config: LoadTestConfig):
+        super().__init__("Price Recalculation Load Test", config)
+    
+    async def execute_request(self, session: aiohttp.ClientSession) -> Dict[str, Any]:
+        """Execute a price recalculation request."""
+        width, height = random.randint(10, 200), random.randint(10, 200)
+        payload = {
+            "dimensions": {"width_mm": width, "height_mm": height, "area_m2": width * height / 1e6},
+            "params": {"quantity": random.choice([5, 10, 25, 50])}
+        }
+        endpoint = "/api/v1/pcb/recalculate-price/"
+        
+        try:
+            async with session.post(f"{self.config.base_url}{endpoint}", json=payload) as response:
+                await response.read()
+                return {
+                    'success': response.status == 200,
+                    'status_code': response.status,
+                    'endpoint': endpoint
+                }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'endpoint': endpoint
+            }
+
+class RenderUploadLoadTest(LoadTestScenario):
+    """Load test uploading real Gerber archives to a quote endpoint that parses and renders them."""
+    
+    def __init__(self, config: LoadTestConfig, endpoint: str = "/api/v1/pcb/generate-quote/",
+                 copper_layers: int = 4):
+        super().__init__("Render Upload Load Test", config)
+        from tests.benchmarks.gerber_benchmarks import board_archive
+        
+        self.endpoint = endpoint
+        self.archive = board_archive(copper_layers)
+    
+    async def execute_request(self, session: aiohttp.ClientSession) -> Dict[str, Any]:
+        """Upload the board archive."""
+        form = aiohttp.FormData()
+        form.add_field('file', self.archive, filename='board.zip', content_type='application/zip')
+        form.add_field('params_json', json.dumps({"quantity": 10}))
+        
+        try:
+            async with session.post(f"{self.config.base_url}{self.endpoint}", data=form) as response:
+                await response.read()
+                return {
+                    # 503 is the render pool shedding load, which is expected under saturation
+                    'success': response.status in (200, 503),
+                    'status_code': response.status,
+                    'endpoint': self.endpoint
+                }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'endpoint': self.endpoint
+            }
+
 class LoadTestRunner:
     """Runs multiple load test scenarios."""
     
@@ -307,6 +370,59 @@ class LoadTestRunner:
         
         return results
     
+    async def run_render_isolation_test(
+        self,
+        pricing_users: int = 5,
+        render_users: int = 4,
+        duration_seconds: int = 30,
+        render_endpoint: str = "/api/v1/pcb/generate-quote/"
+    ) -> Dict[str, Any]:
+        """
+        Measure pricing latency alone, then again while boards are rendered.
+        
+        With renders running in the render worker pool the pricing p99 should
+        stay close to its baseline instead of growing with render time.
+        """
+        def pricing_config() -> LoadTestConfig:
+            return LoadTestConfig(
+                base_url=self.base_url,
+                concurrent_users=pricing_users,
+                duration_seconds=duration_seconds,
+                think_time_seconds=0.1
+            )
+        
+        baseline = await PriceRecalculationLoadTest(pricing_config()).run_scenario()
+        
+        render_scenario = RenderUploadLoadTest(
+            LoadTestConfig(
+                base_url=self.base_url,
+                concurrent_users=render_users,
+                duration_seconds=duration_seconds,
+                think_time_seconds=0,
+                timeout_seconds=300
+            ),
+            endpoint=render_endpoint
+        )
+        under_render, renders = await asyncio.gather(
+            PriceRecalculationLoadTest(pricing_config()).run_scenario(),
+            render_scenario.run_scenario()
+        )
+        self.results.extend([baseline, under_render, renders])
+        
+        status_codes: Dict[int, int] = {}
+        for result in render_scenario.results:
+            code = result.get('status_code', 0)
+            status_codes[code] = status_codes.get(code, 0) + 1
+        
+        return {
+            "baseline": baseline,
+            "under_render": under_render,
+            "renders": renders,
+            "render_status_codes": status_codes,
+            "p99_ratio": (under_render.p99_response_time / baseline.p99_response_time
+                          if baseline.p99_response_time else 0)
+        }
+    
     def generate_report(self) -> Dict[str, Any]:
         """Generate a comprehensive load test report."""
         if not self.results:
@@ -341,12 +457,26 @@ async def main():
     parser.add_argument("--url", default="http://localhost:8000", help="Base URL for testing")
     parser.add_argument("--users", type=int, default=10, help="Number of concurrent users")
     parser.add_argument("--duration", type=int, default=60, help="Test duration in seconds")
-    parser.add_argument("--scenario", choices=["pricing", "health", "stress"], default="pricing")
+    parser.add_argument("--scenario", choices=["pricing", "health", "stress", "render-isolation"], default="pricing")
+    parser.add_argument("--render-users", type=int, default=4, help="Concurrent render uploads (render-isolation)")
+    parser.add_argument("--render-endpoint", default="/api/v1/pcb/generate-quote/", help="Upload endpoint (render-isolation)")
     
     args = parser.parse_args()
     
     runner = LoadTestRunner(args.url)
     
+    if args.scenario == "render-isolation":
+        report = await runner.run_render_isolation_test(args.users, args.render_users, args.duration,
+                                                        args.render_endpoint)
+        print("\n=== Render Isolation Results ===")
+        for label in ("baseline", "under_render"):
+            r = report[label]
+            print(f"Pricing {label}: {r.total_requests} requests, "
+                  f"p50 {r.p50_response_time:.3f}s, p99 {r.p99_response_time:.3f}s")
+        print(f"Render uploads: {report['renders'].total_requests} ({report['render_status_codes']})")
+        print(f"Pricing p99 ratio (under render / baseline): {report['p99_ratio']:.2f}")
+        return
+    
     if args.scenario == "pricing":
         result = await runner.run_pricing_load_test(args.users, args.duration)
     elif args.scenario == "health":
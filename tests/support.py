@@ -0,0 +1,265 @@
+# tests/support.py
+
+"""
+Synthetic boards shared by the tests and the benchmarks in tests/benchmarks.
+Only the gerber package is imported here, so the parser tests run without
+the app's dependencies; reference implementations live with their tests.
+"""
+
+import io
+import math
+import os
+import random
+import tempfile
+import zipfile
+from typing import Any, Dict, List, Tuple
+
+from gerber.layers import load_layer_data
+
+# ===================================================================
+#  Synthetic board data
+# ===================================================================
+
+GERBER_HEADER = (
+    "%FSLAX25Y25*%\n"
+    "%MOIN*%\n"
+    "%ADD10C,0.00800*%\n"
+    "%ADD11C,0.06000*%\n"
+    "%ADD12R,0.06000X0.04000*%\n"
+    "%ADD13O,0.08000X0.04000*%\n"
+    "%ADD14P,0.06000X6X0.0*%\n"
+    "%ADD15C,0.10000X0.03000*%\n"
+    "%AMPAD*1,1,0.05,0,0*21,1,0.07,0.02,0.01,0,30*%\n"
+    "%ADD16PAD*%\n"
+    "%ADD17C,0.00400*%\n"
+)
+
+def _coord(value: float) -> str:
+    return "%d" % int(round(value * 100000))
+
+def synthetic_gerber(traces: int = 1000, pads: int = 1000, width: float = 4.0,
+                     height: float = 3.0, clear_every: int = 0, seed: int = 1,
+                     apertures=(11, 12, 13, 14, 15)) -> str:
+    """
+    Build an RS-274X copper layer with `traces` line segments and `pads` flashes
+    spread over a `width` x `height` inch board.
+
+    Traces are emitted as long connected runs with a single aperture, the way
+    CAM tools write them. Pads are grouped by aperture and use circle,
+    rectangle, obround, polygon and holed-circle apertures unless `apertures`
+    selects others (16 is an aperture macro, 17 a 4 mil dot). If `clear_every` is set, every
+    n-th pad is flashed with clear polarity.
+    """
+    rng = random.Random(seed)
+    lines = [GERBER_HEADER, "%LPD*%\n", "G01*\n", "D10*\n"]
+
+    x, y = rng.uniform(0, width), rng.uniform(0, height)
+    lines.append("X{}Y{}D02*\n".format(_coord(x), _coord(y)))
+    for index in range(traces):
+        if index % 50 == 0:
+            x, y = rng.uniform(0, width), rng.uniform(0, height)
+            lines.append("X{}Y{}D02*\n".format(_coord(x), _coord(y)))
+        x = min(max(x + rng.uniform(-0.1, 0.1), 0.0), width)
+        y = min(max(y + rng.uniform(-0.1, 0.1), 0.0), height)
+        lines.append("X{}Y{}D01*\n".format(_coord(x), _coord(y)))
+
+    for index in range(pads):
+        aperture = apertures[index * len(apertures) // max(pads, 1)]
+        if index == 0 or aperture != apertures[(index - 1) * len(apertures) // pads]:
+            lines.append("D{}*\n".format(aperture))
+        if clear_every and index % clear_every == 0:
+            lines.append("%LPC*%\n")
+        lines.append("X{}Y{}D03*\n".format(_coord(rng.uniform(0, width)),
+                                           _coord(rng.uniform(0, height))))
+        if clear_every and index % clear_every == 0:
+            lines.append("%LPD*%\n")
+
+    lines.append("M02*\n")
+    return "".join(lines)
+
+def synthetic_layer(filename: str = "bench.gtl", **kwargs):
+    return load_layer_data(synthetic_gerber(**kwargs), filename)
+
+def synthetic_excellon(hits: int = 1000, width: float = 4.0, height: float = 3.0,
+                       seed: int = 1) -> str:
+    """Build an Excellon drill file with `hits` holes spread over three tools."""
+    rng = random.Random(seed)
+    lines = ["M48\n", "INCH,LZ\n", "T01C0.0120\n", "T02C0.0320\n", "T03C0.1250\n", "%\n"]
+    for tool in (1, 2, 3):
+        lines.append("T{:02d}\n".format(tool))
+        for _ in range(hits // 3):
+            lines.append("X{:06d}Y{:06d}\n".format(int(rng.uniform(0, width) * 10000),
+                                                    int(rng.uniform(0, height) * 10000)))
+    lines.append("M30\n")
+    return "".join(lines)
+
+
+def write_board(directory: str, copper_layers: int, pads: int = 5000, traces: int = 5000):
+    """
+    Write a board with `copper_layers` copper layers plus masks, silkscreens,
+    an outline and a drill file into `directory`.
+    """
+    extensions = ["gtl", "gbl", "gts", "gbs", "gto", "gbo", "gko"]
+    extensions += ["g{}".format(index) for index in range(1, copper_layers - 1)]
+    for seed, extension in enumerate(extensions, 1):
+        with open(os.path.join(directory, "board." + extension), "w") as f:
+            f.write(synthetic_gerber(traces=traces, pads=pads, seed=seed))
+    with open(os.path.join(directory, "board.drl"), "w") as f:
+        f.write(synthetic_excellon(hits=pads, seed=len(extensions) + 1))
+
+def layer_summary(pcb) -> List[Any]:
+    return [(layer.layer_class, layer.bounds, len(layer.primitives)) for layer in pcb.layers]
+
+def board_archive(copper_layers: int, folder: str = "board/") -> bytes:
+    """
+    Zip a board written by `write_board` into `folder`, alongside the kind of
+    clutter CAM exports carry: a PDF, an IPC netlist and macOS metadata.
+    """
+    buffer = io.BytesIO()
+    with tempfile.TemporaryDirectory() as directory, \
+            zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        write_board(directory, copper_layers)
+        for filename in sorted(os.listdir(directory)):
+            archive.write(os.path.join(directory, filename), folder + filename)
+        archive.writestr(folder + "fab notes.pdf", b"%PDF-1.4" + bytes(200000))
+        archive.writestr(folder + "board.ipc", "P  JOB board\n999\n")
+        archive.writestr("__MACOSX/" + folder + "._board.gtl", b"\0" * 4096)
+    return buffer.getvalue()
+
+def from_extracted(data: bytes, folder: str = "board/"):
+    """The previous ingestion path: extract everything, then parse from disk."""
+    from gerber.pcb import PCB
+
+    with tempfile.TemporaryDirectory() as directory:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            archive.extractall(directory)
+        os.remove(os.path.join(directory, folder, "board.ipc"))
+        return PCB.from_directory(os.path.join(directory, folder))
+
+def window_at(bounds, fraction: float, rng) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    """A random window covering `fraction` of the area of `bounds`."""
+    (xmin, xmax), (ymin, ymax) = bounds
+    width = (xmax - xmin) * math.sqrt(fraction)
+    height = (ymax - ymin) * math.sqrt(fraction)
+    x = rng.uniform(xmin, xmax - width)
+    y = rng.uniform(ymin, ymax - height)
+    return ((x, x + width), (y, y + height))
+
+
+
+def excellon_candidates(hits: int = 300, seed: int = 1) -> Dict[str, str]:
+    """
+    Drill files written in each format and zero mode, with and without the
+    unit and format hints, with decimal coordinates, rout and G85 slots.
+    """
+    from gerber.utils import write_gerber_value
+
+    rng = random.Random(seed)
+    files = {}
+    for fmt in ((2, 4), (2, 5), (3, 3)):
+        for zeros, suppression in (("LZ", "trailing"), ("TZ", "leading")):
+            for hint in ("none", "unit", "comment", "fmat"):
+                def coord(value):
+                    return write_gerber_value(value, fmt, suppression)
+                lines = []
+                if hint == "comment":
+                    lines.append(";FILE_FORMAT={}:{}\n".format(*fmt))
+                lines.append("M48\n")
+                if hint == "unit":
+                    lines.append("INCH,{}\n".format(zeros))
+                elif hint == "fmat":
+                    lines += ["FMAT,2\n", "METRIC,{},000.000\n".format(zeros)]
+                lines += ["T1C0.0{}\n".format(rng.randint(100, 400)),
+                          "T2C{}\n".format(coord(0.0315)), "T3C0.125\n", "%\n", "G90\n", "G05\n"]
+                for tool in (1, 2, 3):
+                    lines.append("T{}\n".format(tool))
+                    for index in range(hits // 3):
+                        x, y = rng.uniform(-1, 9), rng.uniform(-1, 7)
+                        kind = index % 10
+                        if kind == 7:
+                            lines.append("X{}Y{}G85X{}\n".format(coord(x), coord(y), coord(x + 0.2)))
+                        elif kind == 8:
+                            lines.append("X{:.4f}Y{:.4f}\n".format(x, y))
+                        elif kind == 9:
+                            lines += ["G00X{}Y{}\n".format(coord(x), coord(y)), "M15\n", "G01\n",
+                                      "Y{}\n".format(coord(y + 0.3)), "M16\n", "G05\n"]
+                        else:
+                            lines.append("X{}Y{}\n".format(coord(x), coord(y)))
+                lines.append("M30\n")
+                files["{} {} {} hint".format(fmt, zeros, hint)] = "".join(lines)
+    files["no hits"] = "M48\nT1C0.02\n%\nM30\n"
+    files["incremental"] = "M48\nICI,ON\nT1C0.02\n%\nT1\nX1000Y1000\nX200\nM30\n"
+    files["repeat"] = "M48\nT1C0.02\n%\nT1\nX010000Y010000\nR4X001000\nM30\n"
+    return files
+
+def write_plane_fill(path: str, megabytes: float, vertices: int = 400, seed: int = 1) -> int:
+    """
+    Write a plane-fill layer of about `megabytes` MB to `path`: copper pour
+    regions with `vertices` outline points each, written as CAM tools write
+    them, with a few clearance flashes per region. Returns the file size.
+    """
+    rng = random.Random(seed)
+    limit = int(megabytes * 1024 * 1024)
+    size = 0
+    with open(path, "w") as f:
+        f.write(GERBER_HEADER + "%LPD*%\nG01*\n")
+        while size < limit:
+            cx, cy = rng.uniform(0.5, 15.5), rng.uniform(0.5, 11.5)
+            lines = ["G36*\n"]
+            for index in range(vertices + 1):
+                angle = 2 * math.pi * (index % vertices) / vertices
+                radius = 0.4 + 0.05 * math.sin(7 * angle)
+                lines.append("X{}Y{}D0{}*\n".format(_coord(cx + radius * math.cos(angle)),
+                                                   _coord(cy + radius * math.sin(angle)),
+                                                   2 if index == 0 else 1))
+            lines += ["G37*\n", "%LPC*%\n", "D11*\n"]
+            lines += ["X{}Y{}D03*\n".format(_coord(cx + rng.uniform(-0.2, 0.2)),
+                                            _coord(cy + rng.uniform(-0.2, 0.2))) for _ in range(5)]
+            lines.append("%LPD*%\n")
+            chunk = "".join(lines)
+            f.write(chunk)
+            size += len(chunk)
+        f.write("M02*\n")
+    return os.path.getsize(path)
+
+# ===================================================================
+#  Rendering
+# ===================================================================
+
+# Themes the quote service renders: board colors, then the base/mask variants
+QUOTE_THEMES = ("default", "Blue", "Red", "Black", "White", "Yellow",
+                "Base", "Base_Flex", "Base_Aluminum", "Mask", "Mask_Flex")
+
+def cairo_available() -> bool:
+    """Whether libcairo can be loaded, for the tests that render."""
+    try:
+        from gerber.render.cairo_backend import cairo
+        cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
+    except Exception:
+        return False
+    return True
+
+def compare_png(png_a: bytes, png_b: bytes, tolerance: int = 8) -> Dict[str, Any]:
+    """
+    Compare two PNG images of the same size.
+
+    Returns the largest and mean per-channel difference and the fraction of
+    channels that differ by more than `tolerance`.
+    """
+    from gerber.render.cairo_backend import cairo
+
+    surface_a = cairo.ImageSurface.create_from_png(io.BytesIO(png_a))
+    surface_b = cairo.ImageSurface.create_from_png(io.BytesIO(png_b))
+    if (surface_a.get_width(), surface_a.get_height()) != (surface_b.get_width(), surface_b.get_height()):
+        return {"same_size": False, "max_diff": 255, "mean_diff": 255.0, "mismatch_ratio": 1.0}
+
+    data_a = bytes(surface_a.get_data())
+    data_b = bytes(surface_b.get_data())
+    diffs = [abs(a - b) for a, b in zip(data_a, data_b)]
+    mismatches = len([d for d in diffs if d > tolerance])
+    return {
+        "same_size": True,
+        "max_diff": max(diffs) if diffs else 0,
+        "mean_diff": round(sum(diffs) / len(diffs), 4) if diffs else 0.0,
+        "mismatch_ratio": mismatches / len(diffs) if diffs else 0.0,
+    }
@@ -0,0 +1,74 @@
+# tests/test_artifact_store.py
+
+import os
+import time
+
+import pytest
+
+from app.services.artifact_store import ArtifactStore
+
+def artifact(index, size=1000):
+    return bytes([index % 256]) * size
+
+def stored_files(store):
+    return [path for path in store.root.rglob("*") if path.is_file()]
+
+def age(store, ref, seconds):
+    """Make an artifact look stored `seconds` ago."""
+    then = time.time() - seconds
+    os.utime(store.path(ref.digest), (then, then))
+
+def test_artifacts_are_stored_once_by_content(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    refs = [store.put(artifact(index)) for index in range(4)]
+    for index, ref in enumerate(refs):
+        assert store.put(artifact(index)) == ref
+        assert store.get(ref.digest) == artifact(index)
+        assert ref.size == 1000
+    assert len(stored_files(store)) == 4
+    assert store.get("0" * 64) is None
+
+def test_invalid_digests_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ArtifactStore(str(tmp_path)).path("../../etc/passwd")
+
+def test_artifacts_expire_after_their_ttl(tmp_path):
+    store = ArtifactStore(str(tmp_path), ttl_seconds=60)
+    for index in range(4):
+        store.put(artifact(index))
+    assert store.cleanup_expired() == 0
+    assert store.cleanup_expired(now=time.time() + 61) == 4
+    assert stored_files(store) == []
+
+def test_quota_evicts_least_recently_stored(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=5000)
+    refs = [store.put(artifact(index)) for index in range(5)]
+    for seconds, ref in zip((50, 10, 40, 30, 20), refs):
+        age(store, ref, seconds)
+    # Storing artifact 0 again makes it the most recently used
+    store.put(artifact(0))
+
+    store.put(artifact(5))
+    # Over the quota: evicted down to 90% of it, oldest first
+    remaining = [ref for ref in refs if store.get(ref.digest) is not None]
+    assert remaining == [refs[0], refs[1], refs[4]]
+    assert sum(path.stat().st_size for path in stored_files(store)) <= 4500
+
+def test_quota_counts_what_is_already_stored(tmp_path):
+    for index in range(4):
+        ArtifactStore(str(tmp_path)).put(artifact(index))
+    reopened = ArtifactStore(str(tmp_path), max_bytes=4500)
+    reopened.put(artifact(4))
+    assert len(stored_files(reopened)) == 4
+
+def test_remove_keeps_artifacts_stored_again_within_the_ttl(tmp_path):
+    store = ArtifactStore(str(tmp_path), ttl_seconds=60)
+    purged, reused = store.put(artifact(1)), store.put(artifact(2))
+    age(store, purged, 120)
+    age(store, reused, 120)
+    # Another job rendered the same image since
+    store.put(artifact(2))
+
+    assert store.remove([purged.digest, reused.digest, "f" * 64]) == 1
+    assert store.get(purged.digest) is None
+    assert store.get(reused.digest) == artifact(2)
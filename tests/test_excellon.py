@@ -0,0 +1,162 @@
+# tests/test_excellon.py
+
+import math
+from typing import Any, Dict, List
+
+import pytest
+
+from gerber.cam import FileSettings
+from gerber.excellon import ExcellonParser, detect_excellon_format, loads
+from tests.support import excellon_candidates, synthetic_excellon
+
+def brute_force_excellon_format(data: str) -> Dict[str, Any]:
+    """
+    `detect_excellon_format` as it was: the file is parsed once for its unit
+    statements and format comments and once more per candidate format.
+    Reference for equivalence and timing.
+    """
+    from gerber.cam import FileSettings
+    from gerber.excellon import ExcellonParser, _layer_size_score
+    from gerber.excellon_statements import CommentStmt, UnitStmt
+
+    p = ExcellonParser()
+    p.parse_raw(data)
+    zero_statements = [stmt.zeros for stmt in p.statements if isinstance(stmt, UnitStmt)]
+    format_comment = [stmt.comment for stmt in p.statements
+                      if isinstance(stmt, CommentStmt) and 'FILE_FORMAT' in stmt.comment]
+    detected_format = (tuple([int(val) for val in format_comment[0].split('=')[1].split(':')])
+                       if len(format_comment) == 1 else None)
+    detected_zeros = zero_statements[0] if len(zero_statements) == 1 else None
+    if detected_format is not None and detected_zeros is not None:
+        return {'format': detected_format, 'zeros': detected_zeros}
+
+    format_options = (detected_format,) if detected_format else ((2, 4), (2, 5), (3, 3))
+    zeros_options = (detected_zeros,) if detected_zeros else ('leading', 'trailing')
+    results = {}
+    for zeros in zeros_options:
+        for fmt in format_options:
+            try:
+                p = ExcellonParser(FileSettings(zeros=zeros, format=fmt))
+                ef = p.parse_raw(data)
+                size = tuple([t[0] - t[1] for t in ef.bounding_box])
+                hole_area = 0.0
+                for hit in p.hits:
+                    hole_area += math.pow(math.pi * hit.tool.diameter / 2., 2)
+                results[(fmt, zeros)] = (size, p.hole_count, hole_area)
+            except Exception:
+                pass
+
+    formats = set(key[0] for key in results)
+    zeros = set(key[1] for key in results)
+    if len(formats) == 1:
+        detected_format = formats.pop()
+    if len(zeros) == 1:
+        detected_zeros = zeros.pop()
+    if detected_format is not None and detected_zeros is not None:
+        return {'format': detected_format, 'zeros': detected_zeros}
+    scores = dict((key, _layer_size_score(*value)) for key, value in results.items())
+    minscore = min(scores.values())
+    for key in scores:
+        if scores[key] == minscore:
+            return {'format': key[0], 'zeros': key[1]}
+
+def hit_primitives(drill_file) -> List[Any]:
+    """`ExcellonFile.primitives` as it was: new objects on every access."""
+    from gerber.excellon import DrillHit
+    from gerber.primitives import Drill, Slot
+
+    units = drill_file.settings.units
+    return [Drill(hit.position, hit.tool.diameter, units=units) if isinstance(hit, DrillHit)
+            else Slot(hit.start, hit.end, hit.tool.diameter, units=units)
+            for hit in drill_file.hits]
+
+def hit_bounding_box(drill_file):
+    """`ExcellonFile.bounding_box` as it was, hit by hit."""
+    xmin = ymin = 100000000000
+    xmax = ymax = -100000000000
+    for hit in drill_file.hits:
+        bbox = hit.bounding_box
+        xmin = min(bbox[0][0], xmin)
+        xmax = max(bbox[0][1], xmax)
+        ymin = min(bbox[1][0], ymin)
+        ymax = max(bbox[1][1], ymax)
+    return ((xmin, xmax), (ymin, ymax))
+
+def hit_path_lengths(drill_file) -> Dict[int, float]:
+    """`ExcellonFile.path_length` as it was, for files without slots."""
+    lengths = {}
+    positions = {}
+    for hit in drill_file.hits:
+        number = hit.tool.number
+        position = positions.get(number, (0, 0))
+        lengths[number] = lengths.get(number, 0.0) + math.hypot(position[0] - hit.position[0],
+                                                                position[1] - hit.position[1])
+        positions[number] = hit.position
+    return lengths
+
+def parser_bounds(parser):
+    """`ExcellonParser.bounds` as it was, statement by statement."""
+    from gerber.excellon_statements import CoordinateStmt
+
+    xmin = ymin = 100000000000
+    xmax = ymax = -100000000000
+    for stmt in parser.statements:
+        if isinstance(stmt, CoordinateStmt):
+            if stmt.x is not None:
+                xmin, xmax = min(stmt.x, xmin), max(stmt.x, xmax)
+            if stmt.y is not None:
+                ymin, ymax = min(stmt.y, ymin), max(stmt.y, ymax)
+    return ((xmin, xmax), (ymin, ymax))
+
+def drill_files():
+    """The format detection corpus, and a larger file with and without its unit statement."""
+    files = excellon_candidates()
+    with_unit = synthetic_excellon(hits=2000)
+    files["synthetic"] = with_unit
+    files["synthetic, no unit statement"] = with_unit.replace("INCH,LZ\n", "")
+    return files
+
+DRILL_FILES = drill_files()
+
+@pytest.mark.parametrize("name", sorted(DRILL_FILES))
+def test_format_detection_matches_brute_force(name):
+    data = DRILL_FILES[name]
+    assert detect_excellon_format(data) == brute_force_excellon_format(data)
+
+@pytest.mark.parametrize("name", sorted(DRILL_FILES))
+def test_drill_table_matches_hit_by_hit_results(name):
+    data = DRILL_FILES[name]
+    parser = ExcellonParser(FileSettings(**detect_excellon_format(data)))
+    drill_file = parser.parse_raw(data)
+
+    expected = [(type(p).__name__, p.bounding_box) for p in hit_primitives(drill_file)]
+    assert [(type(p).__name__, p.bounding_box) for p in drill_file.primitives] == expected
+    assert drill_file.primitives is drill_file.primitives
+    assert drill_file.bounding_box == hit_bounding_box(drill_file)
+    assert drill_file.hit_count() == {tool.number: tool.hit_count for tool in drill_file.tools.values()}
+    assert parser.bounds == parser_bounds(parser)
+    if not drill_file.drill_table.slot.any():
+        lengths = drill_file.path_length()
+        expected_lengths = hit_path_lengths(drill_file)
+        assert sorted(lengths) == sorted(expected_lengths)
+        for number in lengths:
+            assert math.isclose(lengths[number], expected_lengths[number], rel_tol=1e-12)
+
+def test_drill_table_follows_changes():
+    drill_file = loads(DRILL_FILES["synthetic"])
+    primitives = drill_file.primitives
+    drill_file.offset(1, 2)
+    assert drill_file.primitives is not primitives
+    assert [p.bounding_box for p in drill_file.primitives] == [
+        p.bounding_box for p in hit_primitives(drill_file)]
+    assert drill_file.bounding_box == hit_bounding_box(drill_file)
+
+def test_candidates_the_digits_cannot_score_are_parsed(monkeypatch):
+    from gerber import excellon
+
+    def broken(self, format, zeros):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(excellon._DrillDigits, "measure", broken)
+    data = DRILL_FILES["synthetic, no unit statement"]
+    assert detect_excellon_format(data) == brute_force_excellon_format(data)
@@ -0,0 +1,72 @@
+# tests/test_image_cache_service.py
+
+import os
+from pathlib import Path
+
+import pytest
+
+from app.services.image_cache_service import ImageCacheService
+
+IMAGE = os.urandom(100 * 1024)
+
+def board(index):
+    return b"board %d" % index
+
+def entry_files(directory):
+    return [path for path in Path(directory).rglob("*")
+            if path.is_file() and path.parent != Path(directory)]
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ImageCacheService(str(tmp_path), max_bytes=900 * 1024, memory_bytes=300 * 1024)
+    for index in range(4):
+        cache.cache_images(board(index), "green", "FR-4", IMAGE, IMAGE[::-1])
+    return cache
+
+def test_cached_images_are_read_back_intact(cache):
+    assert cache.get_cached_images(board(0), "green", "FR-4") == (IMAGE, IMAGE[::-1])
+    assert cache.get_cached_images(board(0), "blue", "FR-4") is None
+
+def test_quota_evicts_the_least_recently_used_entry(cache, tmp_path):
+    # board 0 becomes the most recently used, so board 1 goes first
+    cache.get_cached_images(board(0), "green", "FR-4")
+    for index in range(4, 6):
+        cache.cache_images(board(index), "green", "FR-4", IMAGE, IMAGE)
+
+    stats = cache.get_cache_stats()
+    assert stats["total_entries"] == 4
+    assert stats["total_size_mb"] <= 1
+    assert stats["memory_entries"] == 1
+    assert cache.get_cached_images(board(1), "green", "FR-4") is None
+    assert cache.get_cached_images(board(0), "green", "FR-4") is not None
+
+    files = entry_files(tmp_path)
+    assert len(files) == 4
+    assert not any(path.name.startswith(".tmp-") for path in files)
+
+def test_entries_survive_a_restart_and_expire(cache, tmp_path):
+    reopened = ImageCacheService(str(tmp_path), max_bytes=900 * 1024)
+    assert reopened.get_cached_images(board(0), "green", "FR-4") == (IMAGE, IMAGE[::-1])
+
+    reopened.cache_expiry_hours = 0
+    assert reopened.cleanup_expired_cache() == 4
+    assert reopened.get_cache_stats()["total_entries"] == 0
+    assert entry_files(tmp_path) == []
+
+def test_only_old_layout_entries_are_removed(tmp_path):
+    def make(name, *files):
+        directory = tmp_path / name
+        directory.mkdir()
+        for file in files:
+            (directory / file).write_bytes(IMAGE)
+        return directory
+
+    legacy = make("0123456789abcdef_green_FR-4", "pcb_top.png", "pcb_bottom.png")
+    kept = [
+        make("0123456789abcdef_green_FR-4_notes", "pcb_top.png", "notes.txt"),
+        make("renders_of_boards", "pcb_top.png"),
+        make("0123456789abcdef_green_FR-4_empty"),
+    ]
+    ImageCacheService(str(tmp_path))
+    assert not legacy.exists()
+    assert all(directory.exists() for directory in kept)
@@ -0,0 +1,74 @@
+# tests/test_image_encoding.py
+
+import io
+from typing import Dict
+
+import numpy as np
+import pytest
+from PIL import Image, features
+
+from app.utils.image_encoding import argb32_to_rgba, encode_sizes
+
+def synthetic_render(width: int = 1024, height: int = 600, seed: int = 1) -> np.ndarray:
+    """A composited render in cairo's premultiplied ARGB32 layout: antialiased pads and traces on a transparent background."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    coverage = np.zeros((height, width), dtype=np.float32)
+    for cx, cy, radius in zip(rng.uniform(0, width, 400), rng.uniform(0, height, 400), rng.uniform(2, 12, 400)):
+        coverage = np.maximum(coverage, np.clip(radius - np.hypot(x - cx, y - cy), 0, 1))
+    for row in rng.integers(0, height, 60):
+        coverage[row:row + 3] = np.maximum(coverage[row:row + 3], 0.85)
+    alpha = np.round(coverage * 255).astype(np.uint32)
+    color = np.array([0x33, 0xa0, 0x55], dtype=np.uint32)
+    pixels = (alpha[..., None] * color + 127) // 255
+    argb = (alpha << 24) | (pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]
+    return argb.astype(np.uint32).view(np.uint8).reshape(height, width, 4)
+
+def png_round_trip_artifacts(pixels: np.ndarray, width: int, height: int, encodings) -> Dict[int, bytes]:
+    """Artifacts as they were made before: a PNG of the render, decoded again and thumbnailed for each smaller size."""
+    buffer = io.BytesIO()
+    Image.fromarray(argb32_to_rgba(pixels, width, height), 'RGBA').save(buffer, format='PNG')
+    full = buffer.getvalue()
+    encoded = {}
+    for size, (image_format, options) in encodings.items():
+        if width <= size and height <= size:
+            encoded[size] = full
+            continue
+        image = Image.open(io.BytesIO(full))
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, **options)
+        encoded[size] = buffer.getvalue()
+    return encoded
+
+WIDTH, HEIGHT = 512, 300
+
+@pytest.fixture(scope="module")
+def pixels():
+    return synthetic_render(WIDTH, HEIGHT)
+
+def decode(data):
+    return np.asarray(Image.open(io.BytesIO(data)))
+
+def test_artifacts_match_the_png_round_trip(pixels):
+    lossless = {256: ('PNG', {}), 1024: ('PNG', {})}
+    direct = encode_sizes(pixels, WIDTH, HEIGHT, lossless)
+    round_trip = png_round_trip_artifacts(pixels, WIDTH, HEIGHT, lossless)
+    for size in lossless:
+        a, b = decode(direct[size]), decode(round_trip[size])
+        assert a.shape == b.shape, size
+        assert (a == b).all(), size
+    assert decode(direct[256]).shape[:2] == (150, 256)
+
+def test_padded_rows_are_skipped(pixels):
+    stride = WIDTH * 4 + 64
+    padded = np.zeros((HEIGHT, stride), dtype=np.uint8)
+    padded[:, :WIDTH * 4] = pixels.reshape(HEIGHT, WIDTH * 4)
+    assert (argb32_to_rgba(padded.tobytes(), WIDTH, HEIGHT, stride) ==
+            argb32_to_rgba(pixels, WIDTH, HEIGHT)).all()
+
+@pytest.mark.skipif(not features.check("webp"), reason="Pillow is built without WebP")
+def test_webp_thumbnails_are_encoded_at_their_size(pixels):
+    encoded = encode_sizes(pixels, WIDTH, HEIGHT, {256: ('WEBP', {'quality': 85, 'method': 4})})
+    assert encoded[256][:4] == b'RIFF'
+    assert Image.open(io.BytesIO(encoded[256])).size == (256, 150)
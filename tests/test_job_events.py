@@ -0,0 +1,138 @@
+# tests/test_job_events.py
+
+import asyncio
+
+from app.services.job_events import JobEventBus
+from app.services.job_store import MemoryJobStore
+
+async def versions(events):
+    return [event if event is None else event["version"] async for event in events]
+
+def test_subscribers_get_each_version_once_and_in_order():
+    store = MemoryJobStore()
+
+    async def run():
+        bus = JobEventBus(history=4, retention_seconds=0.05)
+        job_id = store.enqueue("test", {})
+        bus.publish(job_id, store.get(job_id))
+        followers = [asyncio.create_task(versions(bus.subscribe(job_id, heartbeat_interval=0.05)))
+                     for _ in range(3)]
+        await asyncio.sleep(0.08)
+        job = store.claim("w", 30)
+        for status in ("parsing", "rendering", "uploading"):
+            store.update(job.id, "w", status)
+            bus.publish(job_id, store.get(job_id))
+            # Duplicates and stale views are ignored
+            assert not bus.publish(job_id, store.get(job_id))
+            assert not bus.publish(job_id, {"status": "queued", "version": 1})
+        store.complete(job.id, "w", {})
+        bus.publish(job_id, store.get(job_id))
+
+        for events in await asyncio.gather(*followers):
+            assert [event for event in events if event is not None] == [1, 2, 3, 4, 5]
+            # Heartbeats while nothing was published
+            assert None in events
+
+        # History keeps the last 4 events; resuming replays only what was missed
+        assert await versions(bus.subscribe(job_id, 3)) == [4, 5]
+        # A client that has the final event gets nothing more
+        assert await versions(bus.subscribe(job_id, 5)) == []
+
+        await asyncio.sleep(0.1)
+        assert bus.subscriber_count() == 0
+        assert not bus._channels
+
+    asyncio.run(run())
+
+def test_follow_polls_the_store_without_a_transport():
+    """Changes the bus never hears of arrive within the poll interval, not at the heartbeat."""
+    store = MemoryJobStore()
+    job_id = store.enqueue("test", {})
+    loads = []
+
+    async def load():
+        loads.append(store.get(job_id))
+        return loads[-1]
+
+    async def read_since(count):
+        while len(loads) <= count:
+            await asyncio.sleep(0.01)
+
+    async def run():
+        bus = JobEventBus()
+        bus.publish(job_id, store.get(job_id))
+        follower = asyncio.create_task(versions(bus.follow(job_id, load, heartbeat_interval=30, poll_interval=0.02)))
+        await read_since(0)
+        job = store.claim("w", 30)
+        store.update(job.id, "w", "rendering")
+        # Change the job again only once the poller has read this change
+        await read_since(len(loads))
+        store.complete(job.id, "w", {})
+        return await asyncio.wait_for(follower, 5)
+
+    assert asyncio.run(run()) == [1, 2, 3]
+
+def test_follow_ends_when_the_job_is_gone():
+    async def load():
+        return None
+
+    async def run():
+        bus = JobEventBus()
+        bus.publish("job", {"status": "queued", "version": 1})
+        events = await asyncio.wait_for(versions(bus.follow("job", load, heartbeat_interval=30, poll_interval=0.02)), 1)
+        return events, bus.subscriber_count()
+
+    assert asyncio.run(run()) == ([1], 0)
+
+def test_follow_polls_only_at_heartbeats_with_a_transport():
+    store = MemoryJobStore()
+    job_id = store.enqueue("test", {})
+    loads = []
+
+    async def load():
+        loads.append(store.get(job_id))
+        if len(loads) == 2:
+            # The job finishes at the second read, ending the stream
+            job = store.claim("w", 30)
+            store.complete(job.id, "w", {})
+        return store.get(job_id)
+
+    class Transport:
+        def send(self, job_id, event):
+            pass
+
+    async def run():
+        bus = JobEventBus(transport=Transport())
+        events = bus.follow(job_id, load, heartbeat_interval=0.1, poll_interval=0.01)
+        return await asyncio.wait_for(versions(events), 5)
+
+    events = asyncio.run(run())
+    # Polling every poll_interval would have read twice before the first heartbeat
+    assert [event for event in events if event is not None] == [1, 2]
+    assert None in events
+
+def test_followers_of_a_job_share_one_store_read():
+    reads_per_run = 5
+    loads = []
+
+    async def load():
+        # Counts reads rather than time: the job finishes at the fifth read
+        loads.append(None)
+        if len(loads) == reads_per_run:
+            return {"status": "completed", "version": 2}
+        return {"status": "queued", "version": 1}
+
+    async def follow(subscribers):
+        loads.clear()
+        bus = JobEventBus()
+        bus.publish("job", {"status": "queued", "version": 1})
+        followers = [versions(bus.follow("job", load, heartbeat_interval=30, poll_interval=0.01))
+                     for _ in range(subscribers)]
+        streams = await asyncio.wait_for(asyncio.gather(*followers), 30)
+        assert bus.subscriber_count() == 0
+        assert all(stream == [1, 2] for stream in streams)
+        return len(loads)
+
+    for subscribers in (1, 1000):
+        # One read per idle interval, whatever the number of followers
+        assert asyncio.run(follow(subscribers)) == reads_per_run, subscribers
@@ -0,0 +1,159 @@
+# tests/test_job_store.py
+
+import multiprocessing
+import os
+import time
+from typing import Dict, List
+
+import pytest
+
+from app.services.job_store import COMPLETED, FAILED, QUEUED, JobStoreConfig, MemoryJobStore, SQLiteJobStore
+
+def _claim_until_empty(path: str, worker_id: str, results):
+    """Worker process: claim and complete jobs until none are left."""
+    store = SQLiteJobStore(path)
+    claimed = []
+    while True:
+        job = store.claim(worker_id, lease_seconds=30)
+        if job is None:
+            break
+        claimed.append(job.id)
+        store.complete(job.id, worker_id, {"worker": worker_id})
+    results.put((worker_id, claimed))
+
+def claim_and_crash(path: str, worker_id: str):
+    """Worker process: claim one job and die without completing it."""
+    store = SQLiteJobStore(path)
+    store.claim(worker_id, lease_seconds=0.5)
+    os._exit(1)
+
+def run_claimers(path: str, processes: int) -> Dict[str, List[str]]:
+    """Drain the job store at `path` with `processes` worker processes; returns the jobs each claimed."""
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    workers = [context.Process(target=_claim_until_empty, args=(path, f"w{index}", results))
+               for index in range(processes)]
+    for worker in workers:
+        worker.start()
+    claimed = dict(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    return claimed
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store_factory(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore
+    return lambda config=None: SQLiteJobStore(str(tmp_path / "jobs.db"), config)
+
+def crash_holding_job(path, worker_id):
+    """Claim a job in another process that dies without completing it."""
+    crashed = multiprocessing.get_context().Process(target=claim_and_crash, args=(path, worker_id))
+    crashed.start()
+    crashed.join()
+
+def test_concurrent_claimers_claim_each_job_once(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    ids = [store.enqueue("test", {"n": index}) for index in range(400)]
+
+    claimed = run_claimers(path, 4)
+    assert sorted(job_id for worker_claims in claimed.values() for job_id in worker_claims) == sorted(ids)
+    assert all(store.get(job_id)["status"] == COMPLETED for job_id in ids)
+    assert store.stats()[COMPLETED] == len(ids)
+
+def test_crashed_jobs_fail_after_their_last_attempt(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path, JobStoreConfig(max_attempts=2))
+    job_id = store.enqueue("test", {})
+
+    for attempt in (1, 2):
+        crash_holding_job(path, f"crash{attempt}")
+        assert store.get(job_id)["status"] == QUEUED
+        # Not reclaimed before its lease expires
+        assert store.claim("other", lease_seconds=30) is None
+        time.sleep(0.6)
+
+    # Both allowed attempts were lost to crashes: the job fails instead of looping
+    assert store.claim("other", lease_seconds=30) is None
+    view = store.get(job_id)
+    assert view["status"] == FAILED
+    assert "Worker lost" in view["error"]
+
+def test_crashed_job_is_reclaimed(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path, JobStoreConfig(max_attempts=2))
+    job_id = store.enqueue("test", {})
+
+    crash_holding_job(path, "crash")
+    time.sleep(0.6)
+    job = store.claim("survivor", lease_seconds=30)
+    assert (job.id, job.attempts) == (job_id, 2)
+    # The stale worker no longer holds the job; the lease holder does
+    assert not store.complete(job_id, "crash", {})
+    assert store.complete(job_id, "survivor", {"ok": True})
+    assert store.get(job_id)["manifest"] == {"ok": True}
+
+def test_retries_back_off(store_factory):
+    store = store_factory(JobStoreConfig(max_attempts=3, retry_backoff_seconds=0.2))
+    job_id = store.enqueue("test", {})
+    for attempt, delay in ((1, 0.2), (2, 0.4)):
+        job = store.claim("w", 30)
+        assert job.attempts == attempt
+        if attempt == 1:
+            store.update(job_id, "w", "preview", 40, {"sides": {}})
+            assert store.get(job_id)["preview"] == {"sides": {}}
+            assert store.get(job_id)["manifest"] is None
+        store.fail(job_id, "w", "boom")
+        view = store.get(job_id)
+        assert (view["status"], view["error"]) == (QUEUED, None)
+        assert store.claim("w", 30) is None
+        time.sleep(delay + 0.05)
+
+    store.claim("w", 30)
+    store.fail(job_id, "w", "boom")
+    assert store.get(job_id) == {"status": FAILED, "progress": 0, "error": "boom", "manifest": None,
+                                 "preview": None, "version": 5}
+
+def test_released_jobs_keep_their_attempt(store_factory):
+    store = store_factory(JobStoreConfig(max_attempts=1))
+    job_id = store.enqueue("test", {})
+    store.claim("w", 30)
+    assert store.release(job_id, "w", 0.2)
+    assert store.get(job_id)["status"] == QUEUED
+    assert not store.release(job_id, "w", 0)
+    assert store.claim("w", 30) is None
+    time.sleep(0.25)
+    assert store.claim("w", 30).attempts == 1
+
+def test_permanent_failures_are_not_retried(store_factory):
+    store = store_factory(JobStoreConfig(max_attempts=3))
+    job_id = store.enqueue("test", {})
+    store.claim("w", 30)
+    store.fail(job_id, "w", "bad input", retry=False)
+    assert store.get(job_id)["status"] == FAILED
+
+def test_finished_jobs_are_purged_after_their_ttl(store_factory):
+    store = store_factory(JobStoreConfig(ttl_seconds=60))
+    finished = store.enqueue("test", {})
+    store.claim("w", 30)
+    store.complete(finished, "w", {})
+    running = store.enqueue("test", {})
+
+    assert store.purge(now=time.time() + 30) == 0
+    assert store.purge(now=time.time() + 61) == 1
+    assert store.get(finished) is None
+    assert store.get(running) is not None
+
+def test_purge_returns_the_results_of_purged_jobs(store_factory):
+    store = store_factory(JobStoreConfig(ttl_seconds=60))
+    completed = store.enqueue("test", {})
+    store.claim("w", 30)
+    store.complete(completed, "w", {"artifacts": {"top.base.256": {"sha256": "a" * 64}}})
+    failed = store.enqueue("test", {})
+    store.claim("w", 30)
+    store.fail(failed, "w", "bad input", retry=False)
+
+    assert store.purge_results(now=time.time() + 30) == []
+    assert store.purge_results(now=time.time() + 61) == [
+        {"artifacts": {"top.base.256": {"sha256": "a" * 64}}}, None]
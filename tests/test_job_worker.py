@@ -0,0 +1,88 @@
+# tests/test_job_worker.py
+
+import asyncio
+import time
+
+from app.services.job_store import COMPLETED, FAILED, JobStoreConfig, MemoryJobStore
+from app.services.job_worker import JobWorker, PermanentJobError
+from app.services.render_executor import RenderQueueFull
+
+def test_worker_completes_retries_and_fails_jobs():
+    store = MemoryJobStore(JobStoreConfig(max_attempts=2, retry_backoff_seconds=0.05))
+    calls = {}
+    previews = {}
+
+    async def handler(job, report):
+        mode = job.args["mode"]
+        calls[mode] = calls.get(mode, 0) + 1
+        await report("working", 50, {"preview": mode})
+        previews[mode] = store.get(job.id)
+        if mode == "flaky" and job.attempts == 1:
+            raise RuntimeError("transient")
+        if mode == "invalid":
+            raise PermanentJobError("bad upload")
+        return {"mode": mode}
+
+    ids = {mode: store.enqueue("test", {"mode": mode}) for mode in ("ok", "flaky", "invalid")}
+
+    async def run():
+        worker = JobWorker(store, {"test": handler}, concurrency=2, lease_seconds=5, poll_interval=0.02)
+        task = asyncio.create_task(worker.run())
+        deadline = time.time() + 5
+        while time.time() < deadline and any(store.get(job_id)["status"] not in (COMPLETED, FAILED)
+                                             for job_id in ids.values()):
+            await asyncio.sleep(0.02)
+        worker.stop()
+        await task
+
+    asyncio.run(run())
+    expected = {"ok": (COMPLETED, 1), "flaky": (COMPLETED, 2), "invalid": (FAILED, 1)}
+    for mode, (status, attempts) in expected.items():
+        assert (store.get(ids[mode])["status"], calls[mode]) == (status, attempts), mode
+        # Previews are published while the job runs and dropped once it finishes
+        assert previews[mode]["preview"] == {"preview": mode}
+        assert previews[mode]["manifest"] is None
+        assert store.get(ids[mode])["preview"] is None
+
+def test_worker_passes_purged_results_to_its_purge_hook():
+    store = MemoryJobStore(JobStoreConfig(ttl_seconds=0))
+    job_id = store.enqueue("test", {})
+    store.claim("w", 30)
+    store.complete(job_id, "w", {"artifacts": {}})
+    purged = []
+
+    async def run():
+        worker = JobWorker(store, {}, poll_interval=0.02, on_purge=purged.append)
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.05)
+        worker.stop()
+        await task
+
+    asyncio.run(run())
+    assert purged == [[{"artifacts": {}}]]
+    assert store.get(job_id) is None
+
+def test_a_full_render_pool_defers_jobs_without_using_attempts():
+    store = MemoryJobStore(JobStoreConfig(max_attempts=2))
+    job_id = store.enqueue("test", {})
+    calls = []
+
+    async def handler(job, report):
+        calls.append(job.attempts)
+        if len(calls) <= 3:
+            raise RenderQueueFull("busy")
+        return {"ok": True}
+
+    async def run():
+        worker = JobWorker(store, {"test": handler}, poll_interval=0.02, busy_retry_seconds=0.02)
+        task = asyncio.create_task(worker.run())
+        deadline = time.time() + 5
+        while time.time() < deadline and store.get(job_id)["status"] != COMPLETED:
+            await asyncio.sleep(0.02)
+        worker.stop()
+        await task
+
+    asyncio.run(run())
+    # More rejections than attempts, yet every claim was the first attempt
+    assert calls == [1, 1, 1, 1]
+    assert store.get(job_id)["manifest"] == {"ok": True}
@@ -0,0 +1,37 @@
+# tests/test_operations.py
+
+import copy
+
+import pytest
+
+from gerber import operations
+from gerber.excellon import loads as loads_excellon
+from gerber.rs274x import loads as loads_gerber
+from tests.support import synthetic_excellon, synthetic_gerber
+
+STEPS = (
+    ("to_metric", operations.to_metric),
+    ("offset", lambda f: operations.offset(f, 12.5, -3.25)),
+    ("to_inch", operations.to_inch),
+    ("offset", lambda f: operations.offset(f, -0.1, 0.7)),
+)
+
+def recomputed(cam_file, attribute):
+    """Value of a memoized bounds attribute, calculated from scratch."""
+    fresh = copy.deepcopy(cam_file)
+    fresh._changed()
+    return getattr(fresh, attribute)
+
+@pytest.mark.parametrize("load", [
+    lambda: loads_gerber(synthetic_gerber(traces=2000, pads=2000, apertures=(11, 12, 13, 14, 15, 16))),
+    lambda: loads_excellon(synthetic_excellon(hits=900)),
+], ids=["gerber", "excellon"])
+def test_memoized_bounds_follow_operations(load):
+    """Memoized bounds agree with recalculated ones after parsing and after each operation."""
+    cam_file = load()
+    for step, operation in (("parsed", lambda f: f),) + STEPS:
+        cam_file = operation(cam_file)
+        for attribute in ("bounds", "bounding_box"):
+            # Read twice so the second read comes from the cache
+            getattr(cam_file, attribute)
+            assert getattr(cam_file, attribute) == recomputed(cam_file, attribute), step
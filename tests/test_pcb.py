@@ -0,0 +1,108 @@
+# tests/test_pcb.py
+
+import io
+import multiprocessing
+import os
+import zipfile
+
+import pytest
+
+from gerber import pcb
+from gerber.exceptions import ArchiveError, ParseError
+from gerber.pcb import PCB
+from tests.support import board_archive, from_extracted, layer_summary, synthetic_gerber, write_board
+
+def skip_ipc(name):
+    return None if name.endswith(".ipc") else name
+
+def zip_of(**members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def _square(value):
+    return value * value
+
+def _reject(value):
+    raise ParseError("bad layer {}".format(value))
+
+def _fail_in_child(parent):
+    assert os.getpid() == parent, "parser assertion"
+    return parent
+
+def _parse_pids(workers):
+    return os.getpid(), pcb._map_layers(os.getpid, [()] * workers, workers)
+
+def test_parallel_directory_parse_matches_serial(tmp_path):
+    write_board(str(tmp_path), 4, pads=500, traces=500)
+    serial = PCB.from_directory(str(tmp_path))
+    parallel = PCB.from_directory(str(tmp_path), workers=2)
+    assert len(serial.layers) == 10
+    assert layer_summary(parallel) == layer_summary(serial)
+
+def test_map_layers_keeps_order():
+    assert pcb._map_layers(_square, [(value,) for value in range(8)], workers=3) == \
+        [value * value for value in range(8)]
+
+def test_map_layers_falls_back_when_the_pool_cannot_start(monkeypatch):
+    def no_pool(max_workers):
+        raise OSError("no semaphores")
+
+    monkeypatch.setattr(pcb, "ProcessPoolExecutor", no_pool)
+    assert pcb._map_layers(_square, [(2,), (3,)], workers=2) == [4, 9]
+
+def test_map_layers_raises_errors_from_the_function():
+    with pytest.raises(ParseError):
+        pcb._map_layers(_reject, [(1,), (2,)], workers=2)
+
+def test_map_layers_raises_assertions_from_the_function():
+    # A serial fallback would run it in this process, where it passes
+    with pytest.raises(AssertionError, match="parser assertion"):
+        pcb._map_layers(_fail_in_child, [(os.getpid(),)] * 2, workers=2)
+
+def test_map_layers_parses_serially_in_a_daemon_process():
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        parent, pids = pool.apply(_parse_pids, (2,))
+    assert pids == [parent, parent]
+
+def test_archive_parse_matches_extracted_parse():
+    data = board_archive(2)
+    extracted = from_extracted(data)
+    in_memory = PCB.from_archive(data, rename=skip_ipc)
+    assert in_memory.name == extracted.name
+    assert layer_summary(in_memory) == layer_summary(extracted)
+
+@pytest.mark.parametrize("limits", [dict(max_members=5), dict(max_size=1000)])
+def test_archive_limits(limits):
+    with pytest.raises(ArchiveError):
+        PCB.from_archive(board_archive(2), rename=skip_ipc, **limits)
+
+def test_archive_member_with_understated_size():
+    packed = bytearray(zip_of(**{"board.gtl": synthetic_gerber(traces=100, pads=100)}))
+    central = packed.rfind(b"PK\x01\x02")
+    packed[central + 24:central + 28] = (10).to_bytes(4, "little")
+    with pytest.raises(ArchiveError):
+        PCB.from_archive(bytes(packed), max_size=100)
+
+def test_archive_rename_decides_the_layer_class():
+    data = zip_of(**{"Board Top Copper.gbr": synthetic_gerber(traces=10, pads=10)})
+    renamed = PCB.from_archive(data, rename=lambda name: name[:-4] + ".gtl" if "top copper" in name.lower() else name)
+    assert [layer.layer_class for layer in renamed.layers] == ["top"]
+
+def test_archive_skips_a_root_without_layer_files():
+    layer = synthetic_gerber(traces=10, pads=10)
+    data = zip_of(**{"README.md": "# Board", "gerbers/board.GTL": layer, "gerbers/board.GBL": layer})
+    folder, candidates = pcb._board_members(zipfile.ZipFile(io.BytesIO(data)).infolist())
+    assert folder == "gerbers"
+    assert sorted(entry[1] for entry in candidates) == ["board.GBL", "board.GTL"]
+    board = PCB.from_archive(data)
+    assert sorted(layer.layer_class for layer in board.layers) == ["bottom", "top"]
+
+def test_archive_root_with_layer_files_is_kept():
+    layer = synthetic_gerber(traces=10, pads=10)
+    data = zip_of(**{"board.gtl": layer, "README.md": "# Board", "old/board.gtl": layer})
+    folder, candidates = pcb._board_members(zipfile.ZipFile(io.BytesIO(data)).infolist())
+    assert folder == ""
+    assert sorted(entry[1] for entry in candidates) == ["README.md", "board.gtl"]
@@ -0,0 +1,106 @@
+# tests/test_pcb_cache.py
+
+import os
+
+import pytest
+
+from gerber.pcb import PCB
+from app.services.pcb_cache import ParsedBoardCache
+from tests.support import board_archive, layer_summary
+
+def skip_ipc(name):
+    return None if name.endswith(".ipc") else name
+
+@pytest.fixture(scope="module")
+def archive():
+    return board_archive(2)
+
+def load(data):
+    return lambda: PCB.from_archive(data, rename=skip_ipc)
+
+def test_boards_read_from_disk_match_a_fresh_parse(archive, tmp_path):
+    fresh = load(archive)()
+    cache = ParsedBoardCache(str(tmp_path), memory_entries=1)
+    assert cache.get(cache.key(archive)) is None
+    cache.put(cache.key(archive), load(archive)(), wait=True)
+    cache.clear_memory()
+
+    from_disk = cache.get_or_load(archive, lambda: None)
+    assert layer_summary(from_disk) == layer_summary(fresh)
+    assert from_disk.board_bounds == fresh.board_bounds
+    # Kept in the memory tier from then on
+    assert cache.get_or_load(archive, lambda: None) is from_disk
+    stats = cache.stats()
+    assert (stats["miss"], stats["disk_hit"], stats["memory_hit"]) == (1, 1, 1)
+
+def test_load_options_are_part_of_the_key(archive, tmp_path):
+    cache = ParsedBoardCache(str(tmp_path))
+    cache.put(cache.key(archive), load(archive)(), wait=True)
+    assert cache.get(cache.key(archive, "other options")) is None
+
+def test_parser_version_change_invalidates_the_disk_tier(archive, tmp_path):
+    cache = ParsedBoardCache(str(tmp_path))
+    cache.put(cache.key(archive), load(archive)(), wait=True)
+
+    upgraded = ParsedBoardCache(str(tmp_path), version="upgraded")
+    assert upgraded.get(cache.key(archive)) is None
+    assert not any(upgraded.directory.glob("*/*.pcb"))
+
+def test_tampered_entries_are_not_unpickled(archive, tmp_path):
+    cache = ParsedBoardCache(str(tmp_path))
+    key = cache.key(archive)
+    cache.put(key, load(archive)(), wait=True)
+    path = next(cache.directory.glob("*/*.pcb"))
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    cache.clear_memory()
+    assert cache.get(key) is None
+    assert not path.exists()
+
+def test_entries_signed_with_another_key_are_refused(archive, tmp_path):
+    cache = ParsedBoardCache(str(tmp_path), secret=b"one")
+    cache.put(cache.key(archive), load(archive)(), wait=True)
+    assert ParsedBoardCache(str(tmp_path), secret=b"other").get(cache.key(archive)) is None
+
+def test_new_directories_are_private(tmp_path):
+    cache = ParsedBoardCache(str(tmp_path / "cache"))
+    assert cache.directory.stat().st_mode & 0o777 == 0o700
+    assert (cache.directory / ".key").stat().st_mode & 0o777 == 0o600
+
+@pytest.mark.parametrize("mode", [0o770, 0o777])
+def test_shared_directories_are_refused(tmp_path, mode):
+    directory = tmp_path / "cache"
+    directory.mkdir()
+    directory.chmod(mode)
+    cache = ParsedBoardCache(str(directory))
+    assert cache.directory is None
+    assert not any(directory.iterdir())
+
+def test_directories_owned_by_another_user_are_refused(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "getuid", lambda: tmp_path.stat().st_uid + 1)
+    assert ParsedBoardCache(str(tmp_path)).directory is None
+
+def test_boards_are_pickled_before_put_returns(archive, tmp_path, monkeypatch):
+    from app.services import pcb_cache
+
+    writes = []
+
+    class Deferred:
+        def __init__(self, target, args, **kwargs):
+            writes.append((target, args))
+
+        def start(self):
+            pass
+
+    monkeypatch.setattr(pcb_cache.threading, "Thread", Deferred)
+    cache = ParsedBoardCache(str(tmp_path))
+    board = load(archive)()
+    expected = layer_summary(board)
+    cache.put(cache.key(archive), board)
+    # Rendering goes on with the board while the write is pending
+    board.layers.clear()
+    for target, args in writes:
+        target(*args)
+    cache.clear_memory()
+    assert layer_summary(cache.get(cache.key(archive))) == expected
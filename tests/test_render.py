@@ -0,0 +1,155 @@
+# tests/test_render.py
+
+import io
+
+import pytest
+from PIL import Image
+
+from gerber.layers import load_layer_data
+from gerber.pcb import PCB
+from tests.support import (GERBER_HEADER, QUOTE_THEMES, board_archive, cairo_available,
+                           compare_png, synthetic_layer)
+
+requires_cairo = pytest.mark.skipif(not cairo_available(), reason="libcairo is not available")
+
+def skip_ipc(name):
+    return None if name.endswith(".ipc") else name
+
+@pytest.fixture(scope="module")
+def board():
+    return PCB.from_archive(board_archive(2), rename=skip_ipc)
+
+def render_layers(layers, board_theme, max_width=1024, lod=0.0):
+    from gerber.render.cairo_backend import GerberCairoContext
+
+    ctx = GerberCairoContext(raster=True, lod=lod)
+    ctx.render_layers(layers, filename=None, theme=board_theme, max_width=max_width)
+    return ctx.dump_str()
+
+def assert_same_image(rendered, composited):
+    parity = compare_png(rendered, composited, tolerance=0)
+    assert parity["same_size"]
+    assert parity["max_diff"] == 0, parity
+
+@requires_cairo
+@pytest.mark.parametrize("side", ["top", "bottom"])
+def test_composited_themes_match_render_layers(board, side):
+    from gerber.render import theme
+    from gerber.render.composite import LayerMasks
+
+    # Bottom side themes mirror every layer; mask layers are inverted
+    layers = board.top_layers if side == "top" else board.bottom_layers
+    masks = LayerMasks(layers, max_width=1024)
+    for name in QUOTE_THEMES:
+        board_theme = theme.THEMES[name]
+        assert_same_image(render_layers(layers, board_theme), masks.dump(board_theme))
+
+@requires_cairo
+def test_composited_mirrored_and_inverted_layers_match_render_layers(board):
+    from gerber.render import theme
+    from gerber.render.composite import LayerMasks
+    from gerber.render.render import RenderSettings
+
+    layers = board.top_layers
+    masks = LayerMasks(layers, max_width=1024)
+    colors = theme.COLORS
+    themes = [
+        theme.Theme(top=RenderSettings(colors['hasl copper'], mirror=True),
+                    topsilk=RenderSettings(colors['white'], invert=True),
+                    topmask=RenderSettings(colors['green soldermask'], alpha=0.85, mirror=True)),
+        theme.Theme(top=RenderSettings(colors['enig copper'], alpha=0.6, mirror=True, invert=True),
+                    topsilk=RenderSettings(colors['black'], mirror=True, invert=True),
+                    drill=RenderSettings(colors['black'], mirror=True)),
+    ]
+    for board_theme in themes:
+        assert_same_image(render_layers(layers, board_theme), masks.dump(board_theme))
+
+@requires_cairo
+@pytest.mark.parametrize("side", ["top", "bottom"])
+def test_level_of_detail_renders_stay_close_to_exact_renders(board, side):
+    from gerber.render.theme import THEMES
+
+    layers = board.top_layers if side == "top" else board.bottom_layers
+    for max_width in (256, 1024):
+        exact = render_layers(layers, THEMES["default"], max_width, lod=0.0)
+        detailed = render_layers(layers, THEMES["default"], max_width, lod=1.0)
+        # Merged dots and flattened curves only move antialiased edge pixels
+        parity = compare_png(exact, detailed, tolerance=32)
+        assert parity["same_size"]
+        assert parity["mismatch_ratio"] < 0.01, parity
+        assert parity["mean_diff"] < 1.0, parity
+
+@requires_cairo
+def test_quote_generator_renders_match_with_and_without_composite(monkeypatch):
+    from app.core.config import settings
+    from app.schemas.pcb import ManufacturingParameters
+    from app.services import quote_generator
+
+    generator = quote_generator.QuoteGenerator(board_archive(2), "board.zip",
+                                               ManufacturingParameters(quantity=10))
+    generator._load_pcb()
+    images = {}
+    for composite in (False, True):
+        monkeypatch.setattr(settings, "RENDER_COMPOSITE", composite)
+        images[composite] = {side: generator._render_base_and_mask_layers(side)
+                             for side in ("top", "bottom")}
+    for side in ("top", "bottom"):
+        for rendered, composited in zip(images[False][side], images[True][side]):
+            assert_same_image(rendered, composited)
+
+@requires_cairo
+def test_previews_fit_the_preview_size():
+    from app.schemas.pcb import ManufacturingParameters
+    from app.services import quote_generator
+
+    generator = quote_generator.QuoteGenerator(board_archive(2), "board.zip",
+                                               ManufacturingParameters(quantity=10))
+    generator._load_pcb()
+    previews = generator.generate_preview_artifacts("0" * 32)
+    assert sorted(previews) == ["bottom.base.preview", "bottom.mask.preview",
+                                "top.base.preview", "top.mask.preview"]
+    for artifact in previews.values():
+        image = Image.open(io.BytesIO(artifact["data"]))
+        assert max(image.size) <= generator.PREVIEW_SIZE
+
+@requires_cairo
+@pytest.mark.parametrize("tiles", [2, 3, 8])
+def test_tiled_renders_match_a_single_surface(tiles):
+    from gerber.render.cairo_backend import GerberCairoContext
+    from gerber.render.render import RenderSettings
+    from gerber.render.theme import THEMES, Theme
+
+    copper = synthetic_layer(traces=5000, pads=5000, clear_every=50)
+    mask = synthetic_layer("bench.gts", traces=0, pads=5000)
+    mask.layer_class = "topmask"
+    cases = (([copper], THEMES["default"]),
+             ([mask], Theme(topmask=RenderSettings((0.1, 0.5, 0.2), alpha=0.8, mirror=True, invert=True))))
+    for layers, layer_theme in cases:
+        images = []
+        for count in (1, tiles):
+            ctx = GerberCairoContext(raster=True, tiles=count)
+            ctx.render_layers(layers, filename=None, theme=layer_theme, max_width=2048, max_height=2048)
+            images.append(ctx.dump_str())
+        assert_same_image(*images)
+
+@requires_cairo
+def test_stamps_fall_back_to_vectors_where_snapping_would_show():
+    from gerber.render.cairo_backend import GerberCairoContext
+
+    def render(aperture, pads, stamp):
+        flashes = ["X%dY%dD03*\n" % (round(x * 100000), round(y * 100000)) for x, y in pads]
+        data = GERBER_HEADER + "%LPD*%\nD{}*\n".format(aperture) + "".join(flashes) + "M02*\n"
+        ctx = GerberCairoContext(scale=100, raster=True, stamp=stamp)
+        ctx.render_layer(load_layer_data(data, "pads.gtl"), bounds=((0, 1), (0, 1)))
+        return ctx
+
+    # At 100 pixels per inch the 0.06" pads are 6 pixels wide and the 0.004"
+    # dots less than one; the off-grid pads sit 3/8 pixel into a pixel, 1/8
+    # pixel from the nearest stamp phase.
+    aligned = [(0.2, 0.2), (0.5, 0.3), (0.7, 0.8)]
+    off_grid = [(x + 0.00375, y + 0.00375) for x, y in aligned]
+    assert render(11, aligned, stamp=True)._stamp_cache
+    for aperture, pads in ((11, off_grid), (17, aligned)):
+        stamped = render(aperture, pads, stamp=True)
+        assert not stamped._stamp_cache
+        assert_same_image(stamped.dump_str(), render(aperture, pads, stamp=False).dump_str())
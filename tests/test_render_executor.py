@@ -0,0 +1,132 @@
+# tests/test_render_executor.py
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+from app.services.render_executor import RenderExecutor, RenderQueueFull, RenderTimeout, report_progress
+from gerber.pcb import _map_layers
+
+def count_with_progress(count: int) -> int:
+    """Render worker job: report 0 .. count - 1 as progress and return count."""
+    for value in range(count):
+        report_progress(value)
+    return count
+
+def parse_pool_pids(workers: int):
+    """Render worker job: the worker's PID and those of the processes a PCB parse pool ran on."""
+    return os.getpid(), _map_layers(os.getpid, [()] * workers, workers)
+
+def sleep_in_child(seconds: float):
+    """Render worker job: start a process that sleeps, report its PID and wait for it."""
+    process = multiprocessing.get_context().Process(target=time.sleep, args=(seconds,))
+    process.start()
+    report_progress(process.pid)
+    process.join()
+
+def running(pid: int) -> bool:
+    """Whether `pid` is a live process (zombies count as gone)."""
+    try:
+        with open("/proc/{}/stat".format(pid)) as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+def run_jobs(jobs, queue_size=4):
+    """Run `jobs(executor)` on a one-worker executor and return what it returns."""
+    executor = RenderExecutor(max_workers=1, queue_size=queue_size, timeout=30)
+
+    async def run():
+        try:
+            return await jobs(executor)
+        finally:
+            executor.shutdown()
+
+    return asyncio.run(run())
+
+def test_progress_is_delivered_before_the_result():
+    reported = []
+
+    async def on_progress(value):
+        reported.append(value)
+
+    async def jobs(executor):
+        first = await executor.submit(count_with_progress, 3, on_progress=on_progress)
+        # Progress without a callback is dropped, and the worker is reused
+        second = await executor.submit(count_with_progress, 2)
+        return first, second
+
+    assert run_jobs(jobs) == (3, 2)
+    assert reported == [0, 1, 2]
+
+def test_failed_progress_callback_abandons_the_job():
+    async def on_progress(value):
+        raise ValueError("progress {}".format(value))
+
+    async def jobs(executor):
+        await executor.submit(count_with_progress, 0)
+        worker = executor._workers[0]
+        with pytest.raises(ValueError, match="progress 0"):
+            await executor.submit(count_with_progress, 3, on_progress=on_progress)
+        replaced = executor._workers[0] is not worker
+        # The replacement worker doesn't see the abandoned job's messages
+        return replaced, await executor.submit(count_with_progress, 1)
+
+    assert run_jobs(jobs) == (True, 1)
+
+def test_a_full_queue_rejects_jobs():
+    async def jobs(executor):
+        running = asyncio.create_task(executor.submit(time.sleep, 0.5))
+        queued = asyncio.create_task(executor.submit(time.sleep, 0))
+        while executor.queue_depth < 1:
+            await asyncio.sleep(0)
+        assert executor.busy_workers == 1
+        with pytest.raises(RenderQueueFull):
+            await executor.submit(time.sleep, 0)
+        # Rejection doesn't disturb the jobs already accepted
+        return await asyncio.gather(running, queued)
+
+    assert run_jobs(jobs, queue_size=1) == [None, None]
+
+def test_timed_out_jobs_get_a_new_worker():
+    async def jobs(executor):
+        await executor.submit(count_with_progress, 0)
+        pid = executor._workers[0].process.pid
+        with pytest.raises(RenderTimeout):
+            await executor.submit(time.sleep, 60, timeout=0.5)
+        assert executor._workers[0].process.pid != pid
+        assert not executor.busy_workers
+        return await executor.submit(count_with_progress, 2)
+
+    assert run_jobs(jobs) == 2
+
+def test_report_progress_outside_a_worker_does_nothing():
+    report_progress("ignored")
+
+def test_jobs_can_parse_in_a_process_pool():
+    async def jobs(executor):
+        return await executor.submit(parse_pool_pids, 2)
+
+    worker_pid, pool_pids = run_jobs(jobs)
+    assert worker_pid not in pool_pids
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_timed_out_jobs_take_their_child_processes_with_them():
+    children = []
+
+    async def on_progress(pid):
+        children.append(pid)
+
+    async def jobs(executor):
+        with pytest.raises(RenderTimeout):
+            await executor.submit(sleep_in_child, 60, timeout=1, on_progress=on_progress)
+
+    run_jobs(jobs)
+    deadline = time.time() + 5
+    while running(children[0]) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not running(children[0])
@@ -0,0 +1,200 @@
+# tests/test_rs274x.py
+
+import io
+import math
+import multiprocessing
+import resource
+import time
+from typing import Dict, List
+
+import pytest
+
+from gerber.rs274x import GerberParser
+from tests.support import synthetic_gerber, write_plane_fill
+
+def parse_peak(mode: str, path: str) -> Dict:
+    """Worker process: parse a file whole or streamed, and report its time and peak RSS."""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    parser = GerberParser()
+    if mode == "parse":
+        layer = parser.parse(path)
+        count, bounding_box = len(layer.primitives), layer.bounding_box
+    else:
+        count = 0
+        with open(path) as f:
+            for _ in parser.iter_primitives(f, path):
+                count += 1
+        bounding_box = parser.bounding_box
+    end = time.perf_counter()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"seconds": end - start, "primitives": count, "bounding_box": bounding_box,
+            "peak_rss_mb": round((peak - baseline) / 1024, 1), "process_peak_mb": round(peak / 1024, 1)}
+
+class CascadeParser(GerberParser):
+    """
+    GerberParser with the command splitter and statement matching it had
+    before the single-pass tokenizer: the file is split one character at a
+    time and every expression is tried in turn. Reference for the tokenizer
+    equivalence check.
+    """
+
+    def _split_commands(self, data):
+        start = 0
+        in_header = True
+        for cur in range(0, len(data)):
+            val = data[cur]
+            if val == '%' and start == cur:
+                in_header = True
+                continue
+            if val == '\r' or val == '\n':
+                if start != cur:
+                    yield data[start:cur]
+                start = cur + 1
+            elif not in_header and val == '*':
+                yield data[start:cur + 1]
+                start = cur + 1
+            elif in_header and val == '%':
+                yield data[start:cur + 1]
+                start = cur + 1
+                in_header = False
+
+    def _match_statement(self, line):
+        for name, expr in [("coord", self.COORD_STMT)] + self.STATEMENT_EXPRS:
+            match = expr.match(line)
+            if match:
+                return (name.rstrip("0123456789"), match.groupdict(), line[match.end(0):])
+        return (None, {}, None)
+
+# Covers every statement kind, multi-statement lines, parameters split over
+# lines, empty data blocks, CRLF line ends and unknown commands.
+TOKENIZER_SAMPLE = (
+    "G04 Tokenizer sample*\r\n"
+    "%FSLAX25Y25*%\r\n%MOIN*%\r\n%IPPOS*%\r\n%LNTOP*%\r\n%ASAXBY*%\n%IR0*%\n"
+    "%MIA0B0*%\n%OFA0B0*%\n%SFA1.0B1.0*%\n%INBOARD*%\n"
+    "%AMTHERM*\n1,1,0.05,0,0*\n21,0,0.07,0.02,0.01,0,30*%\n"
+    "%ADD10C,0.01000*%%ADD11R,0.06000X0.04000*%\n"
+    "%ADD12THERM*%\n"
+    "G70*G90*\n"
+    "G75*\nG01*\nD10*\nX100Y100D02**X2000Y100D01*X2000Y2000D01*\n"
+    "G03X1000Y3000I-1000J0D01*\nG74*G02X100Y100I500J500D01*G75*\n"
+    "%LPC*%\nG54D11*X5000Y5000D03*\n%LPD*%\n"
+    "G36*\nX0Y0D02*X1000Y0D01*X1000Y1000D01*X0Y1000D01*X0Y0D01*G37*\n"
+    "D12*X3000Y3000D03*Y4000D03*\n"
+    "G99*\nM02*\n"
+)
+
+def tokenizer_corpus() -> Dict[str, str]:
+    return {
+        "sample": TOKENIZER_SAMPLE,
+        "synthetic": synthetic_gerber(traces=5000, pads=2000, clear_every=25,
+                                      apertures=(11, 12, 13, 14, 15, 16)),
+        "no newlines": synthetic_gerber(traces=2000, pads=500).replace("\n", ""),
+    }
+
+def statement_stream(parser_class, data: str) -> List[str]:
+    parser = parser_class()
+    return [str(stmt) for stmt in parser._parse(parser._split_commands(data))]
+
+def stream_files(directory):
+    """A plane fill, a copper layer with clear flashes, and CRLF line ends."""
+    path = directory / "plane.gbr"
+    write_plane_fill(str(path), 0.05, vertices=40)
+    return {
+        "plane fill": path.read_text(),
+        "copper": synthetic_gerber(traces=2000, pads=2000, clear_every=7,
+                                   apertures=(11, 12, 13, 14, 15, 16, 17)),
+        "crlf": synthetic_gerber(traces=200, pads=200).replace("\n", "\r\n"),
+    }
+
+@pytest.fixture(scope="module")
+def parsed_files(tmp_path_factory):
+    files = stream_files(tmp_path_factory.mktemp("stream"))
+    return {name: (data, GerberParser().parse_raw(data)) for name, data in files.items()}
+
+@pytest.mark.parametrize("name", sorted(tokenizer_corpus()))
+def test_tokenizer_matches_cascade(name):
+    """The single-pass tokenizer gives the statement stream the cascade gave."""
+    data = tokenizer_corpus()[name]
+    assert statement_stream(GerberParser, data) == statement_stream(CascadeParser, data)
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+@pytest.mark.parametrize("name", ["plane fill", "copper", "crlf"])
+def test_streamed_parse_matches_parse_raw(parsed_files, name, chunk_size):
+    data, parsed = parsed_files[name]
+
+    parser = GerberParser()
+    statements = parser.iter_statements(io.StringIO(data), chunk_size=chunk_size)
+    assert [str(stmt) for stmt in statements] == [str(stmt) for stmt in parsed.statements]
+
+    parser = GerberParser()
+    primitives = parser.iter_primitives(io.StringIO(data), chunk_size=chunk_size)
+    assert ([(type(p).__name__, p.bounding_box) for p in primitives] ==
+            [(type(p).__name__, p.bounding_box) for p in parsed.primitives])
+    assert parser.bounds == parsed.bounds
+    assert parser.bounding_box == parsed.bounding_box
+    # Nothing is kept once streamed
+    assert not parser.statements
+    assert not parser.primitives
+
+def test_streaming_a_large_file_stays_in_bounded_memory(tmp_path):
+    # A whole parse of this file grows the process by well over the limit
+    path = str(tmp_path / "plane.gbr")
+    write_plane_fill(path, 2)
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        streamed = pool.apply(parse_peak, ("stream", path))
+    assert streamed["primitives"] > 0
+    assert streamed["peak_rss_mb"] < 32
+
+def test_reading_a_flash_leaves_it_a_record():
+    data = synthetic_gerber(traces=0, pads=60, apertures=(11, 12, 14, 15, 16))
+    flashes = GerberParser().parse_raw(data).primitives
+    for flash in flashes:
+        flash.bounding_box, flash.position, flash.vertices
+        getattr(flash, "diameter", None), getattr(flash, "hole_diameter", None)
+        assert flash._primitive is None
+    # Writing an attribute gives the flash its own primitive
+    flash = flashes[0]
+    flash.hole_diameter = 0.01
+    assert flash._primitive is not None
+    assert flash.hole_diameter == 0.01
+
+def test_units_change_between_flashes_of_one_aperture():
+    data = ("%FSLAX25Y25*%\n%MOIN*%\n%ADD10C,0.06000*%\nD10*\nX100000Y100000D03*\n"
+            "%MOMM*%\nX200000Y200000D03*\nM02*\n")
+    first, second = GerberParser().parse_raw(data).primitives
+    assert (first.units, first.aperture.units) == ("inch", "inch")
+    assert (second.units, second.aperture.units) == ("metric", "metric")
+    assert first.aperture is not second.aperture
+
+def test_thermal_outlines_record_the_arcs_they_approximate():
+    data = ("%FSLAX25Y25*%\n%MOIN*%\n%AMTHERMAL*7,0,0,0.08,0.05,0.01,30*%\n%ADD10THERMAL*%\n"
+            "D10*\nX100000Y50000D03*\nM02*\n")
+    flash, = GerberParser().parse_raw(data).primitives
+    outlines = flash.to_primitive().primitives
+    assert len(outlines) == 4
+    for outline in outlines:
+        radii = []
+        for first, last, start_angle, end_angle in outline.arcs:
+            center, radius = outline.arc_circle(first, last, start_angle, end_angle)
+            assert center == pytest.approx((1.0, 0.5))
+            points = [line.end for line in outline.primitives[first:last]]
+            for x, y in points:
+                assert math.hypot(x - 1.0, y - 0.5) == pytest.approx(radius)
+            assert points[-1] == pytest.approx((1.0 + radius * math.cos(end_angle),
+                                                0.5 + radius * math.sin(end_angle)))
+            radii.append(radius)
+        assert radii == pytest.approx([0.025, 0.04])
+
+def test_thermal_outline_lines_chain_point_to_point():
+    data = ("%FSLAX25Y25*%\n%MOIN*%\n%AMTHERMAL*7,0,0,0.08,0.05,0.01,30*%\n%ADD10THERMAL*%\n"
+            "D10*\nX100000Y50000D03*\nM02*\n")
+    flash, = GerberParser().parse_raw(data).primitives
+    quarter_ring = math.pi * (0.04 ** 2 - 0.025 ** 2) / 4
+    for outline in flash.to_primitive().primitives:
+        lines = outline.primitives
+        assert all(a.end == b.start for a, b in zip(lines, lines[1:]))
+        # Shoelace area over the lines, as lod_primitives sizes dots by it
+        area = abs(sum(line.start[0] * line.end[1] - line.end[0] * line.start[1]
+                       for line in lines)) / 2.0
+        assert 0.5 * quarter_ring < area < quarter_ring
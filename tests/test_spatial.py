@@ -0,0 +1,63 @@
+# tests/test_spatial.py
+
+import random
+from typing import List
+
+import pytest
+
+from tests.support import cairo_available, compare_png, synthetic_layer, window_at
+
+def linear_query(boxes, window) -> List[int]:
+    """Indexes of the bounding boxes touching `window`, by a scan of all of them."""
+    (qx0, qx1), (qy0, qy1) = window
+    return [index for index, ((x0, x1), (y0, y1)) in enumerate(boxes)
+            if x0 <= qx1 and x1 >= qx0 and y0 <= qy1 and y1 >= qy0]
+
+requires_cairo = pytest.mark.skipif(not cairo_available(), reason="libcairo is not available")
+
+@pytest.fixture(scope="module")
+def layer():
+    return synthetic_layer(traces=5000, pads=5000, clear_every=50)
+
+def test_index_queries_match_a_linear_scan(layer):
+    rng = random.Random(1)
+    boxes = [primitive.bounding_box for primitive in layer.primitives]
+    (xmin, xmax), (ymin, ymax) = layer.bounds
+    # Windows partly or wholly outside the layer included
+    bounds = ((xmin - 0.5, xmax + 0.5), (ymin - 0.5, ymax + 0.5))
+    for _ in range(200):
+        window = window_at(bounds, rng.uniform(0.0, 0.3), rng)
+        expected = linear_query(boxes, window)
+        assert layer.spatial_index.query_indices(window).tolist() == expected, window
+        assert layer.query(window) == [layer.primitives[index] for index in expected]
+
+def test_index_follows_replaced_primitives():
+    layer = synthetic_layer(traces=100, pads=100)
+    index = layer.spatial_index
+    assert layer.spatial_index is index
+    layer.primitives = layer.primitives[:50]
+    assert len(layer.spatial_index) == 50
+
+def test_index_follows_an_offset_layer():
+    layer = synthetic_layer(traces=100, pads=100)
+    (xmin, xmax), (ymin, ymax) = layer.bounds
+    window = ((xmin, xmax), (ymin, ymax))
+    before = layer.query(window)
+    assert before
+    layer.cam_source.offset(100, 100)
+    assert layer.query(window) == []
+    moved = ((xmin + 100, xmax + 100), (ymin + 100, ymax + 100))
+    assert layer.query(moved) == before
+
+@requires_cairo
+def test_windowed_render_matches_a_clipped_full_render(layer):
+    from gerber.render.cairo_backend import GerberCairoContext
+
+    for seed in range(3):
+        window = window_at(layer.bounds, 0.01, random.Random(seed))
+        windowed = GerberCairoContext(scale=1000, raster=True).render_window([layer], window)
+        ctx = GerberCairoContext(scale=1000, raster=True)
+        ctx.render_layer(layer, bounds=window)
+        parity = compare_png(ctx.dump(), windowed, tolerance=0)
+        assert parity["same_size"]
+        assert parity["max_diff"] == 0, (window, parity)
@@ -0,0 +1,54 @@
+# tests/test_utils.py
+
+import itertools
+import random
+
+import pytest
+
+from gerber.utils import parse_gerber_value, parse_gerber_values, write_gerber_value
+
+def string_parse_gerber_value(value, format=(2, 5), zero_suppression='trailing'):
+    """
+    The string padding and slicing `parse_gerber_value` used before the
+    integer decoder. Reference for the decoder round trip test and timing.
+    """
+    if '.' in value:
+        return float(value)
+    integer_digits, decimal_digits = format
+    max_digits = integer_digits + decimal_digits
+    if max_digits > 13 or integer_digits > 6 or decimal_digits > 7:
+        raise ValueError('Parser only supports precision up to 6:7 format')
+    value = value.lstrip('+')
+    negative = '-' in value
+    if negative:
+        value = value.lstrip('-')
+    missing_digits = max_digits - len(value)
+    if zero_suppression == 'trailing':
+        digits = list(value + ('0' * missing_digits))
+    elif zero_suppression == 'leading':
+        digits = list(('0' * missing_digits) + value)
+    else:
+        digits = list(value)
+    result = float(''.join(digits[:integer_digits] + ['.'] + digits[integer_digits:]))
+    return -result if negative else result
+
+FORMATS = list(itertools.product(range(1, 7), range(0, 8)))
+
+def decoder_cases(fmt, zero_suppression, count=20, seed=1):
+    """`write_gerber_value` output and random digit strings, signed and unsigned, in `fmt`."""
+    rng = random.Random(seed)
+    limit = 10 ** fmt[0] - 1
+    for _ in range(count):
+        digits = "".join(rng.choice("0123456789") for _ in range(rng.randint(1, sum(fmt))))
+        yield write_gerber_value(round(rng.uniform(-limit, limit), fmt[1]), fmt, zero_suppression)
+        yield digits
+        yield "-" + digits
+
+@pytest.mark.parametrize("zero_suppression", ["trailing", "leading"])
+@pytest.mark.parametrize("fmt", FORMATS, ids=lambda fmt: "{}:{}".format(*fmt))
+def test_decoder_matches_string_parse(fmt, zero_suppression):
+    """The integer decoder gives exactly the string slicing result in every supported format."""
+    values = list(decoder_cases(fmt, zero_suppression))
+    expected = [repr(string_parse_gerber_value(value, fmt, zero_suppression)) for value in values]
+    assert [repr(parse_gerber_value(value, fmt, zero_suppression)) for value in values] == expected
+    assert [repr(value) for value in parse_gerber_values(values, fmt, zero_suppression)] == expected
@@ -0,0 +1,42 @@
+# tests/test_zip_creator.py
+
+import io
+import json
+import os
+import zipfile
+from typing import Any, Iterator, Tuple
+
+from app.utils.zip_creator import stream_zip
+
+def quote_entries(images: int, size: int) -> Iterator[Tuple[str, Any]]:
+    """Random (incompressible, like PNG) images produced one at a time, then the quote JSON."""
+    for index in range(images):
+        yield f"pcb_{index}.png", os.urandom(size)
+    yield "quote_details.json", json.dumps({"quote": {"final_price_egp": 1234.5}}, indent=2)
+
+def test_streamed_archives_read_back_intact():
+    entries = list(quote_entries(3, 64 * 1024))
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(iter(entries)))))
+    assert archive.testzip() is None
+    assert archive.namelist() == [name for name, _ in entries]
+    for name, data in entries:
+        info = archive.getinfo(name)
+        # Images are stored as they are, everything else deflated
+        expected = zipfile.ZIP_STORED if name.endswith(".png") else zipfile.ZIP_DEFLATED
+        assert info.compress_type == expected, name
+        assert archive.read(name) == (data.encode() if isinstance(data, str) else data)
+
+def test_each_entry_is_sent_before_the_next_is_produced():
+    produced = []
+
+    def entries():
+        for name, data in quote_entries(3, 1024):
+            produced.append(name)
+            yield name, data
+
+    sent = []
+    for chunk in stream_zip(entries()):
+        sent.append((len(produced), len(chunk)))
+    # One chunk per entry as it is produced, then the central directory
+    assert [count for count, _ in sent] == [1, 2, 3, 4, 4]
+    assert all(size > 0 for _, size in sent)